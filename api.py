@@ -0,0 +1,296 @@
+import hashlib
+import threading
+import time
+
+from flask import Blueprint, g, jsonify, make_response, request, url_for
+from sqlalchemy import case, func, select
+
+from cache import app_cache
+from extensions import db
+from manifest import course_versions, student_content
+from models import Attendance, Exam, Feedback, student_course
+from progress_summary import get_summaries, progress_percent
+from sessions import current_user
+from versions import data_versions, student_version_name
+import readmodels
+
+# --------------------------------------------------
+# Dashboard widget API (/api/v1)
+# --------------------------------------------------
+# Dashboards render their shell straight away and fetch each card's numbers
+# from a widget here, usually several at once through the batch endpoint:
+#
+#   GET /api/v1/<role>/widgets/<name>
+#   GET /api/v1/<role>/widgets?names=attendance,progress
+#
+# A widget is a function of the logged-in user returning JSON data. Widgets
+# with a `versions` function are cached under those data versions and
+# answered with an ETag; the rest are cached for `ttl` seconds. Each response
+# carries Server-Timing per widget, and /admin/widget_metrics has totals.
+
+api = Blueprint("api", __name__, url_prefix="/api/v1")
+
+WIDGETS = {}  # (role, name) -> Widget
+MAX_BATCH = 20
+RECENT_EXAMS = 10  # exams listed on the teacher dashboard
+
+_lock = threading.Lock()
+_metrics = {}  # "role.name" -> counters
+
+
+class Widget:
+    __slots__ = ("role", "name", "load", "ttl", "versions")
+
+    def __init__(self, role, name, load, ttl, versions):
+        self.role = role
+        self.name = name
+        self.load = load
+        self.ttl = ttl
+        self.versions = versions
+
+
+def widget(role, name, ttl=60, versions=None):
+    def decorator(load):
+        WIDGETS[(role, name)] = Widget(role, name, load, ttl, versions)
+        return load
+
+    return decorator
+
+
+def init_api(app):
+    app.register_blueprint(api)
+
+
+# ---------------- Resolving ----------------
+
+
+def _stamp(item, user):
+    return item.versions(user) if item.versions else None
+
+
+def _etag(items, user, stamps):
+    """Weak ETag when every widget is versioned, else None."""
+    if any(stamp is None for stamp in stamps):
+        return None
+    # Versions alone can match across users (equal counters), so key the viewer
+    key = repr((items[0].role, user.id, sorted(item.name for item in items), stamps))
+    return hashlib.sha1(key.encode()).hexdigest()[:20]
+
+
+def _resolve(item, user, stamp):
+    """(data, ms, cache hit)."""
+    start = time.perf_counter()
+    key = ("widget", item.role, user.id, item.name, stamp)
+    data = app_cache.get(key)
+    hit = data is not None
+    if not hit:
+        data = item.load(user)
+        app_cache.set(key, data, item.ttl if stamp is None else 3600)
+    ms = 1000 * (time.perf_counter() - start)
+    _record(f"{item.role}.{item.name}", ms, hit)
+    return data, ms, hit
+
+
+def _respond(payload, items, etag, timings):
+    response = jsonify(payload)
+    response.headers["Server-Timing"] = ", ".join(
+        f'w-{name};dur={ms:.1f};desc="{"hit" if hit else "miss"}"'
+        for name, ms, hit in timings
+    )
+    response.cache_control.private = True
+    if etag:
+        response.set_etag(etag, weak=True)
+        response.cache_control.no_cache = True
+    else:
+        response.cache_control.max_age = min(w.ttl for w in items)
+    response.vary.add("Cookie")
+    return response
+
+
+def _error(message, status):
+    return make_response(jsonify({"error": message}), status)
+
+
+def _serve(items, user, single=False):
+    stamps = [_stamp(item, user) for item in items]
+    etag = _etag(items, user, stamps)
+    if etag and request.if_none_match.contains_weak(etag):
+        # Versions unchanged: skip loading the widgets altogether
+        response = make_response("", 304)
+        response.set_etag(etag, weak=True)
+        response.cache_control.private = True
+        response.cache_control.no_cache = True
+        return response
+
+    widgets, timings = {}, []
+    for item, stamp in zip(items, stamps):
+        data, ms, hit = _resolve(item, user, stamp)
+        widgets[item.name] = data
+        timings.append((item.name, ms, hit))
+    payload = {"data": widgets[items[0].name]} if single else {"widgets": widgets}
+    return _respond(payload, items, etag, timings)
+
+
+@api.route("/<role>/widgets/<name>")
+def get_widget(role, name):
+    item = WIDGETS.get((role, name))
+    if item is None:
+        return _error("Unknown widget.", 404)
+    user = current_user(role)
+    if user is None:
+        return _error("Login required.", 401)
+    return _serve([item], user, single=True)
+
+
+@api.route("/<role>/widgets")
+def get_widgets(role):
+    names = [n for n in request.args.get("names", "").split(",") if n]
+    if not names or len(names) > MAX_BATCH:
+        return _error(f"Ask for 1 to {MAX_BATCH} widgets.", 400)
+    items = [WIDGETS.get((role, name)) for name in names]
+    if None in items:
+        return _error("Unknown widget.", 404)
+    user = current_user(role)
+    if user is None:
+        return _error("Login required.", 401)
+    return _serve(items, user)
+
+
+# ---------------- Metrics ----------------
+
+
+def _record(name, ms, hit):
+    with _lock:
+        m = _metrics.setdefault(name, {"calls": 0, "hits": 0, "total_ms": 0.0, "max_ms": 0.0})
+        m["calls"] += 1
+        m["hits"] += hit
+        m["total_ms"] += ms
+        m["max_ms"] = max(m["max_ms"], ms)
+
+
+def widget_metrics():
+    with _lock:
+        data = {name: dict(m) for name, m in _metrics.items()}
+    for m in data.values():
+        m["mean_ms"] = round(m["total_ms"] / m["calls"], 2)
+        m["hit_rate"] = round(m["hits"] / m["calls"], 3)
+        m["total_ms"] = round(m["total_ms"], 1)
+        m["max_ms"] = round(m["max_ms"], 1)
+    return data
+
+
+# ---------------- Student widgets ----------------
+
+
+def _course_ids(student):
+    return [c.id for c in student.courses]
+
+
+def _student_versions(student):
+    # Shared by every student widget in a batch
+    if "student_widget_versions" not in g:
+        versions = data_versions(student_version_name(student.id), "course_catalog")
+        courses = course_versions(_course_ids(student))
+        g.student_widget_versions = (tuple(versions.values()), tuple(sorted(courses.items())))
+    return g.student_widget_versions
+
+
+@widget("student", "attendance", versions=_student_versions)
+def student_attendance(student):
+    days, present = db.session.execute(
+        select(
+            func.count(),
+            func.coalesce(func.sum(case((func.lower(Attendance.status) == "present", 1), else_=0)), 0),
+        ).where(Attendance.student_id == student.id)
+    ).one()
+    return {"days": days, "percent": round(present / days * 100, 2) if days else 0}
+
+
+@widget("student", "content", versions=_student_versions)
+def student_content_counts(student):
+    content = student_content(_course_ids(student))
+    materials_url = None
+    if content.materials:
+        materials_url = url_for(
+            "view_material_student", course_id=content.materials[0].course_id
+        )
+    return {
+        "courses": len(student.courses),
+        "recorded": len(content.recorded_classes),
+        "live": len(content.live_classes),
+        "materials": len(content.materials),
+        "exams": len(content.exams),
+        "materials_url": materials_url,
+    }
+
+
+@widget("student", "exam_results", versions=_student_versions)
+def student_exam_results(student):
+    exams = readmodels.attended_exams(student.id)
+    return {
+        "count": len(exams),
+        "attended": [
+            {
+                "title": exam.title,
+                "course": exam.course.name if exam.course else "N/A",
+                "url": url_for("view_exam_result", exam_id=exam.id),
+            }
+            for exam in exams
+        ]
+    }
+
+
+@widget("student", "progress", versions=_student_versions)
+def student_progress(student):
+    course_ids = _course_ids(student)
+    completed, total, percent = progress_percent(
+        get_summaries(student.id, course_ids).values()
+    )
+    return {"completed": completed, "total": total, "percent": percent}
+
+
+# ---------------- Teacher widgets ----------------
+
+
+@widget("teacher", "overview", ttl=60)
+def teacher_overview(teacher):
+    courses = readmodels.teacher_course_ids(teacher.id)
+    students = db.session.scalar(
+        select(func.count(func.distinct(student_course.c.student_id))).where(
+            student_course.c.course_id.in_(courses)
+        )
+    )
+    exams = db.session.scalar(
+        select(func.count()).select_from(Exam).where(Exam.teacher_id == teacher.id)
+    )
+    unanswered = db.session.scalar(
+        select(func.count())
+        .select_from(Feedback)
+        .where(Feedback.teacher_id == teacher.id, Feedback.reply.is_(None))
+    )
+    return {"students": students, "exams": exams, "unanswered_feedback": unanswered}
+
+
+@widget("teacher", "courses", ttl=60)
+def teacher_courses(teacher):
+    return {
+        "courses": [
+            {"name": row.name, "students": row.students}
+            for row in readmodels.teacher_course_counts(teacher.id)
+        ]
+    }
+
+
+@widget("teacher", "exams", ttl=60)
+def teacher_exams(teacher):
+    return {
+        "exams": [
+            {
+                "title": row.title,
+                "course": row.course.name if row.course else "N/A",
+                "questions": row.questions,
+                "attempts": row.attempts,
+            }
+            for row in readmodels.teacher_exam_stats(teacher.id, limit=RECENT_EXAMS)
+        ]
+    }
@@ -7,19 +7,53 @@ from flask import (
     url_for,
     session,
     jsonify,
+    abort,
+    send_file,
+    Response,
+    stream_with_context,
 )
 from flask_migrate import Migrate
 from extensions import db
 from models import *
 from datetime import datetime, date
 import os
+import multiprocessing
 from werkzeug.utils import secure_filename
-from werkzeug.security import generate_password_hash, check_password_hash
 from functools import wraps
-from sqlalchemy.orm import joinedload
+import click
 from sqlalchemy import text
-import re
 from dotenv import load_dotenv
+from uploads import init_uploads, upload_slot, upload_metrics
+from search import SEARCH_KINDS, ranked_search, include_object, search_page
+from search import rebuild_search_index
+from jobs import JOBS, JOB_STATES, init_jobs, job_status, recent_jobs, run_worker
+from jobs import start_worker_thread
+from deletion import init_deletion, soft_delete_course, restore_course
+from deletion import soft_delete_teacher, restore_teacher
+from extraction import queue_extraction, extract_material
+from pagination import paginate, render_list, stream_rows
+from loaders import init_loaders, with_profile
+import readmodels
+from manifest import bump_content_version, student_content
+from progress_summary import enrolled_pairs, ensure_summaries, get_summaries
+from progress_summary import progress_percent, rebuild_summaries, verify_summaries
+from progress_summary import backfill_progress_courses
+from sessions import init_sessions, current_user, rotate_session
+from identity import authenticate, email_taken, find_accounts, find_user, rebuild_accounts
+from passwords import init_passwords, hash_password, password_metrics, calibrate
+from emailindex import init_email_index, student_email_exists
+from validation import check_student, check_teacher
+from importer import IMPORT_KINDS, init_importer, import_rows, read_rows
+from importer import start_import, import_status, recent_imports, errors_path
+from exports import EXPORTS, EXPORT_FORMATS, iter_csv, parquet_tempfile, write_parquet
+from assets import init_assets, build_assets
+from fragments import init_fragments
+from conditional import init_conditional, conditional, catalog_etag, student_etag
+from compression import init_compression, compression_metrics
+from api import init_api, widget_metrics
+from notifications import init_notifications, create_events_app, poll_stream
+from notifications import announce_live_class, announce_feedback_reply
+from notifications import latest_id, last_event_id, student_topics
 
 # --------------------------------------------------
 # Load environment variables
@@ -72,7 +106,21 @@ app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
 # Initialize DB & Migrations
 # --------------------------------------------------
 db.init_app(app)
-migrate = Migrate(app, db)
+migrate = Migrate(app, db, include_object=include_object)
+init_uploads(app)
+init_jobs(app)
+init_deletion(app)
+init_loaders(app)
+init_sessions(app)
+init_passwords(app)
+init_email_index(app)
+init_importer(app)
+init_assets(app)
+init_fragments(app)
+init_conditional(app)
+init_compression(app)
+init_api(app)
+init_notifications(app)
 
 # --------------------------------------------------
 # Test Database Connection
@@ -101,7 +149,7 @@ def create_default_admin():
             admin = Admin(
                 name="Admin",
                 email=admin_email,
-                password=generate_password_hash("admin@123")
+                password=hash_password("admin@123")
             )
             db.session.add(admin)
             db.session.commit()
@@ -136,13 +184,13 @@ def admin_login():
         email = request.form["email"]
         password = request.form["password"]
 
-        admin = Admin.query.filter_by(email=email).first()
-        if admin and check_password_hash(admin.password, password):
-            session["admin_id"] = admin.id
+        account = authenticate(email, password, roles=("admin",))
+        if account:
+            rotate_session()
+            session["admin_id"] = account[1]
             session["role"] = "admin"
             session.permanent = True
             return redirect(url_for("admin_index"))
-        print(Admin.query.all())
 
         flash("Invalid credentials", "danger")
 
@@ -159,6 +207,113 @@ def admin_required(f):
     return decorated_function
 
 
+@app.route("/admin/upload_metrics")
+@admin_required
+def admin_upload_metrics():
+    return jsonify(upload_metrics())
+
+
+@app.route("/admin/password_metrics")
+@admin_required
+def admin_password_metrics():
+    return jsonify(password_metrics())
+
+
+@app.route("/admin/compression_metrics")
+@admin_required
+def admin_compression_metrics():
+    return jsonify(compression_metrics())
+
+
+@app.route("/admin/widget_metrics")
+@admin_required
+def admin_widget_metrics():
+    return jsonify(widget_metrics())
+
+
+@app.route("/admin/jobs")
+@admin_required
+def admin_jobs():
+    kind = request.args.get("kind")
+    state = request.args.get("state")
+    if state and state not in JOB_STATES:
+        abort(400)
+    return jsonify(recent_jobs(kind=kind, state=state))
+
+
+@app.route("/admin/jobs/<int:job_id>")
+@admin_required
+def admin_job_status(job_id):
+    status = job_status(job_id)
+    if status is None:
+        abort(404)
+    return jsonify(status)
+
+
+@app.route("/admin/import", methods=["GET", "POST"])
+@admin_required
+def admin_import():
+    if request.method == "POST":
+        kind = request.form.get("kind")
+        upload = request.files.get("file")
+        if kind not in IMPORT_KINDS or not upload or not upload.filename:
+            flash("Choose what to import and a CSV or XLSX file.", "danger")
+        elif not upload.filename.lower().endswith((".csv", ".xlsx")):
+            flash("Only CSV and XLSX files can be imported.", "danger")
+        else:
+            start_import(kind, upload)
+            flash("Import started. Refresh to follow its progress.", "success")
+        return redirect(url_for("admin_import"))
+
+    return render_template(
+        "admin_import.html", kinds=IMPORT_KINDS, imports=recent_imports()
+    )
+
+
+@app.route("/admin/import/<import_id>/errors")
+@admin_required
+def admin_import_errors(import_id):
+    status = import_status(import_id)
+    if not status or status.get("state") != "done":
+        abort(404)
+    return send_file(
+        errors_path(import_id),
+        mimetype="text/csv",
+        as_attachment=True,
+        download_name=f"{status['kind']}-import-errors.csv",
+    )
+
+
+@app.route("/export/<name>.<fmt>")
+def export_data(name, fmt):
+    # Admins get everything; teachers get their own courses
+    if "admin_id" in session:
+        teacher_id = None
+    elif session.get("teacher_id"):
+        teacher_id = session["teacher_id"]
+    else:
+        return redirect(url_for("login"))
+    if name not in EXPORTS or fmt not in EXPORT_FORMATS:
+        abort(404)
+
+    query = EXPORTS[name](teacher_id)
+    filename = f"{name}-{date.today().isoformat()}.{fmt}"
+    if fmt == "parquet":
+        path = parquet_tempfile(query)
+        response = send_file(
+            path,
+            mimetype="application/vnd.apache.parquet",
+            as_attachment=True,
+            download_name=filename,
+        )
+        response.call_on_close(lambda: os.remove(path))
+        return response
+
+    response = Response(stream_with_context(iter_csv(query)), mimetype="text/csv")
+    response.headers["Content-Disposition"] = f"attachment; filename={filename}"
+    return response
+
+
 @app.route("/admin/logout")
 def admin_logout():
     session.clear()
@@ -199,64 +354,33 @@ def student_registration():
     courses = Course.query.all()
 
     if request.method == "POST":
-        name = request.form.get("name", "").strip()
-        email = request.form.get("email", "").strip()
-        password = request.form.get("password", "")
-        age = request.form.get("age", "").strip()
-        grade = request.form.get("grade", "").strip()
         course_ids = request.form.getlist("course_ids")
 
         # ----------------- Validation -----------------
-        if (
-            not name
-            or not email
-            or not password
-            or not age
-            or not grade
-            or not course_ids
-        ):
-            flash("All fields are required.", "danger")
-            return redirect(url_for("student_registration"))
-
-        if not re.match(r"[^@]+@[^@]+\.[^@]+", email):
-            flash("Invalid email address.", "danger")
-            return redirect(url_for("student_registration"))
-
-        if len(password) < 6:
-            flash("Password must be at least 6 characters.", "danger")
-            return redirect(url_for("student_registration"))
-
-        try:
-            age = int(age)
-            if age < 10 or age > 100:
-                flash("Age must be between 10 and 100.", "danger")
-                return redirect(url_for("student_registration"))
-        except ValueError:
-            flash("Age must be a number.", "danger")
+        fields, error = check_student(request.form, course_ids)
+        if error:
+            flash(error, "danger")
             return redirect(url_for("student_registration"))
 
         # ----------------- Student Check -----------------
-        student = Student.query.filter_by(email=email).first()
+        student = find_user(fields["email"], roles=("student",))
 
         if not student:
             # First-time registration
-            hashed_password = generate_password_hash(password)
-            student = Student(
-                name=name, email=email, password=hashed_password, age=age, grade=grade
-            )
+            fields["password"] = hash_password(fields["password"])
+            student = Student(**fields)
             db.session.add(student)
             db.session.flush()  # Get student.id
 
         # ----------------- Course Enrollment -----------------
         already_enrolled = False
 
-        for cid in course_ids:
-            course = Course.query.get(int(cid))
-            if course:
-                if course in student.courses:
-                    already_enrolled = True
-                else:
-                    student.courses.append(course)
+        ids = [int(cid) for cid in course_ids if cid.isdigit()]
+        for course in Course.query.filter(Course.id.in_(ids)):
+            if course in student.courses:
+                already_enrolled = True
+            else:
+                student.courses.append(course)
 
         if already_enrolled:
             flash(
@@ -274,8 +398,12 @@ def student_registration():
 @app.route("/check_student_email")
 def check_student_email():
     email = request.args.get("email")
-    exists = Student.query.filter_by(email=email).first() is not None
-    return jsonify({"exists": exists})
+    exists = student_email_exists(email)
+    response = jsonify({"exists": exists})
+    # A miss can turn into a hit once the student registers, so keep it short
+    response.cache_control.private = True
+    response.cache_control.max_age = 300 if exists else 10
+    return response
 
 
 @app.route("/admin/students")
@@ -284,18 +412,20 @@ def admin_students():  # admin view students
     search = request.args.get("search")
     course_id = request.args.get("course_id")
     courses = Course.query.all()
-    query = Student.query
+    query = db.session.query(Student.id, Student.name, Student.email)
+    order_by = [Student.id]
 
     if search:
-        query = query.filter(
-            (Student.name.ilike(f"%{search}%")) | (Student.email.ilike(f"%{search}%"))
-        )
+        query, rank = ranked_search(query, Student, search)
+        order_by = [rank.desc(), Student.id]
 
     if course_id:
         query = query.join(Student.courses).filter(Course.id == course_id)
 
-    students = query.all()
-    return render_template("admin_student.html", students=students, courses=courses)
+    students = paginate(
+        query, order_by, estimate_total=True, transform=readmodels.student_rows
+    )
+    return render_list("admin_student.html", students=students, courses=courses)
 
 
 @app.route("/teacher_register", methods=["GET", "POST"])
@@ -303,58 +433,18 @@ def teacher_registration():
     courses = Course.query.all()
 
     if request.method == "POST":
-        name = request.form.get("name", "").strip()
-        email = request.form.get("email", "").strip()
-        password = request.form.get("password", "")
-        qualifications = request.form.get("qualifications", "").strip()
-        availability = request.form.get("availability", "").strip()
-        years_of_experience = request.form.get("years_of_experience", "").strip()
-        contact = request.form.get("contact", "").strip()
-        place = request.form.get("place", "").strip()
         course_id = request.form.get("course")
         second_course_id = request.form.get("second_course")
 
         # ----------------- Validation -----------------
-        if (
-            not name
-            or not email
-            or not password
-            or not qualifications
-            or not availability
-            or not years_of_experience
-            or not contact
-            or not place
-        ):
-            flash("All fields except second course are required.", "danger")
-            return redirect(url_for("teacher_registration"))
-
-        # Email format
-        if not re.match(r"[^@]+@[^@]+\.[^@]+", email):
-            flash("Invalid email address.", "danger")
-            return redirect(url_for("teacher_registration"))
-
-        # Password length
-        if len(password) < 6:
-            flash("Password must be at least 6 characters.", "danger")
-            return redirect(url_for("teacher_registration"))
-
-        # Years of experience validation
-        try:
-            years_of_experience = int(years_of_experience)
-            if years_of_experience < 0 or years_of_experience > 50:
-                flash("Years of experience must be between 0 and 50.", "danger")
-                return redirect(url_for("teacher_registration"))
-        except ValueError:
-            flash("Years of experience must be a number.", "danger")
-            return redirect(url_for("teacher_registration"))
-
-        # Contact validation (10 digits)
-        if not re.match(r"^\d{10}$", contact):
-            flash("Contact must be a 10-digit number.", "danger")
+        fields, error = check_teacher(request.form)
+        if error:
+            flash(error, "danger")
             return redirect(url_for("teacher_registration"))
 
         # Email uniqueness
-        existing_teacher = Teacher.query.filter_by(email=email).first()
+        # (accounts of removed teachers stay until the purge)
+        existing_teacher = find_accounts(fields["email"], roles=("teacher",))
         if existing_teacher:
             flash("Email already registered.", "danger")
             return redirect(url_for("teacher_registration"))
@@ -368,18 +458,8 @@ def teacher_registration():
             filename = "default.jpg"
 
         # ----------------- Save Teacher -----------------
-        hashed_password = generate_password_hash(password)
-        new_teacher = Teacher(
-            name=name,
-            email=email,
-            password=hashed_password,
-            qualifications=qualifications,
-            availability=availability,
-            years_of_experience=years_of_experience,
-            contact=contact,
-            place=place,
-            photo=filename,
-        )
+        fields["password"] = hash_password(fields["password"])
+        new_teacher = Teacher(**fields, photo=filename)
         db.session.add(new_teacher)
         db.session.flush()
         # Assign courses
@@ -406,29 +486,39 @@ def admin_teachers():  # admin view teachers
     course_id = request.args.get("course_id")
 
     courses = Course.query.all()
-    query = Teacher.query
+    query = with_profile(Teacher.query, "admin_teacher_list")
+    order_by = [Teacher.id]
 
     if search:
-        query = query.filter(
-            (Teacher.name.ilike(f"%{search}%")) | (Teacher.email.ilike(f"%{search}%"))
-        )
+        query, rank = ranked_search(query, Teacher, search)
+        order_by = [rank.desc(), Teacher.id]
     if course_id:
-        query = (
-            query.join(Teacher.courses).filter(Course.id == int(course_id)).distinct()
-        )
-    teachers = query.all()
-    return render_template("admin_teachers.html", teachers=teachers, courses=courses)
+        # One course matches each teacher at most once, so no DISTINCT
+        # (PostgreSQL rejects it alongside ORDER BY rank)
+        query = query.join(Teacher.courses).filter(Course.id == int(course_id))
+    teachers = paginate(query, order_by, estimate_total=True)
+    return render_list("admin_teachers.html", teachers=teachers, courses=courses)
 
 # for admin
 @app.route("/admin/remove_teacher/<int:teacher_id>")
 @admin_required
 def remove_teacher(teacher_id):
     teacher = Teacher.query.get_or_404(teacher_id)
-    try:
-        db.session.delete(teacher)
-        db.session.commit()
-    except Exception as e:
-        db.session.rollback()
+    # Hidden now, purged in the background once the undo window closes
+    soft_delete_teacher(teacher)
+    session["deleted_teacher"] = teacher.id
+    flash("Teacher removed.", "success")
+    return redirect(url_for("admin_teachers"))
+
+
+@app.route("/admin/undo_remove_teacher", methods=["POST"])
+@admin_required
+def undo_remove_teacher():
+    teacher_id = session.pop("deleted_teacher", None)
+    if teacher_id and restore_teacher(teacher_id):
+        flash("Teacher restored.", "success")
+    else:
+        flash("No teacher to restore.", "warning")
     return redirect(url_for("admin_teachers"))
 
 
@@ -439,14 +529,15 @@ def login():
         email = request.form["email"]
         password = request.form["password"]
 
-        student = Student.query.filter_by(email=email).first()
-        if student and check_password_hash(student.password, password):
-            session["student_id"] = student.id
+        account = authenticate(email, password)
+        if account and account[0] == "student":
+            rotate_session()
+            session["student_id"] = account[1]
             return redirect(url_for("student_dashboard"))
 
-        teacher = Teacher.query.filter_by(email=email).first()
-        if teacher and check_password_hash(teacher.password, password):
-            session["teacher_id"] = teacher.id
+        if account and account[0] == "teacher":
+            rotate_session()
+            session["teacher_id"] = account[1]
             return redirect(url_for("teacher_dashboard"))
 
         return render_template("invalid_login.html")
@@ -473,17 +564,21 @@ def teacher_dashboard():
     if not teacher_id:
         return redirect(url_for("login"))
 
-    teacher = Teacher.query.get(teacher_id)
-    students = Student.query.all()
+    teacher = current_user("teacher")
     current_date = datetime.now().strftime("%B %d, %Y")
-    created_exams = Exam.query.filter_by(teacher_id=teacher_id).all()
-    return render_template(
+    # Only this teacher's students, a page at a time; card counts, courses and
+    # exams load from the /api/v1 teacher widgets
+    roster = paginate(
+        readmodels.teacher_roster_query(teacher_id),
+        [Student.id],
+        transform=readmodels.teacher_roster_rows(teacher_id),
+    )
+    return render_list(
         "teacher_dashboard.html",
         current_date=current_date,
         datetime=datetime,
         teacher=teacher,
-        students=students,
-        created_exams=created_exams,
+        roster=roster,
     )
 
 
@@ -493,99 +588,14 @@ def student_dashboard():
     if not student_id:
         return redirect(url_for("login"))
 
-    student = Student.query.get_or_404(student_id)
-    course_ids = [c.id for c in student.courses]
-
+    student = current_user("student") or abort(404)
     current_date = datetime.now().strftime("%B %d, %Y")
 
-    # Attendance
-    records = (
-        Attendance.query.filter_by(student_id=student_id)
-        .order_by(Attendance.date)
-        .all()
-    )
-    total_days = len(records)
-    percent_attendance = (
-        round(attendance_percentage(student_id), 2) if total_days else 0
-    )
-
-    # Progress
-    completed_materials = Progress.query.filter(
-        Progress.student_id == student_id,
-        Progress.material_id.isnot(None),
-        Progress.completed.is_(True),
-    ).count()
-
-    completed_recorded = Progress.query.filter(
-        Progress.student_id == student_id,
-        Progress.recorded_class_id.isnot(None),
-        Progress.completed.is_(True),
-    ).count()
-
-    completed_live = Progress.query.filter(
-        Progress.student_id == student_id,
-        Progress.live_class_id.isnot(None),
-        Progress.completed.is_(True),
-    ).count()
-
-    completed_exams = Progress.query.filter(
-        Progress.student_id == student_id,
-        Progress.exam_id.isnot(None),
-        Progress.completed.is_(True),
-    ).count()
-
-    completed_items = (
-        completed_materials + completed_recorded + completed_live + completed_exams
-    )
-
-    total_items = (
-        StudyMaterial.query.filter(StudyMaterial.course_id.in_(course_ids)).count()
-        + RecordedClass.query.filter(RecordedClass.course_id.in_(course_ids)).count()
-        + LiveClass.query.filter(LiveClass.course_id.in_(course_ids)).count()
-        + Exam.query.filter(Exam.course_id.in_(course_ids)).count()
-    )
-
-    progress = int((completed_items / total_items) * 100) if total_items else 0
-
-    # Exams
-    assigned_exams = (
-        Exam.query.filter(Exam.course_id.in_(course_ids))
-        .order_by(Exam.created_at.desc())
-        .all()
-    )
-    exam_count = len(assigned_exams)
-
-    attempts = ExamAttempt.query.filter_by(student_id=student_id).all()
-    exams_attended = list({a.exam.id: a.exam for a in attempts}.values())
-    attended_exam_ids = {a.exam_id for a in attempts}
-
-    # Classes and Materials
-    recorded_classes = RecordedClass.query.filter(
-        RecordedClass.course_id.in_(course_ids)
-    ).all()
-    live_classes = LiveClass.query.filter(LiveClass.course_id.in_(course_ids)).all()
-    materials = StudyMaterial.query.filter(
-        StudyMaterial.course_id.in_(course_ids)
-    ).all()
-    exams = assigned_exams
-
+    # Attendance, content, exam and progress cards load from /api/v1 widgets
     return render_template(
         "student_dashboard.html",
         current_date=current_date,
         student=student,
-        attendance=records,
-        percent_attendance=percent_attendance,
-        total_days=total_days,
-        progress=progress,
-        completed_items=completed_items,
-        total_items=total_items,
-        exam_count=exam_count,
-        exams_attended=exams_attended,
-        recorded_classes=recorded_classes,
-        live_classes=live_classes,
-        materials=materials,
-        exams=exams,
-        attended_exam_ids=attended_exam_ids,
     )
 
 
@@ -595,7 +605,9 @@ def student_profile():
     if not student_id:
         return redirect(url_for("login"))
 
-    student = Student.query.get_or_404(student_id)
+    student = with_profile(Student.query, "student_enrolled_courses").get_or_404(
+        student_id
+    )
 
     teachers = set()
     for course in student.courses:
@@ -612,7 +624,7 @@ def teacher_profile():
     teacher_id = session.get("teacher_id")
     if not teacher_id:
         return redirect(url_for("login"))
-    teacher = Teacher.query.get(teacher_id)
+    teacher = current_user("teacher")
 
     return render_template("teacher_profile.html", teacher=teacher)
 
@@ -633,10 +645,14 @@ def teacher_edit_profile():
     if not teacher_id:
         return redirect(url_for("login"))
 
-    teacher = Teacher.query.get_or_404(teacher_id)
+    teacher = current_user("teacher") or abort(404)
     courses = Course.query.all()
 
     if request.method == "POST":
+        # account emails are unique per role, ignoring case
+        if email_taken(request.form["email"], "teacher", teacher.id):
+            flash("That email is already used by another teacher.", "danger")
+            return redirect(url_for("teacher_edit_profile"))
 
         # -------- Photo Upload --------
         photo_file = request.files.get("photo")
@@ -648,7 +664,9 @@ def teacher_edit_profile():
         # -------- Text Fields --------
         teacher.name = request.form["name"]
         teacher.email = request.form["email"]
-        teacher.password = request.form["password"]
+        # Blank keeps the current password
+        if request.form.get("password"):
+            teacher.password = hash_password(request.form["password"])
         teacher.qualifications = request.form["qualifications"]
         teacher.availability = request.form["availability"]
         teacher.years_of_experience = request.form["years_of_experience"]
@@ -684,10 +702,14 @@ def student_edit_profile():
     if not student_id:
         return redirect(url_for("login"))
 
-    student = Student.query.get(student_id)
+    student = current_user("student")
     courses = Course.query.all()
 
     if request.method == "POST":
+        if email_taken(request.form.get("email"), "student", student.id):
+            flash("That email is already used by another student.", "danger")
+            return redirect(url_for("student_edit_profile"))
+
         # Update text fields
         student.name = request.form.get("name")
         student.email = request.form.get("email")
@@ -716,14 +738,18 @@ def teacher_students():
     if not teacher_id:
         return redirect(url_for("login"))
 
-    teacher = Teacher.query.get_or_404(teacher_id)
     # ✅ Filter students directly by assigned teacher
-    students = set()
-    for course in teacher.courses:
-        for student in course.students:
-            students.add(student)
+    query = (
+        Student.query.join(
+            student_course, student_course.c.student_id == Student.id
+        )
+        .join(teacher_course, teacher_course.c.course_id == student_course.c.course_id)
+        .filter(teacher_course.c.teacher_id == teacher_id)
+        .distinct()
+    )
+    students = paginate(with_profile(query, "student_courses"), [Student.id])
 
-    return render_template("teacher_student.html", students=list(students))
+    return render_list("teacher_student.html", students=students)
 
 
 @app.route("/teacher/attendance", methods=["GET", "POST"])
@@ -733,7 +759,7 @@ def mark_attendance():
     if not teacher_id:
         return redirect(url_for("login"))
 
-    teacher = Teacher.query.get_or_404(teacher_id)
+    teacher = with_profile(Teacher.query, "teacher_roster").get_or_404(teacher_id)
 
     students = set()
     for course in teacher.courses:
@@ -785,12 +811,13 @@ def allowed_file(filename):
 
 
 @app.route("/teacher/upload_recorded_class", methods=["GET", "POST"])
+@upload_slot
 def upload_recorded_class():
     teacher_id = session.get("teacher_id")
     if not teacher_id:
         return redirect(url_for("login"))
 
-    teacher = Teacher.query.get_or_404(teacher_id)
+    teacher = current_user("teacher") or abort(404)
 
     # Optional: restrict courses to this teacher only
     courses = teacher.courses
@@ -827,6 +854,7 @@ def upload_recorded_class():
             filename=filename,
         )
         db.session.add(new_recorded)
+        bump_content_version(course_id)
         db.session.commit()
         return redirect(url_for("manage_class"))
 
@@ -842,7 +870,7 @@ def upload_live_class():
         flash("Login required!", "danger")
         return redirect(url_for("login"))
 
-    teacher = Teacher.query.get_or_404(teacher_id)
+    teacher = current_user("teacher") or abort(404)
     courses = teacher.courses  # Only show teacher's courses
 
     if request.method == "POST":
@@ -881,6 +909,8 @@ def upload_live_class():
         )
 
         db.session.add(new_class)
+        bump_content_version(course_id)
+        announce_live_class(new_class)
         db.session.commit()
         return redirect(url_for("manage_class"))
 
@@ -896,6 +926,7 @@ def delete_recorded_class(id):
         os.remove(file_path)
 
     db.session.delete(cls)
+    bump_content_version(cls.course_id)
     db.session.commit()
 
     return redirect(url_for("manage_class"))
@@ -910,6 +941,7 @@ def edit_recorded_class(id):
         cls.date = datetime.strptime(request.form["date"], "%Y-%m-%d").date()
         cls.filename = request.form["filename"]
 
+        bump_content_version(cls.course_id)
         db.session.commit()
         return redirect(url_for("manage_class"))
 
@@ -933,6 +965,8 @@ def edit_live_class(id):
         cls.platform = request.form["platform"]
         cls.link = request.form["link"]
 
+        bump_content_version(cls.course_id)
+        announce_live_class(cls)
         db.session.commit()
         return redirect(url_for("manage_class"))
 
@@ -943,6 +977,7 @@ def edit_live_class(id):
 def delete_live_class(id):
     cls = LiveClass.query.get_or_404(id)
     db.session.delete(cls)
+    bump_content_version(cls.course_id)
     db.session.commit()
     return redirect(url_for("manage_class"))
 
@@ -952,12 +987,13 @@ def allowed_material(filename):
 
 
 @app.route("/upload_material", methods=["GET", "POST"])
+@upload_slot
 def upload_material():
     teacher_id = session.get("teacher_id")
     if not teacher_id:
         return redirect(url_for("login"))
 
-    teacher = Teacher.query.get_or_404(teacher_id)
+    teacher = current_user("teacher") or abort(404)
     courses = teacher.courses
 
     if request.method == "POST":
@@ -979,7 +1015,9 @@ def upload_material():
                 upload_date=date.today(),
             )
             db.session.add(material)
+            bump_content_version(course_id)
             db.session.commit()
+            queue_extraction(material.id)
             return redirect(url_for("manage_materials"))
     return render_template("upload_materials.html", courses=courses)
 
@@ -987,7 +1025,13 @@ def upload_material():
 @app.route("/manage_materials")
 def manage_materials():
     teacher_id = session.get("teacher_id")
-    materials = StudyMaterial.query.filter_by(teacher_id=teacher_id).all()
+    materials = paginate(
+        with_profile(
+            StudyMaterial.query.filter_by(teacher_id=teacher_id),
+            "teacher_material_list",
+        ),
+        [StudyMaterial.id],
+    )
     return render_template("manage_materials.html", materials=materials)
 
 
@@ -998,6 +1042,7 @@ def edit_material(id):
     if request.method == "POST":
         material.title = request.form["title"]
         material.description = request.form["description"]
+        bump_content_version(material.course_id)
         db.session.commit()
         return redirect(url_for("manage_materials"))
 
@@ -1008,11 +1053,13 @@ def edit_material(id):
 def delete_material(id):
     material = StudyMaterial.query.get_or_404(id)
     db.session.delete(material)
+    bump_content_version(material.course_id)
     db.session.commit()
     return redirect(url_for("manage_materials"))
 
 
 @app.route("/student/view_material_student/<int:course_id>")
+@conditional(student_etag)
 def view_material_student(course_id):
     student_id = session.get("student_id")
     if not student_id:
@@ -1043,19 +1090,16 @@ def student_progress():
     if not student_id:
         return redirect(url_for("login"))
 
-    student = Student.query.get_or_404(student_id)
+    student = current_user("student") or abort(404)
 
     # Student-related content
-    materials = StudyMaterial.query.all()
     course_ids = [c.id for c in student.courses]
+    content = student_content(course_ids)
 
-    recorded_classes = RecordedClass.query.filter(
-        RecordedClass.course_id.in_(course_ids)
-    ).all()
-
-    live_classes = LiveClass.query.filter(LiveClass.course_id.in_(course_ids)).all()
-
-    exams = Exam.query.filter(Exam.course_id.in_(course_ids)).all()
+    materials = content.materials
+    recorded_classes = content.recorded_classes
+    live_classes = content.live_classes
+    exams = content.exams
 
     # Fetch all progress records once
     progress_records = Progress.query.filter_by(student_id=student_id).all()
@@ -1086,11 +1130,15 @@ def student_progress():
             if not progress:
                 db.session.add(
                     Progress(
-                        student_id=student_id, material_id=m.id, completed=completed
+                        student_id=student_id,
+                        material_id=m.id,
+                        course_id=m.course_id,
+                        completed=completed,
                     )
                 )
             else:
                 progress.completed = completed
+                progress.course_id = m.course_id
 
         # Recorded Classes
         for rc in recorded_classes:
@@ -1104,11 +1152,13 @@ def student_progress():
                     Progress(
                         student_id=student_id,
                         recorded_class_id=rc.id,
+                        course_id=rc.course_id,
                         completed=completed,
                     )
                 )
             else:
                 progress.completed = completed
+                progress.course_id = rc.course_id
 
         # Live Classes
         for lc in live_classes:
@@ -1120,11 +1170,15 @@ def student_progress():
             if not progress:
                 db.session.add(
                     Progress(
-                        student_id=student_id, live_class_id=lc.id, completed=completed
+                        student_id=student_id,
+                        live_class_id=lc.id,
+                        course_id=lc.course_id,
+                        completed=completed,
                     )
                 )
             else:
                 progress.completed = completed
+                progress.course_id = lc.course_id
 
         # Exams ✅ FIXED
         for ex in exams:
@@ -1135,27 +1189,29 @@ def student_progress():
 
             if not progress:
                 db.session.add(
-                    Progress(student_id=student_id, exam_id=ex.id, completed=completed)
+                    Progress(
+                        student_id=student_id,
+                        exam_id=ex.id,
+                        course_id=ex.course_id,
+                        completed=completed,
+                    )
                 )
             else:
                 progress.completed = completed
+                progress.course_id = ex.course_id
 
         db.session.commit()
         return redirect(url_for("student_progress"))
 
     # ---------- Progress Percentage ----------
-    total_items = (
-        len(materials) + len(recorded_classes) + len(live_classes) + len(exams)
+    _, total_items, percent = progress_percent(
+        get_summaries(student_id, course_ids).values()
     )
 
-    completed_count = sum(1 for p in progress_records if p.completed)
-
-    progress_percent = int((completed_count / total_items) * 100) if total_items else 0
-
     return render_template(
         "student_progress.html",
         student=student,
-        progress=progress_percent,
+        progress=percent,
         total_items=total_items,
         materials=materials,
         recorded_classes=recorded_classes,
@@ -1178,6 +1234,18 @@ def update_progress():
     item_id = request.form.get("id")
     completed = request.form.get("completed") == "true"
 
+    item_models = {
+        "material": StudyMaterial,
+        "recorded": RecordedClass,
+        "live": LiveClass,
+        "exam": Exam,
+    }
+    if item_type not in item_models:
+        return "", 400
+    item = db.session.get(item_models[item_type], item_id)
+    if not item:
+        return "", 404
+
     progress = None
 
     # Fetch existing progress
@@ -1213,6 +1281,7 @@ def update_progress():
 
         db.session.add(progress)
 
+    progress.course_id = item.course_id
     progress.completed = completed
     progress.completion_date = datetime.utcnow() if completed else None
 
@@ -1221,19 +1290,19 @@ def update_progress():
 
 
 @app.route("/student/view_classes")
+@conditional(student_etag)
 def student_view_classes():
     student_id = session.get("student_id")
     if not student_id:
         return redirect(url_for("login"))
 
-    student = Student.query.get_or_404(student_id)
+    student = with_profile(Student.query, "student_courses").get_or_404(student_id)
     course_ids = [c.id for c in student.courses]
 
-    recorded_classes = RecordedClass.query.filter(
-        RecordedClass.course_id.in_(course_ids)
-    ).all()
+    content = student_content(course_ids)
+    recorded_classes = content.recorded_classes
 
-    live_classes = LiveClass.query.filter(LiveClass.course_id.in_(course_ids)).all()
+    live_classes = content.live_classes
 
     progresses = Progress.query.filter_by(student_id=student_id).all()
 
@@ -1339,8 +1408,8 @@ def admin_add_course():
             flash("Course name is required", "danger")
             return redirect(url_for("admin_add_course"))
 
-        # Validation: Duplicate course name
-        if Course.query.filter_by(name=name).first():
+        # Validation: Duplicate course name (a deleted one keeps its name until purged)
+        if Course.query.execution_options(include_deleted=True).filter_by(name=name).first():
             flash("Course already exists", "warning")
             return redirect(url_for("admin_add_course"))
         # Create course
@@ -1360,8 +1429,10 @@ def admin_add_course():
 
 
 @app.route("/courses")
+@conditional(catalog_etag, private=False)
 def courses():
-    courses = Course.query.all()
+    # Only queried when the cached catalog fragment is missing
+    courses = Course.query.order_by(Course.id)
     return render_template("courses.html", courses=courses)
 
 
@@ -1370,7 +1441,7 @@ def student_view_course():
     student_id = session.get("student_id")
     if not student_id:
         return redirect(url_for("login"))
-    student = Student.query.get(student_id)
+    student = current_user("student")
     if not student.course_id:
         return redirect(url_for("student_dashboard"))
     courses = []
@@ -1397,29 +1468,21 @@ def enroll_course():
 
 
 @app.route("/admin/view_course")
+@conditional(catalog_etag)
 def view_course():
-    courses = Course.query.all()
+    courses = paginate(with_profile(Course.query, "course_catalog"), [Course.id])
     return render_template("view_course.html", courses=courses)
 
 
 @app.route("/admin/delete_course/<int:id>", methods=["GET", "POST"])
+@admin_required
 def delete_course(id):
     course = Course.query.get_or_404(id)
 
     if request.method == "POST":
-        # Save deleted data to session for undo
-        session["deleted_course"] = {
-            "id": course.id,
-            "name": course.name,
-            "description": course.description,
-            "teacher_ids": [
-                teacher.id for teacher in course.teachers
-            ],  # store teacher IDs
-        }
-
-        # Delete the course from database
-        db.session.delete(course)
-        db.session.commit()
+        # Hidden now, purged in the background once the undo window closes
+        soft_delete_course(course)
+        session["deleted_course"] = course.id
 
         flash("Course deleted successfully.", "success")
         return redirect(url_for("view_course"))
@@ -1428,24 +1491,12 @@ def delete_course(id):
 
 
 @app.route("/admin/undo_delete_course", methods=["POST"])
+@admin_required
 def undo_delete_course():
-    data = session.get("deleted_course")
-
-    if data:
-        # Recreate the course
-        course = Course(name=data["name"], description=data["description"])
-
-        # Restore teachers (many-to-many)
-        course.teachers = Teacher.query.filter(
-            Teacher.id.in_(data["teacher_ids"])
-        ).all()
-
-        db.session.add(course)
-        db.session.commit()
-
-        # Remove from session
-        session.pop("deleted_course", None)
+    course_id = session.pop("deleted_course", None)
 
+    # Materials, classes, exams, enrollments and progress all come back with it
+    if isinstance(course_id, int) and restore_course(course_id):
         flash("Course restored successfully.", "success")
     else:
         flash(" No course to restore.", "warning")
@@ -1465,6 +1516,7 @@ def edit_course(id):
 
         course.name = name
         course.description = description
+        bump_content_version(course.id)
         db.session.commit()
         return redirect(url_for("view_course"))
     return render_template("admin_edit_course.html", course=course)
@@ -1486,17 +1538,14 @@ def change_password():
             return redirect(url_for("change_password"))
 
         # Check in all user tables
-        user = (
-            Student.query.filter_by(email=email).first()
-            or Teacher.query.filter_by(email=email).first()
-        )
+        user = find_user(email)
 
         if not user:
             flash("No user found with this email", "danger")
             return redirect(url_for("change_password"))
 
         # Update password
-        user.password = generate_password_hash(new_password)
+        user.password = hash_password(new_password)
         db.session.commit()
 
         flash("Password updated successfully!", "success")
@@ -1506,6 +1555,7 @@ def change_password():
 
 
 @app.route("/student/enrolled_courses")
+@conditional(student_etag)
 def enrolled_courses():
     student_id = session.get("student_id")
     if not student_id:
@@ -1513,7 +1563,7 @@ def enrolled_courses():
         return redirect(url_for("login"))
 
     # Fetch the student
-    student = Student.query.get(student_id)
+    student = with_profile(Student.query, "student_enrolled_courses").get(student_id)
     if not student:
         return "Student not found", 404
 
@@ -1529,7 +1579,7 @@ def teacher_student_progress_view(student_id):
     if not teacher_id:
         return redirect(url_for("teacher_login"))
 
-    teacher = Teacher.query.get_or_404(teacher_id)
+    teacher = current_user("teacher") or abort(404)
 
     # Teacher's course IDs
     teacher_course_ids = [course.id for course in teacher.courses]
@@ -1545,23 +1595,20 @@ def teacher_student_progress_view(student_id):
     )
 
     # Fetch progress ONLY from teacher's courses
-    progress = (
+    progress = with_profile(
         Progress.query.filter(
             Progress.student_id == student.id,
             Progress.course_id.in_(teacher_course_ids),
-        )
-        .options(
-            joinedload(Progress.material),
-            joinedload(Progress.recorded_class),
-            joinedload(Progress.live_class),
-            joinedload(Progress.exam),
-        )
-        .all()
+        ),
+        "progress_detail",
+    ).all()
+    shared_course_ids = [
+        c.id for c in student.courses if c.id in set(teacher_course_ids)
+    ]
+    completed_items, total_items, percent = progress_percent(
+        get_summaries(student.id, shared_course_ids).values()
     )
-    total_items = len(progress)
-    completed_items = sum(1 for p in progress if p.completed)
     pending_items = total_items - completed_items
-    progress_percent = int((completed_items / total_items) * 100) if total_items else 0
 
     return render_template(
         "teacher_student_progress_view.html",
@@ -1570,7 +1617,7 @@ def teacher_student_progress_view(student_id):
         total_items=total_items,
         completed_items=completed_items,
         pending_items=pending_items,
-        progress_percent=progress_percent,
+        progress_percent=percent,
     )
 
 
@@ -1580,7 +1627,7 @@ def teacher_student_progress_table():
     if not teacher_id:
         return redirect(url_for("teacher_login"))
 
-    teacher = Teacher.query.get_or_404(teacher_id)
+    teacher = current_user("teacher") or abort(404)
 
     # Teacher's course IDs
     teacher_course_ids = [course.id for course in teacher.courses]
@@ -1591,33 +1638,33 @@ def teacher_student_progress_table():
         )
 
     # Students enrolled in teacher's courses ONLY
-    students = (
-        Student.query.join(Student.courses)
+    query = (
+        db.session.query(Student.id, Student.name)
+        .join(Student.courses)
         .filter(Course.id.in_(teacher_course_ids))
         .distinct()
-        .all()
     )
 
-    student_progress = []
-
-    for student in students:
-        progress_records = Progress.query.filter(
-            Progress.student_id == student.id,
-            Progress.course_id.in_(teacher_course_ids),
-        ).all()
-
-        total_items = len(progress_records)
-        completed_items = sum(1 for p in progress_records if p.completed)
-
-        progress_percent = (
-            int((completed_items / total_items) * 100) if total_items else 0
-        )
-
-        student_progress.append(
-            {"id": student.id, "name": student.name, "progress": progress_percent}
+    def with_progress(students):
+        # One summary row per (student, shared course), a batch at a time
+        summaries = {}
+        pairs = enrolled_pairs(
+            student_ids=[sid for sid, _ in students], course_ids=teacher_course_ids
         )
-
-    return render_template(
+        # No commit here: it would close the cursor the rows stream from
+        for (sid, _), summary in ensure_summaries(pairs, persist=False).items():
+            summaries.setdefault(sid, []).append(summary)
+        return [
+            {
+                "id": sid,
+                "name": name,
+                "progress": progress_percent(summaries.get(sid, []))[2],
+            }
+            for sid, name in students
+        ]
+
+    student_progress = stream_rows(query, [Student.id], transform=with_progress)
+    return render_list(
         "teacher_student_progress_table.html", student_progress=student_progress
     )
 
@@ -1628,7 +1675,7 @@ def create_exam():
     if not teacher_id:
         return redirect(url_for("login"))
 
-    teacher = Teacher.query.get(teacher_id)
+    teacher = current_user("teacher")
 
     if request.method == "POST":
         title = request.form["title"]
@@ -1642,6 +1689,7 @@ def create_exam():
         )
 
         db.session.add(exam)
+        bump_content_version(course_id)
         db.session.commit()
 
         questions = request.form.getlist("question")
@@ -1675,22 +1723,17 @@ def student_exams():
     if not student_id:
         return redirect(url_for("login"))
 
-    student = Student.query.get_or_404(student_id)
+    student = current_user("student") or abort(404)
     course_ids = [c.id for c in student.courses]
 
     # ✅ Only exams assigned to student's courses
-    exams = (
-        Exam.query.filter(Exam.course_id.in_(course_ids))
-        .order_by(Exam.created_at.desc())
-        .all()
-    )
+    exams = student_content(course_ids).exams
 
-    attempts = ExamAttempt.query.filter_by(student_id=student_id).all()
-    attended_exam_ids = {a.exam_id for a in attempts}
-    attempt_dates = {a.exam_id: a.attended_date for a in attempts if a.attended_date}
+    attempts = readmodels.exam_attempt_dates(student_id)
+    attended_exam_ids = set(attempts)
+    attempt_dates = {eid: when for eid, when in attempts.items() if when}
 
-    results = ExamResult.query.filter_by(student_id=student_id).all()
-    result_exam_ids = {r.exam_id for r in results}
+    result_exam_ids = readmodels.result_exam_ids(student_id)
 
     return render_template(
         "student_exam_list.html",
@@ -1752,7 +1795,7 @@ def submit_exam(exam_id):
 
     # Fetch exam and student
     exam = Exam.query.get_or_404(exam_id)
-    student = Student.query.get_or_404(student_id)
+    student = current_user("student") or abort(404)
 
     # Get submitted answers from form
     submitted_answers = request.form  # Example: {'1': 'A', '2': 'C'}
@@ -1852,7 +1895,7 @@ def view_exam_result(exam_id):
 @app.route("/created_exams", methods=["GET", "POST"])
 def created_exams():
     teacher_id = session.get("teacher_id")
-    exams = Exam.query.filter_by(teacher_id=teacher_id).all()
+    exams = paginate(Exam.query.filter_by(teacher_id=teacher_id), [Exam.id.desc()])
     return render_template("created_exams.html", exams=exams)
 
 
@@ -1862,22 +1905,19 @@ def admin_student_progress(student_id):
 
     student = Student.query.get_or_404(student_id)
 
-    progress_records = Progress.query.filter_by(student_id=student.id).all()
-
-    total_items = len(progress_records)
-    completed_items = sum(1 for p in progress_records if p.completed)
+    progress_records = with_profile(
+        Progress.query.filter_by(student_id=student.id), "progress_detail"
+    ).all()
 
-    progress_percent = (
-        int((completed_items / total_items) * 100) if total_items > 0 else 0
+    _, _, percent = progress_percent(
+        get_summaries(student.id, [c.id for c in student.courses]).values()
     )
 
-    print("DEBUG:", Progress, type(Progress))
-
     return render_template(
         "admin_student_progress.html",
         student=student,
         progress_records=progress_records,
-        progress_percent=progress_percent,
+        progress_percent=percent,
     )
 
 
@@ -1890,7 +1930,7 @@ def student_feedback():
     if not student_id:
         return redirect(url_for("login"))
 
-    student = Student.query.get_or_404(student_id)
+    student = current_user("student") or abort(404)
     courses = student.courses  # enrolled courses
 
     if request.method == "POST":
@@ -1930,12 +1970,6 @@ def student_feedback():
 def teacher_feedbacks():
     teacher_id = session.get("teacher_id")
 
-    feedbacks = (
-        Feedback.query.filter_by(teacher_id=teacher_id)
-        .order_by(Feedback.created_at.desc())
-        .all()
-    )
-
     if request.method == "POST":
         feedback_id = request.form.get("feedback_id")
         reply = request.form.get("reply")
@@ -1944,40 +1978,240 @@ def teacher_feedbacks():
         if feedback and reply:
             feedback.reply = reply
             feedback.replied_at = datetime.utcnow()
+            announce_feedback_reply(feedback)
             db.session.commit()
         return redirect(url_for("teacher_feedbacks"))
+
+    # Newest first; ids grow with created_at
+    feedbacks = paginate(
+        Feedback.query.filter_by(teacher_id=teacher_id), [Feedback.id.desc()]
+    )
     return render_template("teacher_feedbacks.html", feedbacks=feedbacks)
 
 
 @app.route("/student/my-feedbacks")
 def student_my_feedbacks():
     student_id = session.get("student_id")
-    feedbacks = Feedback.query.filter_by(student_id=student_id).all()
+    feedbacks = paginate(
+        Feedback.query.filter_by(student_id=student_id), [Feedback.id]
+    )
     return render_template("student_view_reply.html", feedbacks=feedbacks)
 
 
+# Live notifications for the development server only: each stream holds a
+# worker. In production NOTIFY_URL is routed to events_app (see notifications.py)
+def events():
+    student_id = session.get("student_id")
+    if not student_id:
+        return "Login required.", 401
+    last_id = last_event_id(request.headers.get("Last-Event-ID"))
+    replay = last_id is not None
+    if not replay:
+        last_id = latest_id()
+    return poll_stream(app, student_topics(student_id), last_id, replay)
+
+
+if app.config["NOTIFY_DEV_STREAM"]:
+    app.add_url_rule(app.config["NOTIFY_URL"], view_func=events)
+
+
+events_app = create_events_app(app)
+
+
 @app.route("/admin/material")
 @admin_required
 def admin_material():
     search = request.args.get("search")
     course_id = request.args.get("course_id")
     courses = Course.query.all()
-    query = StudyMaterial.query
+    query = with_profile(StudyMaterial.query, "admin_material_list")
+    order_by = [StudyMaterial.id]
 
     if search:
-        query = query.filter(StudyMaterial.title.ilike(f"%{search}%"))
+        query, rank = ranked_search(query, StudyMaterial, search)
+        order_by = [rank.desc(), StudyMaterial.id]
 
     if course_id:
-        query = (
-            query.join(StudyMaterial.courses)
-            .filter(Course.id == int(course_id))
-            .distinct()
+        query = query.filter(StudyMaterial.course_id == int(course_id))
+
+    materials = paginate(query, order_by, estimate_total=True)
+
+    return render_list("admin_material.html", materials=materials, courses=courses)
+
+
+@app.route("/search")
+def unified_search():
+    term = request.args.get("q", "").strip()
+    kind = request.args.get("type")
+    limit = request.args.get("limit", 10, type=int)
+    after = request.args.get("after")
+
+    # Admins can search everything; others only their own courses' materials
+    if session.get("admin_id"):
+        allowed, course_ids = list(SEARCH_KINDS), None
+    elif session.get("student_id") or session.get("teacher_id"):
+        allowed = ["courses", "materials", "contents"]
+        if session.get("student_id"):
+            course_ids = [
+                row.course_id
+                for row in db.session.query(student_course.c.course_id).filter(
+                    student_course.c.student_id == session["student_id"]
+                )
+            ]
+        else:
+            course_ids = readmodels.teacher_course_ids(session["teacher_id"])
+    else:
+        return jsonify({"error": "Login required"}), 401
+
+    if kind and kind not in allowed:
+        return jsonify({"error": "Unknown search type"}), 400
+    if not term:
+        return jsonify({"results": [], "next": None})
+
+    if kind:
+        results, next_cursor = search_page(
+            kind, term, limit=limit, after=after, course_ids=course_ids
+        )
+        return jsonify({"results": results, "next": next_cursor})
+
+    # Typeahead across all allowed kinds: top few of each, no paging
+    results = []
+    for k in allowed:
+        page, _ = search_page(k, term, limit=min(limit, 5), course_ids=course_ids)
+        results.extend(page)
+    return jsonify({"results": results, "next": None})
+
+
+@app.cli.command("search-rebuild")
+def search_rebuild_command():
+    """Re-sync the full-text search index."""
+    print(f"Search index rebuilt ({rebuild_search_index()} backend)")
+
+
+@app.cli.command("extract-materials")
+def extract_materials_command():
+    """Extract text from materials that have not been indexed yet."""
+    pending = (
+        db.session.query(StudyMaterial.id)
+        .outerjoin(MaterialExtraction)
+        .filter(
+            (MaterialExtraction.status.is_(None))
+            | (MaterialExtraction.status != "done")
+        )
+        .all()
+    )
+    for (material_id,) in pending:
+        print(material_id, extract_material(material_id))
+
+
+@app.cli.command("progress-rebuild")
+@click.option("--verify-only", is_flag=True, help="Report drift without fixing it.")
+@click.option("--full", is_flag=True, help="Drop and recompute every summary row.")
+def progress_rebuild_command(verify_only, full):
+    """Check progress_summary against the raw Progress rows and repair drift."""
+    if full:
+        print(f"Rebuilt {rebuild_summaries()} progress summaries")
+        return
+    mismatches = verify_summaries(fix=not verify_only)
+    action = "found" if verify_only else "fixed"
+    print(f"{mismatches} mismatched progress summaries {action}")
+
+
+@app.cli.command("progress-backfill")
+@click.option("--batch-size", default=1000, show_default=True)
+@click.option("--start-after", default=0, help="Resume after this progress id.")
+@click.option("--pause", default=0.0, help="Seconds to sleep between batches.")
+def progress_backfill_command(batch_size, start_after, pause):
+    """Fill progress.course_id for rows written before it was recorded."""
+    total = 0
+    for last_id, updated in backfill_progress_courses(batch_size, start_after, pause):
+        total += updated
+        print(f"up to id {last_id}: {updated} rows")
+    print(f"Backfilled course_id on {total} progress rows")
+
+
+@app.cli.command("accounts-rebuild")
+def accounts_rebuild_command():
+    """Recreate the account lookup table from the user tables."""
+    print(f"Rebuilt {rebuild_accounts()} accounts")
+
+
+@app.cli.command("passwords-calibrate")
+@click.option("--target-ms", default=250, show_default=True)
+@click.option("--kind", type=click.Choice(["scrypt", "pbkdf2"]), default="scrypt")
+def passwords_calibrate_command(target_ms, kind):
+    """Suggest a PASSWORD_HASH_METHOD costing about target-ms on this machine."""
+    method, ms = calibrate(target_ms, kind)
+    print(f"PASSWORD_HASH_METHOD={method}  ({ms:.0f} ms per hash)")
+
+
+@app.cli.command("import-users")
+@click.argument("kind", type=click.Choice(IMPORT_KINDS))
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--errors", "errors_file", type=click.Path(dir_okay=False),
+              help="Write rejected rows here (default: <path>.errors.csv).")
+@click.option("--batch-size", default=1000, show_default=True)
+def import_users_command(kind, path, errors_file, batch_size):
+    """Bulk import students, teachers or enrollments from a CSV/XLSX file."""
+    with open(path, "rb") as f:
+        report = import_rows(
+            kind,
+            read_rows(f, path),
+            batch_size=batch_size,
+            hash_workers=app.config["IMPORT_HASH_WORKERS"],
+            on_batch=lambda r: print(f"{r.rows} rows, {r.created} created, {r.failed} rejected"),
         )
+    errors_file = errors_file or path + ".errors.csv"
+    with open(errors_file, "w", newline="") as f:
+        report.write_errors(f)
+    print(
+        f"Done: {report.created} created, {report.enrolled} enrollments, "
+        f"{report.failed} rejected (see {errors_file})"
+    )
 
-    materials = query.all()
 
-    return render_template("admin_material.html", materials=materials, courses=courses)
+@app.cli.command("export")
+@click.argument("name", type=click.Choice(list(EXPORTS)))
+@click.argument("output", type=click.Path(dir_okay=False))
+@click.option("--format", "fmt", type=click.Choice(EXPORT_FORMATS), default="csv")
+@click.option("--teacher-id", type=int, help="Only this teacher's courses.")
+def export_command(name, output, fmt, teacher_id):
+    """Export gradebook, attendance or progress rows to CSV or Parquet."""
+    query = EXPORTS[name](teacher_id)
+    if fmt == "parquet":
+        print(f"Wrote {write_parquet(query, output)} rows to {output}")
+        return
+    with open(output, "w", newline="") as f:
+        for chunk in iter_csv(query):
+            f.write(chunk)
+    print(f"Wrote {output}")
+
+
+@app.cli.command("assets-build")
+def assets_build():
+    """Fingerprint, bundle and precompress static assets into static/dist."""
+    written, compressed, missing = build_assets(app.static_folder)
+    for path in missing:
+        print(f"Skipped missing bundle source {path}")
+    print(f"Wrote {written} assets and {compressed} compressed variants")
+
+
+@app.cli.command("worker")
+@click.option("--threads", type=int, help="Jobs run at once per process (JOB_THREADS).")
+@click.option("--processes", type=int, help="Worker processes (JOB_PROCESSES).")
+@click.option("--kind", "kinds", multiple=True, type=click.Choice(sorted(JOBS)),
+              help="Only run these job kinds; repeatable.")
+@click.option("--once", is_flag=True, help="Exit when the queue is empty.")
+def worker_command(threads, processes, kinds, once):
+    """Run queued background jobs until interrupted."""
+    if (processes or app.config["JOB_PROCESSES"]) > 1 and (
+        "fork" not in multiprocessing.get_all_start_methods()
+    ):
+        raise click.UsageError("Several processes need fork(); run one worker per process.")
+    run_worker(app, threads=threads, processes=processes, kinds=kinds, once=once)
 
 
 if __name__ == "__main__":
+    # The development server runs its own worker; deployments use `flask worker`
+    start_worker_thread(app)
     app.run()
@@ -0,0 +1,272 @@
+import gzip
+import hashlib
+import json
+import os
+import re
+import shutil
+
+from flask import current_app, request, send_from_directory, url_for
+
+try:
+    import brotli
+except ImportError:  # .br variants are skipped without it
+    brotli = None
+
+try:
+    from rcssmin import cssmin
+except ImportError:
+    cssmin = None
+
+try:
+    from rjsmin import jsmin
+except ImportError:
+    jsmin = None
+
+
+# --------------------------------------------------
+# Static asset pipeline
+# --------------------------------------------------
+# `flask assets-build` copies every static asset into static/dist/ under a
+# content-hashed name, concatenates the per-page bundles below, rewrites CSS
+# url()s to the hashed files, precompresses text assets (.gz, plus .br when
+# brotli is installed) and writes static/dist/manifest.json. Templates call
+# asset_url("assets/css/owl.css") and bundle_urls("site.css"); with no
+# manifest they fall back to the plain static files. Hashed files are served
+# with a one-year immutable Cache-Control and the best precompressed variant.
+
+DIST_DIR = "dist"
+MANIFEST = "manifest.json"
+SKIP_DIRS = ("dist", "uploads", "photos")  # build output and user uploads
+COMPRESSIBLE = (".css", ".js", ".svg", ".json", ".txt", ".map", ".ttf", ".eot", ".otf", ".ico")
+MIN_COMPRESS_BYTES = 1024
+
+# bundle name -> source files (relative to static/), in load order
+BUNDLES = {
+    "site.css": [
+        "vendor/bootstrap/css/bootstrap.min.css",
+        "assets/css/fontawesome.css",
+        "assets/css/templatemo-grad-school.css",
+        "assets/css/owl.css",
+        "assets/css/lightbox.css",
+    ],
+    "site.js": [
+        "vendor/jquery/jquery.min.js",
+        "vendor/bootstrap/js/bootstrap.bundle.min.js",
+        "assets/js/isotope.min.js",
+        "assets/js/owl-carousel.js",
+        "assets/js/lightbox.js",
+        "assets/js/tabs.js",
+        "assets/js/video.js",
+        "assets/js/slick-slider.js",
+        "assets/js/custom.js",
+    ],
+    "admin.css": [
+        "admin/assets/css/bootstrap.min.css",
+        "admin/assets/css/plugins.min.css",
+        "admin/assets/css/kaiadmin.min.css",
+    ],
+}
+
+CSS_URL = re.compile(r"""url\(\s*(['"]?)([^'")]+)\1\s*\)""")
+
+_manifest = {}
+_manifest_mtime = None
+
+
+def init_assets(app):
+    app.config.setdefault("ASSET_MAX_AGE", 365 * 24 * 3600)
+    app.view_functions["static"] = serve_static
+
+    @app.context_processor
+    def inject_asset_url():
+        return {"asset_url": asset_url, "bundle_urls": bundle_urls}
+
+
+# ---------------- Lookup ----------------
+
+
+def _manifest_path():
+    return os.path.join(current_app.static_folder, DIST_DIR, MANIFEST)
+
+
+def _load_manifest():
+    """Reload the manifest whenever a build replaces it."""
+    global _manifest, _manifest_mtime
+    try:
+        mtime = os.path.getmtime(_manifest_path())
+    except OSError:
+        _manifest, _manifest_mtime = {}, None
+        return _manifest
+    if mtime != _manifest_mtime:
+        with open(_manifest_path()) as f:
+            _manifest, _manifest_mtime = json.load(f), mtime
+    return _manifest
+
+
+def asset_url(name):
+    """URL of a static asset or bundle, fingerprinted when a build exists."""
+    hashed = _load_manifest().get(name)
+    return url_for("static", filename=hashed or name)
+
+
+def bundle_urls(name):
+    """The bundle's URL after a build, else one URL per source file."""
+    if name in _load_manifest():
+        return [asset_url(name)]
+    return [url_for("static", filename=path) for path in BUNDLES[name]]
+
+
+def serve_static(filename):
+    if not filename.startswith(DIST_DIR + "/"):
+        return current_app.send_static_file(filename)
+
+    folder = current_app.static_folder
+    accepted = request.accept_encodings
+    variant = filename
+    for suffix, name in ((".br", "br"), (".gz", "gzip")):
+        if accepted[name] and os.path.isfile(os.path.join(folder, filename + suffix)):
+            variant = filename + suffix
+            break
+
+    # For a .gz/.br variant werkzeug sets the original type and Content-Encoding
+    response = send_from_directory(
+        folder, variant, max_age=current_app.config["ASSET_MAX_AGE"]
+    )
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    response.vary.add("Accept-Encoding")
+    return response
+
+
+# ---------------- Build ----------------
+
+
+def _hashed_name(path, data):
+    digest = hashlib.sha256(data).hexdigest()[:12]
+    base, ext = os.path.splitext(path)
+    return f"{DIST_DIR}/{base}.{digest}{ext}"
+
+
+def _rewrite_css(css, source, manifest):
+    """Point url()s at hashed files (as /dist/... until _relative_urls)."""
+
+    def replace(match):
+        url = match.group(2).strip()
+        if url.startswith(("data:", "http:", "https:", "//", "#", "/")):
+            return match.group(0)
+        path, _, fragment = url.partition("#")
+        path = path.partition("?")[0]
+        target = os.path.normpath(os.path.join(os.path.dirname(source), path))
+        hashed = manifest.get(target.replace(os.sep, "/"))
+        if not hashed:
+            return match.group(0)
+        url = "/" + hashed  # absolute under the static folder, fixed below
+        url += ("#" + fragment) if fragment else ""
+        return f'url("{url}")'
+
+    return CSS_URL.sub(replace, css)
+
+
+def _relative_urls(css, output):
+    # Hashed url("/dist/...") -> path relative to the CSS file's own location
+    out_dir = os.path.dirname(output)
+
+    def replace(match):
+        url = match.group(2)
+        if not url.startswith("/" + DIST_DIR + "/"):
+            return match.group(0)
+        return f'url("{os.path.relpath(url[1:], out_dir)}")'
+
+    return CSS_URL.sub(replace, css)
+
+
+def _minify(path, text):
+    if path.endswith(".css") and cssmin and not path.endswith(".min.css"):
+        return cssmin(text)
+    if path.endswith(".js") and jsmin and not path.endswith(".min.js"):
+        return jsmin(text)
+    return text
+
+
+def _write(static, name, data, written):
+    full = os.path.join(static, name)
+    os.makedirs(os.path.dirname(full), exist_ok=True)
+    with open(full, "wb") as f:
+        f.write(data)
+    written.append(name)
+
+
+def _compress(static, name):
+    full = os.path.join(static, name)
+    if not name.endswith(COMPRESSIBLE) or os.path.getsize(full) < MIN_COMPRESS_BYTES:
+        return 0
+    with open(full, "rb") as f:
+        data = f.read()
+    count = 0
+    variants = [(".gz", gzip.compress(data, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        variants.append((".br", brotli.compress(data, quality=11)))
+    for suffix, packed in variants:
+        if len(packed) < len(data):
+            with open(full + suffix, "wb") as f:
+                f.write(packed)
+            count += 1
+    return count
+
+
+def build_assets(static):
+    """Build static/dist; returns (files written, compressed variants, missing)."""
+    dist = os.path.join(static, DIST_DIR)
+    shutil.rmtree(dist, ignore_errors=True)
+
+    sources = []
+    for root, dirs, files in os.walk(static):
+        rel_root = os.path.relpath(root, static)
+        if rel_root == ".":
+            dirs[:] = [d for d in dirs if d not in SKIP_DIRS]
+        for name in files:
+            sources.append(os.path.normpath(os.path.join(rel_root, name)).replace(os.sep, "/"))
+
+    manifest, written, missing = {}, [], []
+    # Non-CSS first so CSS url()s can point at their hashed names
+    for path in sorted(sources, key=lambda p: p.endswith(".css")):
+        with open(os.path.join(static, path), "rb") as f:
+            data = f.read()
+        if path.endswith((".css", ".js")):
+            text = data.decode("utf-8", "replace")
+            if path.endswith(".css"):
+                text = _rewrite_css(text, path, manifest)
+            text = _minify(path, text)
+            hashed = _hashed_name(path, text.encode())
+            if path.endswith(".css"):
+                text = _relative_urls(text, hashed)
+            data = text.encode()
+        else:
+            hashed = _hashed_name(path, data)
+        _write(static, hashed, data, written)
+        manifest[path] = hashed
+
+    for bundle, files in BUNDLES.items():
+        parts = []
+        for path in files:
+            if path not in manifest:
+                missing.append(path)  # the page got a 404 for it anyway
+                continue
+            with open(os.path.join(static, path), encoding="utf-8", errors="replace") as f:
+                text = f.read()
+            if bundle.endswith(".css"):
+                text = _minify(path, _rewrite_css(text, path, manifest))
+            else:
+                text = _minify(path, text).rstrip() + "\n;"
+            parts.append(f"/* {path} */\n{text}")
+        text = "\n".join(parts)
+        hashed = _hashed_name(f"bundles/{bundle}", text.encode())
+        if bundle.endswith(".css"):
+            text = _relative_urls(text, hashed)
+        _write(static, hashed, text.encode(), written)
+        manifest[bundle] = hashed
+
+    compressed = sum(_compress(static, name) for name in written)
+    with open(os.path.join(dist, MANIFEST), "w") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    return len(written), compressed, missing
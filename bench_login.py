@@ -0,0 +1,84 @@
+"""Compare the old per-table login probe with the account lookup.
+
+Runs against a throwaway SQLite database file:
+
+    python bench_login.py [users]
+"""
+import os
+import sys
+import tempfile
+import time
+
+from flask import Flask
+from werkzeug.security import generate_password_hash
+
+from extensions import db
+from models import Student, Teacher
+from identity import authenticate, rebuild_accounts
+from passwords import init_passwords
+
+USERS = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+LOGINS = 2_000
+# Cheap hash so the timings show the lookups, not PBKDF2
+METHOD = "pbkdf2:sha256:1"
+HASH = generate_password_hash("secret", method=METHOD)
+
+path = os.path.join(tempfile.mkdtemp(), "bench.sqlite")
+app = Flask(__name__)
+app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{path}"
+app.config["PASSWORD_HASH_METHOD"] = METHOD
+db.init_app(app)
+init_passwords(app)
+
+
+def seed():
+    db.create_all()
+    common = {"password": HASH}
+    db.session.execute(
+        Student.__table__.insert(),
+        [
+            {**common, "name": f"S{i}", "email": f"student{i}@example.com", "age": 20, "grade": "A"}
+            for i in range(USERS)
+        ],
+    )
+    db.session.execute(
+        Teacher.__table__.insert(),
+        [
+            {
+                **common, "name": f"T{i}", "email": f"teacher{i}@example.com",
+                "qualifications": "-", "availability": "-", "years_of_experience": 1,
+                "contact": "0000000000", "place": "-",
+            }
+            for i in range(USERS)
+        ],
+    )
+    db.session.commit()
+    rebuild_accounts()
+
+
+def probe_tables(email, password):
+    from werkzeug.security import check_password_hash
+
+    student = Student.query.filter_by(email=email).first()
+    if student and check_password_hash(student.password, password):
+        return "student", student.id
+    teacher = Teacher.query.filter_by(email=email).first()
+    if teacher and check_password_hash(teacher.password, password):
+        return "teacher", teacher.id
+    return None
+
+
+def measure(label, login):
+    emails = [f"teacher{(i * 7919) % USERS}@example.com" for i in range(LOGINS)]
+    db.session.expunge_all()
+    start = time.perf_counter()
+    for email in emails:
+        assert login(email, "secret")
+    elapsed = time.perf_counter() - start
+    print(f"{label:<8} {LOGINS / elapsed:>8.0f} logins/s  {1e6 * elapsed / LOGINS:>7.0f} us/login")
+
+
+with app.app_context():
+    seed()
+    measure("tables", probe_tables)
+    measure("account", authenticate)
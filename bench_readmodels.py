@@ -0,0 +1,83 @@
+"""Compare ORM entities with readmodels rows for a 10k-row list page.
+
+Runs against a throwaway in-memory SQLite database:
+
+    python bench_readmodels.py [rows]
+"""
+import sys
+import time
+import tracemalloc
+from datetime import date
+
+from flask import Flask, render_template_string
+from sqlalchemy.orm import joinedload
+
+from extensions import db
+from models import Course, RecordedClass, Teacher
+import readmodels
+
+ROWS = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+
+TEMPLATE = """{% for cls in rows %}<tr><td>{{ cls.title }}</td>
+<td>{{ cls.date.strftime('%Y-%m-%d') }}</td>
+<td>{{ cls.course.name if cls.course else 'N/A' }}</td></tr>{% endfor %}"""
+
+app = Flask(__name__)
+app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///:memory:"
+db.init_app(app)
+
+
+def seed():
+    db.create_all()
+    teacher = Teacher(
+        name="Bench", email="bench@example.com", password="x", qualifications="-",
+        availability="-", years_of_experience=1, contact="0000000000", place="-",
+    )
+    courses = [Course(name=f"Course {i}", description="-") for i in range(10)]
+    db.session.add(teacher)
+    db.session.add_all(courses)
+    db.session.flush()
+    db.session.execute(
+        RecordedClass.__table__.insert(),
+        [
+            {
+                "teacher_id": teacher.id,
+                "course_id": courses[i % 10].id,
+                "title": f"Recorded class {i}",
+                "date": date.today(),
+                "filename": f"class{i}.mp4",
+            }
+            for i in range(ROWS)
+        ],
+    )
+    db.session.commit()
+    return [c.id for c in courses]
+
+
+def measure(label, load):
+    db.session.expunge_all()
+    tracemalloc.start()
+    start = time.perf_counter()
+    rows = load()
+    loaded = time.perf_counter()
+    current, _ = tracemalloc.get_traced_memory()
+    render_template_string(TEMPLATE, rows=rows)
+    rendered = time.perf_counter()
+    tracemalloc.stop()
+    print(
+        f"{label:<10} {len(rows):>7} rows  "
+        f"{current / len(rows):>7.0f} B/row  "
+        f"load {1000 * (loaded - start):>7.1f} ms  "
+        f"render {1000 * (rendered - loaded):>7.1f} ms"
+    )
+
+
+with app.app_context(), app.test_request_context():
+    course_ids = seed()
+    measure(
+        "orm",
+        lambda: RecordedClass.query.options(joinedload(RecordedClass.course))
+        .filter(RecordedClass.course_id.in_(course_ids))
+        .all(),
+    )
+    measure("readmodel", lambda: readmodels.recorded_classes_for(course_ids))
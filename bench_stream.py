@@ -0,0 +1,93 @@
+"""Compare a buffered render with a streamed one for a large list page.
+
+Seeds a throwaway SQLite database, then renders the admin student table
+once per mode, each in a fresh process so peak RSS is measured separately:
+
+    python bench_stream.py [rows]
+"""
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from flask import Flask, render_template
+from jinja2 import DictLoader
+
+from extensions import db
+from models import Course, Student, student_course
+from pagination import render_list, stream_rows
+import readmodels
+
+ROWS = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+MODES = ("buffered", "streamed")
+# The parent seeds a new database; each child gets its path and a mode
+CHILD = len(sys.argv) > 3
+PATH = sys.argv[2] if CHILD else os.path.join(tempfile.mkdtemp(), "bench.sqlite")
+
+PAGE = """<!DOCTYPE html><html><head><title>Students</title></head><body>
+<h2>Students</h2><table>{% for s in students %}<tr><td>{{ s.id }}</td>
+<td>{{ s.name }}</td><td>{{ s.email }}</td>
+<td>{% for c in s.courses %}{{ c.name }}{% if not loop.last %}, {% endif %}{% endfor %}</td>
+</tr>{% endfor %}</table></body></html>"""
+
+app = Flask(__name__)
+app.jinja_env.loader = DictLoader({"students.html": PAGE})
+app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{PATH}"
+db.init_app(app)
+
+
+def seed():
+    with app.app_context():
+        db.create_all()
+        courses = [Course(name=f"Course {i}", description="-") for i in range(10)]
+        db.session.add_all(courses)
+        db.session.flush()
+        db.session.execute(
+            Student.__table__.insert(),
+            [
+                {"name": f"Student {i}", "email": f"student{i}@example.com",
+                 "password": "x", "age": 20, "grade": "A"}
+                for i in range(ROWS)
+            ],
+        )
+        db.session.execute(
+            student_course.insert(),
+            [{"student_id": i + 1, "course_id": courses[i % 10].id} for i in range(ROWS)],
+        )
+        db.session.commit()
+
+
+def run(mode):
+    with app.app_context(), app.test_request_context():
+        query = db.session.query(Student.id, Student.name, Student.email)
+        baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        start = time.perf_counter()
+        if mode == "buffered":
+            rows = readmodels.student_rows(query.order_by(Student.id).all())
+            chunks = iter([render_template("students.html", students=rows)])
+        else:
+            rows = stream_rows(query, [Student.id], transform=readmodels.student_rows)
+            chunks = iter(render_list("students.html", students=rows).response)
+        size = len(next(chunks))
+        first = time.perf_counter()
+        size += sum(len(chunk) for chunk in chunks)
+        done = time.perf_counter()
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - baseline
+    print(
+        f"{mode:<9} {size / 1e6:>6.1f} MB html  "
+        f"TTFB {1000 * (first - start):>8.1f} ms  "
+        f"total {1000 * (done - start):>8.1f} ms  "
+        f"peak RSS +{peak / 1024:>6.1f} MB"
+    )
+
+
+if __name__ == "__main__":
+    if CHILD:
+        run(sys.argv[3])
+        sys.exit()
+    seed()
+    print(f"{ROWS} students")
+    for mode in MODES:
+        subprocess.run([sys.executable, __file__, str(ROWS), PATH, mode], check=True)
@@ -0,0 +1,51 @@
+import threading
+import time
+from collections import OrderedDict
+
+# --------------------------------------------------
+# Application cache
+# --------------------------------------------------
+# A small per-process LRU with TTLs. Entries that must stay correct across
+# gunicorn workers put a version stamp read from the database in their key,
+# so a bump in one worker makes every other worker miss and rebuild.
+
+
+class LocalCache:
+    def __init__(self, max_entries=2048, default_ttl=3600):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value, ttl=None):
+        expires = time.monotonic() + (ttl or self.default_ttl)
+        with self._lock:
+            self._data[key] = (expires, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+app_cache = LocalCache()
@@ -0,0 +1,175 @@
+import os
+import threading
+import time
+import zlib
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # br is negotiated only when installed
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # same for zstd
+    zstandard = None
+
+
+# --------------------------------------------------
+# Response compression
+# --------------------------------------------------
+# Compresses dynamic responses with the best of br / zstd / gzip the client
+# accepts. Only allowlisted text types at or above COMPRESS_MIN_SIZE are
+# touched. File responses (uploads, videos, images, zip materials,
+# precompressed static/dist) and responses that already carry a
+# Content-Encoding are left alone. Streamed responses are compressed chunk by
+# chunk with a flush after each, so they still arrive incrementally. Set
+# COMPRESS_RESPONSES=0 when a front proxy compresses instead.
+
+DEFAULT_MIMETYPES = (
+    "text/html",
+    "text/css",
+    "text/plain",
+    "text/csv",
+    "text/javascript",
+    "application/javascript",
+    "application/json",
+    "application/xml",
+    "image/svg+xml",
+)
+
+_lock = threading.Lock()
+_metrics = {}  # endpoint -> counters
+
+
+def init_compression(app):
+    app.config.setdefault("COMPRESS_RESPONSES", os.getenv("COMPRESS_RESPONSES", "1") == "1")
+    app.config.setdefault("COMPRESS_MIN_SIZE", int(os.getenv("COMPRESS_MIN_SIZE", "1024")))
+    app.config.setdefault("COMPRESS_MIMETYPES", DEFAULT_MIMETYPES)
+    app.config.setdefault("COMPRESS_LEVELS", {"br": 4, "zstd": 3, "gzip": 6})
+
+    @app.after_request
+    def compress_response(response):
+        if not app.config["COMPRESS_RESPONSES"]:
+            return response
+        encoding = _choose_encoding(response, app.config)
+        if encoding is None:
+            return response
+        level = app.config["COMPRESS_LEVELS"][encoding]
+        endpoint = request.endpoint or "-"
+        if response.is_streamed:
+            response.response = _compress_stream(
+                response.iter_encoded(), encoding, level, endpoint
+            )
+            response.headers.pop("Content-Length", None)
+        else:
+            data = response.get_data()
+            start = time.thread_time()
+            packed = _compressor(encoding, level).finish(data)
+            _record(endpoint, len(data), len(packed), time.thread_time() - start)
+            response.set_data(packed)
+        response.headers["Content-Encoding"] = encoding
+        response.vary.add("Accept-Encoding")
+        if response.headers.get("ETag") and not response.headers["ETag"].startswith("W/"):
+            # The encoded body is a different byte sequence
+            response.headers["ETag"] = "W/" + response.headers["ETag"]
+        return response
+
+
+def _available():
+    names = ["br"] if brotli is not None else []
+    if zstandard is not None:
+        names.append("zstd")
+    names.append("gzip")
+    return names
+
+
+def _choose_encoding(response, config):
+    if (
+        response.status_code < 200
+        or response.status_code in (204, 206, 304)
+        or response.direct_passthrough
+        or "Content-Encoding" in response.headers
+        or request.method == "HEAD"
+        or response.mimetype not in config["COMPRESS_MIMETYPES"]
+    ):
+        return None
+    if not response.is_streamed:
+        length = response.calculate_content_length()
+        if length is None or length < config["COMPRESS_MIN_SIZE"]:
+            return None
+    if "no-transform" in response.headers.get("Cache-Control", ""):
+        return None
+    return request.accept_encodings.best_match(_available())
+
+
+class _compressor:
+    """One streaming compressor: compress() flushes each chunk, finish() ends."""
+
+    def __init__(self, encoding, level):
+        self.encoding = encoding
+        if encoding == "br":
+            self._obj = brotli.Compressor(quality=level)
+        elif encoding == "zstd":
+            self._obj = zstandard.ZstdCompressor(level=level).compressobj()
+        else:
+            self._obj = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data):
+        if self.encoding == "br":
+            return self._obj.process(data) + self._obj.flush()
+        if self.encoding == "zstd":
+            return self._obj.compress(data) + self._obj.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+        return self._obj.compress(data) + self._obj.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self, data=b""):
+        if self.encoding == "br":
+            return self._obj.process(data) + self._obj.finish()
+        return self._obj.compress(data) + self._obj.flush()
+
+
+def _compress_stream(chunks, encoding, level, endpoint):
+    compressor = _compressor(encoding, level)
+    raw = packed = 0
+    cpu = 0.0
+    for chunk in chunks:
+        if not chunk:
+            continue
+        start = time.thread_time()
+        out = compressor.compress(chunk)
+        cpu += time.thread_time() - start
+        raw += len(chunk)
+        packed += len(out)
+        yield out
+    start = time.thread_time()
+    out = compressor.finish()
+    cpu += time.thread_time() - start
+    packed += len(out)
+    _record(endpoint, raw, packed, cpu)
+    yield out
+
+
+# ---------------- Metrics ----------------
+
+
+def _record(endpoint, raw, packed, cpu):
+    with _lock:
+        m = _metrics.setdefault(
+            endpoint, {"responses": 0, "bytes_in": 0, "bytes_out": 0, "cpu_ms": 0.0}
+        )
+        m["responses"] += 1
+        m["bytes_in"] += raw
+        m["bytes_out"] += packed
+        m["cpu_ms"] += 1000 * cpu
+
+
+def compression_metrics():
+    """Per-endpoint totals with compression ratio and mean CPU per response."""
+    with _lock:
+        data = {endpoint: dict(m) for endpoint, m in _metrics.items()}
+    for m in data.values():
+        m["ratio"] = round(m["bytes_in"] / m["bytes_out"], 2) if m["bytes_out"] else None
+        m["cpu_ms_per_response"] = round(m["cpu_ms"] / m["responses"], 2)
+        m["cpu_ms"] = round(m["cpu_ms"], 1)
+    return data
@@ -0,0 +1,103 @@
+import hashlib
+import os
+from functools import wraps
+
+from flask import make_response, request, session
+from sqlalchemy import select
+
+from extensions import db
+from manifest import course_versions
+from models import student_course
+from sessions import ROLES
+from versions import data_versions, student_version_name
+
+# --------------------------------------------------
+# Conditional GET
+# --------------------------------------------------
+# @conditional(etag_parts) wraps a page whose HTML is fully determined by a
+# few cheap version numbers. etag_parts(**view_args) returns those versions
+# (or None to skip, e.g. when not logged in); they are hashed with the user,
+# the URL and the deployed templates into a weak ETag, and a matching
+# If-None-Match gets a 304 before the view's own queries run. Pages answer
+# with `no-cache` so browsers always revalidate, `private` when they belong to
+# a logged-in user, and Vary: Cookie.
+
+_template_stamp = ""
+
+
+def init_conditional(app):
+    global _template_stamp
+    # Changes on every deploy that touches a template, and is the same in
+    # every worker and on every host (contents, not checkout-dependent mtimes)
+    folder = os.path.join(app.root_path, app.template_folder)
+    digest = hashlib.sha1()
+    for root, dirs, files in os.walk(folder):
+        dirs.sort()
+        for name in sorted(files):
+            path = os.path.join(root, name)
+            digest.update(os.path.relpath(path, folder).encode() + b"\0")
+            with open(path, "rb") as f:
+                digest.update(f.read())
+    _template_stamp = digest.hexdigest()
+
+
+def _viewer():
+    for role, (key, _) in ROLES.items():
+        if session.get(key):
+            return role, session[key]
+    return None
+
+
+def conditional(etag_parts, private=True):
+    def decorator(view):
+        @wraps(view)
+        def wrapper(**kwargs):
+            parts = etag_parts(**kwargs)
+            # Flashed messages are shown once, so such a response can't be reused
+            if parts is None or session.get("_flashes"):
+                return view(**kwargs)
+
+            key = repr((_template_stamp, _viewer(), request.full_path, parts))
+            etag = hashlib.sha1(key.encode()).hexdigest()[:20]
+            if request.if_none_match.contains_weak(etag):
+                response = make_response("", 304)
+            else:
+                response = make_response(view(**kwargs))
+                if response.status_code != 200:
+                    return response
+
+            response.set_etag(etag, weak=True)
+            response.cache_control.no_cache = True
+            if private:
+                response.cache_control.private = True
+            else:
+                response.cache_control.public = True
+            response.vary.add("Cookie")
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+# ---------------- ETag parts ----------------
+
+
+def catalog_etag():
+    return data_versions("course_catalog", "teachers")
+
+
+def student_etag(course_id=None):
+    student_id = session.get("student_id")
+    if not student_id:
+        return None
+    versions = data_versions(student_version_name(student_id), "course_catalog", "teachers")
+    if course_id is None:
+        course_ids = db.session.scalars(
+            select(student_course.c.course_id).where(
+                student_course.c.student_id == student_id
+            )
+        ).all()
+    else:
+        course_ids = [course_id]
+    return versions, course_versions(course_ids)
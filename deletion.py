@@ -0,0 +1,313 @@
+import os
+from collections import Counter
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import delete, event, exists, select, union
+from sqlalchemy.orm import Session, with_loader_criteria
+
+from extensions import db
+from jobs import cancel, enqueue, job, set_progress
+from manifest import bump_content_version
+from models import (
+    Account,
+    Attendance,
+    Course,
+    Exam,
+    ExamAttempt,
+    ExamResult,
+    Feedback,
+    LiveClass,
+    MaterialExtraction,
+    MaterialText,
+    Progress,
+    ProgressSummary,
+    Question,
+    RecordedClass,
+    StudentAnswer,
+    StudyMaterial,
+    Teacher,
+    student_course,
+    teacher_course,
+)
+
+# --------------------------------------------------
+# Soft delete
+# --------------------------------------------------
+# Deleting a course or teacher only stamps `deleted_at` (a tombstone) and
+# queues a purge job DELETE_RETENTION seconds out. An ORM filter on every
+# session hides tombstoned courses and teachers, and the content and
+# attendance under them, so the delete is instant. Undo inside the window
+# cancels the purge and clears the stamp, bringing back the whole tree
+# untouched. The purge deletes the tree in bounded batches of set-based
+# DELETEs, then removes uploaded files no other row refers to.
+#
+# Queries that must still see tombstoned rows pass
+# execution_options(include_deleted=True).
+
+PURGE_BATCH = 1000
+
+# content model -> (dependent model, foreign key column) deleted with it
+CONTENT_DEPENDENTS = {
+    StudyMaterial: (
+        (MaterialText, "material_id"),
+        (MaterialExtraction, "material_id"),
+        (Progress, "material_id"),
+    ),
+    RecordedClass: ((Progress, "recorded_class_id"),),
+    LiveClass: ((Progress, "live_class_id"),),
+    Exam: (
+        (StudentAnswer, "exam_id"),
+        (Question, "exam_id"),
+        (ExamResult, "exam_id"),
+        (ExamAttempt, "exam_id"),
+        (Progress, "exam_id"),
+    ),
+}
+
+# model -> (file name column, app.config key of its upload folder)
+UPLOADED_FILES = {
+    StudyMaterial: ("filename", "MATERIAL_FOLDER"),
+    RecordedClass: ("filename", "UPLOAD_FOLDER_VIDEOS"),
+    Teacher: ("photo", "UPLOAD_FOLDER_PHOTOS"),
+}
+
+_course = Course.__table__
+_teacher = Teacher.__table__
+# Aliased so the EXISTS subqueries never correlate to the outer query's own
+# course/teacher table
+_dead_course = _course.alias("dead_course")
+_dead_teacher = _teacher.alias("dead_teacher")
+
+
+def init_deletion(app):
+    app.config.setdefault("DELETE_RETENTION", int(os.getenv("DELETE_RETENTION", "86400")))
+
+
+# ---------------- Visibility ----------------
+
+_HIDE_DELETED = (
+    with_loader_criteria(Course, lambda cls: cls.deleted_at.is_(None), include_aliases=True),
+    with_loader_criteria(Teacher, lambda cls: cls.deleted_at.is_(None), include_aliases=True),
+    *(
+        with_loader_criteria(
+            model,
+            lambda cls: ~exists().where(
+                _dead_course.c.id == cls.course_id, _dead_course.c.deleted_at.is_not(None)
+            )
+            & ~exists().where(
+                _dead_teacher.c.id == cls.teacher_id, _dead_teacher.c.deleted_at.is_not(None)
+            ),
+            include_aliases=True,
+        )
+        for model in CONTENT_DEPENDENTS
+    ),
+    with_loader_criteria(
+        MaterialText,
+        lambda cls: ~exists().where(
+            _dead_course.c.id == cls.course_id, _dead_course.c.deleted_at.is_not(None)
+        ),
+        include_aliases=True,
+    ),
+    with_loader_criteria(
+        Attendance,
+        lambda cls: ~exists().where(
+            _dead_teacher.c.id == cls.teacher_id, _dead_teacher.c.deleted_at.is_not(None)
+        ),
+        include_aliases=True,
+    ),
+)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _hide_deleted(state):
+    if state.is_relationship_load:
+        # These already carry the parent query's filter. With any
+        # do_orm_execute hook installed, a streamed parent's yield_per leaks
+        # into its selectin loads, which then refuse their unique() rows
+        if state.execution_options.get("yield_per"):
+            state.update_execution_options(yield_per=None)
+        return
+    if (
+        state.is_select
+        and not state.is_column_load
+        and not state.execution_options.get("include_deleted", False)
+    ):
+        state.statement = state.statement.options(*_HIDE_DELETED)
+
+
+# ---------------- Deleting and restoring ----------------
+
+
+def _tombstone(target, kind, payload):
+    target.deleted_at = datetime.utcnow()
+    target.purge_job_id = enqueue(
+        kind,
+        payload,
+        delay=current_app.config["DELETE_RETENTION"],
+        commit=False,
+    ).id
+
+
+def _restore(model, target_id):
+    """Clear a tombstone unless its purge has started; caller commits."""
+    target = db.session.get(model, target_id, execution_options={"include_deleted": True})
+    if target is None or target.deleted_at is None:
+        return None
+    if target.purge_job_id and not cancel(target.purge_job_id):
+        return None
+    target.deleted_at = None
+    target.purge_job_id = None
+    return target
+
+
+def soft_delete_course(course):
+    _tombstone(course, "purge_course", {"course_id": course.id})
+    db.session.commit()
+
+
+def restore_course(course_id):
+    """True if the course (and everything in it) is back."""
+    restored = _restore(Course, course_id) is not None
+    db.session.commit()
+    return restored
+
+
+def soft_delete_teacher(teacher):
+    _refresh_courses(_content_course_ids(teacher.id))
+    _tombstone(teacher, "purge_teacher", {"teacher_id": teacher.id})
+    db.session.commit()
+
+
+def restore_teacher(teacher_id):
+    restored = _restore(Teacher, teacher_id) is not None
+    if restored:
+        _refresh_courses(_content_course_ids(teacher_id))
+    db.session.commit()
+    return restored
+
+
+def _content_course_ids(teacher_id):
+    """Courses holding this teacher's materials, classes or exams."""
+    return db.session.scalars(
+        union(
+            *(
+                select(model.__table__.c.course_id).where(
+                    model.__table__.c.teacher_id == teacher_id
+                )
+                for model in CONTENT_DEPENDENTS
+            )
+        )
+    ).all()
+
+
+def _refresh_courses(course_ids):
+    # Hiding or showing a teacher's content changes what these courses list
+    # and their progress totals; summaries are recomputed on the next read
+    course_ids = [cid for cid in course_ids if cid is not None]
+    if course_ids:
+        bump_content_version(*course_ids)
+        table = ProgressSummary.__table__
+        db.session.execute(delete(table).where(table.c.course_id.in_(course_ids)))
+
+
+# ---------------- Purging ----------------
+
+
+def _purge_rows(table, condition, counts, item):
+    """DELETE ... WHERE id IN (next PURGE_BATCH matching ids) until none match."""
+    while True:
+        batch = select(table.c.id).where(condition).limit(PURGE_BATCH)
+        deleted = db.session.execute(delete(table).where(table.c.id.in_(batch))).rowcount
+        if not deleted:
+            return
+        counts[table.name] += deleted
+        set_progress(item, sum(counts.values()), message=f"Deleting {table.name}")
+
+
+def _purge_content(model, condition, counts, item):
+    table = model.__table__
+    file_column = UPLOADED_FILES.get(model, (None,))[0]
+    columns = [table.c.id] + ([table.c[file_column]] if file_column else [])
+    while True:
+        rows = db.session.execute(
+            select(*columns).where(condition).order_by(table.c.id).limit(PURGE_BATCH)
+        ).all()
+        if not rows:
+            return
+        ids = [row.id for row in rows]
+        for dependent, column in CONTENT_DEPENDENTS[model]:
+            dep = dependent.__table__
+            counts[dep.name] += db.session.execute(
+                delete(dep).where(dep.c[column].in_(ids))
+            ).rowcount
+        counts[table.name] += db.session.execute(
+            delete(table).where(table.c.id.in_(ids))
+        ).rowcount
+        set_progress(item, sum(counts.values()), message=f"Deleting {table.name}")
+        if file_column:
+            _remove_files(model, {row[1] for row in rows if row[1]})
+
+
+def _remove_files(model, names):
+    """Delete uploads that no remaining row refers to."""
+    column, folder = UPLOADED_FILES[model]
+    table = model.__table__
+    in_use = set(
+        db.session.scalars(select(table.c[column]).where(table.c[column].in_(names)))
+    )
+    for name in names - in_use:
+        if name == "default.jpg" or os.path.basename(name) != name:
+            continue
+        path = os.path.join(current_app.config[folder], name)
+        if os.path.isfile(path):
+            os.remove(path)
+
+
+def _tombstoned(model, target_id):
+    target = db.session.get(model, target_id, execution_options={"include_deleted": True})
+    return target if target is not None and target.deleted_at is not None else None
+
+
+@job("purge_course")
+def purge_course(item, course_id):
+    if _tombstoned(Course, course_id) is None:
+        return {"skipped": True}  # restored, or purged already
+    counts = Counter()
+    for model in CONTENT_DEPENDENTS:
+        _purge_content(model, model.__table__.c.course_id == course_id, counts, item)
+    # Rows pointing at the course itself
+    for model in (Progress, ExamAttempt, MaterialText):
+        _purge_rows(model.__table__, model.__table__.c.course_id == course_id, counts, item)
+    for table in (ProgressSummary.__table__, student_course, teacher_course):
+        counts[table.name] += db.session.execute(
+            delete(table).where(table.c.course_id == course_id)
+        ).rowcount
+    db.session.execute(delete(_course).where(_course.c.id == course_id))
+    db.session.commit()
+    return dict(counts)
+
+
+@job("purge_teacher")
+def purge_teacher(item, teacher_id):
+    teacher = _tombstoned(Teacher, teacher_id)
+    if teacher is None:
+        return {"skipped": True}
+    photo = teacher.photo
+    counts = Counter()
+    for model in CONTENT_DEPENDENTS:
+        _purge_content(model, model.__table__.c.teacher_id == teacher_id, counts, item)
+    for model in (Attendance, Feedback):
+        _purge_rows(model.__table__, model.__table__.c.teacher_id == teacher_id, counts, item)
+    counts[teacher_course.name] += db.session.execute(
+        delete(teacher_course).where(teacher_course.c.teacher_id == teacher_id)
+    ).rowcount
+    account = Account.__table__
+    db.session.execute(
+        delete(account).where(account.c.role == "teacher", account.c.user_id == teacher_id)
+    )
+    db.session.execute(delete(_teacher).where(_teacher.c.id == teacher_id))
+    db.session.commit()
+    if photo:
+        _remove_files(Teacher, {photo})
+    return dict(counts)
@@ -0,0 +1,104 @@
+import hashlib
+import math
+import os
+import threading
+import time
+
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import Session
+
+from extensions import db
+from identity import find_accounts, normalize_email
+from models import Account, Student
+
+# --------------------------------------------------
+# Student email index
+# --------------------------------------------------
+# The registration form asks whether an email is already registered as the
+# user types. Each worker keeps a Bloom filter of normalized student emails,
+# rebuilt every EMAIL_INDEX_TTL seconds in one streaming query and added to
+# as students are created, so only probable hits reach the database.
+
+
+class BloomFilter:
+    def __init__(self, capacity, error_rate=0.01):
+        capacity = max(capacity, 1000)
+        self.size = int(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, value):
+        digest = hashlib.blake2b(value.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, value):
+        for pos in self._positions(value):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, value):
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(value))
+
+
+_lock = threading.Lock()
+_filter = None
+_built_at = 0.0
+_ttl = 300
+
+
+def init_email_index(app):
+    global _ttl
+    app.config.setdefault("EMAIL_INDEX_TTL", int(os.getenv("EMAIL_INDEX_TTL", "300")))
+    _ttl = app.config["EMAIL_INDEX_TTL"]
+
+
+def rebuild_email_index():
+    global _filter, _built_at
+    count = db.session.scalar(
+        select(db.func.count()).select_from(Account).where(Account.role == "student")
+    )
+    bloom = BloomFilter(int(count * 1.5))  # headroom for registrations until the next rebuild
+    emails = db.session.execute(
+        select(Account.email)
+        .where(Account.role == "student")
+        .execution_options(yield_per=5000)
+    ).scalars()
+    for email in emails:
+        bloom.add(email)
+    with _lock:
+        _filter, _built_at = bloom, time.monotonic()
+    return count
+
+
+def student_email_exists(email):
+    email = normalize_email(email)
+    if not email:
+        return False
+    if _filter is None or time.monotonic() - _built_at > _ttl:
+        rebuild_email_index()
+    if email not in _filter:
+        return False
+    return bool(find_accounts(email, roles=("student",)))
+
+
+def add_student_emails(emails):
+    if _filter is not None:
+        for email in emails:
+            _filter.add(normalize_email(email))
+
+
+@event.listens_for(Session, "after_flush")
+def _add_new_students(session, flush_context):
+    # A rolled-back add only costs one extra database check later
+    if _filter is None:
+        return
+    for obj in session.new:
+        if isinstance(obj, Student) and obj.email:
+            _filter.add(normalize_email(obj.email))
+    for obj in session.dirty:
+        if isinstance(obj, Student):
+            # Changed emails, from profile edits or imports
+            for email in inspect(obj).attrs.email.history.added:
+                if email:
+                    _filter.add(normalize_email(email))
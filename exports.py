@@ -0,0 +1,199 @@
+import csv
+import io
+import os
+import tempfile
+
+from sqlalchemy import Boolean, Date, DateTime, Float, Integer, case, func, select
+
+from extensions import db
+from models import (
+    Attendance,
+    Course,
+    Exam,
+    ExamResult,
+    Progress,
+    Student,
+    Teacher,
+    teacher_course,
+)
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet export is optional
+    pa = None
+
+
+# --------------------------------------------------
+# Data exports
+# --------------------------------------------------
+# Each export is one SELECT read through a server-side cursor (stream_results
+# + yield_per), so rows are written out one partition at a time and memory
+# stays flat however large the table. CSV is streamed straight into the
+# response; Parquet is written batch by batch to a file.
+
+YIELD_PER = 5000
+# Parquet only when pyarrow is installed; without it /export/x.parquet is a 404
+EXPORT_FORMATS = ("csv", "parquet") if pa is not None else ("csv",)
+
+
+def _teacher_courses(teacher_id):
+    return select(teacher_course.c.course_id).where(
+        teacher_course.c.teacher_id == teacher_id
+    )
+
+
+def gradebook_query(teacher_id=None):
+    query = (
+        select(
+            ExamResult.id.label("result_id"),
+            Student.id.label("student_id"),
+            Student.name.label("student_name"),
+            Student.email.label("student_email"),
+            Exam.id.label("exam_id"),
+            Exam.title.label("exam_title"),
+            Course.id.label("course_id"),
+            Course.name.label("course_name"),
+            ExamResult.score,
+            ExamResult.total,
+            ExamResult.submitted_at,
+        )
+        .join(Student, Student.id == ExamResult.student_id)
+        .join(Exam, Exam.id == ExamResult.exam_id)
+        .outerjoin(Course, Course.id == Exam.course_id)
+        .order_by(ExamResult.id)
+    )
+    if teacher_id:
+        query = query.where(Exam.course_id.in_(_teacher_courses(teacher_id)))
+    return query
+
+
+def attendance_query(teacher_id=None):
+    query = (
+        select(
+            Attendance.id.label("attendance_id"),
+            Attendance.date,
+            Student.id.label("student_id"),
+            Student.name.label("student_name"),
+            Teacher.id.label("teacher_id"),
+            Teacher.name.label("teacher_name"),
+            Attendance.status,
+        )
+        .join(Student, Student.id == Attendance.student_id)
+        .join(Teacher, Teacher.id == Attendance.teacher_id)
+        .order_by(Attendance.id)
+    )
+    if teacher_id:
+        query = query.where(Attendance.teacher_id == teacher_id)
+    return query
+
+
+def progress_query(teacher_id=None):
+    item_type = case(
+        (Progress.material_id.isnot(None), "material"),
+        (Progress.recorded_class_id.isnot(None), "recorded"),
+        (Progress.live_class_id.isnot(None), "live"),
+        (Progress.exam_id.isnot(None), "exam"),
+    )
+    query = (
+        select(
+            Progress.id.label("progress_id"),
+            Student.id.label("student_id"),
+            Student.name.label("student_name"),
+            Course.id.label("course_id"),
+            Course.name.label("course_name"),
+            item_type.label("item_type"),
+            func.coalesce(
+                Progress.material_id,
+                Progress.recorded_class_id,
+                Progress.live_class_id,
+                Progress.exam_id,
+            ).label("item_id"),
+            Progress.completed,
+            Progress.completion_date,
+        )
+        .join(Student, Student.id == Progress.student_id)
+        .outerjoin(Course, Course.id == Progress.course_id)
+        .order_by(Progress.id)
+    )
+    if teacher_id:
+        query = query.where(Progress.course_id.in_(_teacher_courses(teacher_id)))
+    return query
+
+
+EXPORTS = {
+    "gradebook": gradebook_query,
+    "attendance": attendance_query,
+    "progress": progress_query,
+}
+
+
+def _partitions(query):
+    result = db.session.execute(
+        query.execution_options(stream_results=True, yield_per=YIELD_PER)
+    )
+    return result.keys(), result.partitions()
+
+
+def iter_csv(query):
+    """Yield CSV text a partition at a time."""
+    keys, partitions = _partitions(query)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(keys)
+    for rows in partitions:
+        writer.writerows(rows)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def _arrow_schema(query):
+    types = []
+    for column in query.selected_columns:
+        sql_type = column.type
+        if isinstance(sql_type, Boolean):
+            types.append(pa.bool_())
+        elif isinstance(sql_type, Integer):
+            types.append(pa.int64())
+        elif isinstance(sql_type, Float):
+            types.append(pa.float64())
+        elif isinstance(sql_type, DateTime):
+            types.append(pa.timestamp("us"))
+        elif isinstance(sql_type, Date):
+            types.append(pa.date32())
+        else:
+            types.append(pa.string())
+    return pa.schema(list(zip(query.selected_columns.keys(), types)))
+
+
+def write_parquet(query, path):
+    """Write the query to a Parquet file, one row group per partition."""
+    if pa is None:
+        raise RuntimeError("Parquet export needs the pyarrow package")
+    schema = _arrow_schema(query)
+    keys, partitions = _partitions(query)
+    count = 0
+    with pq.ParquetWriter(path, schema, compression="zstd") as writer:
+        for rows in partitions:
+            columns = list(zip(*rows))
+            writer.write_batch(pa.record_batch(
+                [pa.array(col, type=t) for col, t in zip(columns, schema.types)],
+                schema=schema,
+            ))
+            count += len(rows)
+    return count
+
+
+def parquet_tempfile(query):
+    """Write a Parquet export to a temp file and return its path."""
+    fd, path = tempfile.mkstemp(suffix=".parquet")
+    os.close(fd)
+    try:
+        write_parquet(query, path)
+    except Exception:
+        os.remove(path)
+        raise
+    return path
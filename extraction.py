@@ -0,0 +1,206 @@
+import hashlib
+import os
+import zipfile
+from xml.etree import ElementTree
+
+from flask import current_app
+
+from extensions import db
+from jobs import LeaseLost, enqueue, job, set_progress
+from models import MaterialExtraction, MaterialText, StudyMaterial
+
+try:
+    from pypdf import PdfReader
+except ImportError:  # PDF extraction is optional
+    PdfReader = None
+
+
+# --------------------------------------------------
+# Material text extraction
+# --------------------------------------------------
+# Uploaded materials are hashed and their text extracted by a background job
+# (see jobs.py), then stored in `material_text` (one row per file or zip member) which
+# the search migration indexes. Files whose hash was already extracted reuse
+# the stored text instead of being parsed again.
+
+MAX_TEXT_CHARS = 1_000_000  # per document
+MAX_MEMBER_BYTES = 50 * 1024 * 1024  # skip larger zip members
+MAX_ZIP_MEMBERS = 500
+
+
+def queue_extraction(material_id):
+    """Mark a material pending and extract it in the background."""
+    extraction = db.session.get(MaterialExtraction, material_id)
+    if not extraction:
+        extraction = MaterialExtraction(material_id=material_id)
+        db.session.add(extraction)
+    extraction.status = "pending"
+    extraction.error = None
+    db.session.commit()
+    enqueue("extract_material", {"material_id": material_id})
+
+
+@job("extract_material")
+def run_extraction(item, material_id):
+    # Renew the lease per document, so a big zip isn't claimed a second time
+    return extract_material(
+        material_id,
+        on_member=lambda n: set_progress(item, n, message=f"{n} documents read"),
+    )
+
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def extract_material(material_id, on_member=None):
+    """Extract and store text for one material; returns the final status.
+    `on_member(n)` is called after each document read, between transactions."""
+    material = db.session.get(StudyMaterial, material_id)
+    if not material or not material.filename:
+        return None
+
+    extraction = db.session.get(MaterialExtraction, material_id)
+    if not extraction:
+        extraction = MaterialExtraction(material_id=material_id)
+        db.session.add(extraction)
+
+    path = os.path.join(current_app.config["MATERIAL_FOLDER"], material.filename)
+    try:
+        digest = file_hash(path)
+        if extraction.content_hash == digest and extraction.status == "done":
+            return "done"
+
+        extraction.status = "running"
+        db.session.commit()
+
+        texts = _texts_for_hash(digest)
+        if texts is None:
+            texts = []
+            for text in iter_texts(path, material.filename):
+                texts.append(text)
+                if on_member:
+                    on_member(len(texts))
+
+        MaterialText.query.filter_by(material_id=material_id).delete()
+
+        for member, content in texts:
+            db.session.add(
+                MaterialText(
+                    material_id=material_id,
+                    course_id=material.course_id,
+                    member=member,
+                    content=content,
+                )
+            )
+        extraction.content_hash = digest
+        supported = texts or _supported(material.filename)
+        extraction.status = "done" if supported else "unsupported"
+        extraction.error = None
+        db.session.commit()
+    except LeaseLost:
+        raise  # the worker that took over records the status
+    except Exception as e:
+        db.session.rollback()
+        # A backfilled material's row is rolled back with the failure
+        extraction = db.session.get(MaterialExtraction, material_id)
+        if not extraction:
+            extraction = MaterialExtraction(material_id=material_id)
+            db.session.add(extraction)
+        extraction.status = "failed"
+        extraction.error = str(e)
+        db.session.commit()
+    return extraction.status
+
+
+def _texts_for_hash(digest):
+    """Text already extracted from an identical file, or None."""
+    donor = MaterialExtraction.query.filter_by(
+        content_hash=digest, status="done"
+    ).first()
+    if not donor:
+        return None
+    rows = MaterialText.query.filter_by(material_id=donor.material_id).all()
+    return [(row.member, row.content) for row in rows]
+
+
+def _extension(name):
+    return name.rsplit(".", 1)[-1].lower() if "." in name else ""
+
+
+def _supported(name):
+    ext = _extension(name)
+    return ext in ("txt", "docx", "pptx", "zip") or (
+        ext == "pdf" and PdfReader is not None
+    )
+
+
+def iter_texts(path, name):
+    """Yield (member, text) pairs; member is None unless reading a zip."""
+    ext = _extension(name)
+    if ext == "zip":
+        with zipfile.ZipFile(path) as archive:
+            yield from _zip_texts(archive)
+        return
+    with open(path, "rb") as f:
+        text = _file_text(f, ext)
+    if text:
+        yield None, text
+
+
+def _zip_texts(archive):
+    # Members are streamed one at a time; nothing is written to disk
+    for info in archive.infolist()[:MAX_ZIP_MEMBERS]:
+        if info.is_dir() or info.file_size > MAX_MEMBER_BYTES:
+            continue
+        ext = _extension(info.filename)
+        if not _supported(info.filename) or ext == "zip":
+            continue
+        with archive.open(info) as member:
+            text = _file_text(member, ext)
+        if text:
+            yield info.filename, text
+
+
+def _file_text(f, ext):
+    if ext == "txt":
+        return f.read(MAX_TEXT_CHARS * 4).decode("utf-8", "replace")[:MAX_TEXT_CHARS]
+    if ext == "docx":
+        return _office_text(f, lambda n: n == "word/document.xml")
+    if ext == "pptx":
+        return _office_text(
+            f, lambda n: n.startswith("ppt/slides/slide") and n.endswith(".xml")
+        )
+    if ext == "pdf" and PdfReader is not None:
+        reader = PdfReader(f)
+        return _join(page.extract_text() or "" for page in reader.pages)
+    return None
+
+
+def _office_text(f, wanted):
+    """Text runs (<w:t>, <a:t>) from the XML parts of a DOCX/PPTX package."""
+
+    def runs():
+        with zipfile.ZipFile(f) as package:
+            for part in sorted(n for n in package.namelist() if wanted(n)):
+                with package.open(part) as xml:
+                    for _, element in ElementTree.iterparse(xml):
+                        if element.tag.endswith("}t") and element.text:
+                            yield element.text
+                        element.clear()
+
+    return _join(runs(), sep=" ")
+
+
+def _join(parts, sep="\n"):
+    text, size = [], 0
+    for part in parts:
+        text.append(part)
+        size += len(part) + 1
+        if size >= MAX_TEXT_CHARS:
+            break
+    return sep.join(text)[:MAX_TEXT_CHARS].strip()
@@ -0,0 +1,72 @@
+import os
+
+from flask import current_app, session
+from jinja2 import FileSystemBytecodeCache, nodes
+from jinja2.ext import Extension
+from markupsafe import Markup
+
+from cache import app_cache
+from sessions import ROLES
+from versions import VERSION_SOURCES, data_version
+
+# --------------------------------------------------
+# Template fragment cache
+# --------------------------------------------------
+# {% cache "name", ttl, vary %} ... {% endcache %} renders its body once and
+# keeps the HTML in app_cache. `vary` is None (one copy for everyone), "role"
+# (one per logged-in role) or "user" (one per account). A fragment named
+# after a data version (see versions.py) carries it in its key, so a write
+# makes every worker miss and re-render. Compiled templates go to a bytecode
+# cache on disk so new workers skip recompiling.
+
+FRAGMENT_TTL = 3600
+
+
+def init_fragments(app):
+    app.config.setdefault("FRAGMENT_CACHE", os.getenv("FRAGMENT_CACHE", "1") == "1")
+    app.config.setdefault(
+        "JINJA_BYTECODE_DIR", os.path.join(app.instance_path, "jinja_cache")
+    )
+    os.makedirs(app.config["JINJA_BYTECODE_DIR"], exist_ok=True)
+    app.jinja_env.bytecode_cache = FileSystemBytecodeCache(app.config["JINJA_BYTECODE_DIR"])
+    app.jinja_env.add_extension(FragmentCacheExtension)
+
+
+def _variant(vary):
+    if vary is None:
+        return "all"
+    for role, (key, _) in ROLES.items():
+        if session.get(key):
+            return role if vary == "role" else f"{role}:{session[key]}"
+    return "anon"
+
+
+def fragment_version(name):
+    return data_version(name) if name in VERSION_SOURCES else 0
+
+
+class FragmentCacheExtension(Extension):
+    tags = {"cache"}
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        args = [parser.parse_expression()]
+        while len(args) < 3 and parser.stream.skip_if("comma"):
+            args.append(parser.parse_expression())
+        args += [nodes.Const(None)] * (3 - len(args))
+        body = parser.parse_statements(("name:endcache",), drop_needle=True)
+        return nodes.CallBlock(
+            self.call_method("_render", args), [], [], body
+        ).set_lineno(lineno)
+
+    def _render(self, name, ttl, vary, caller):
+        # Templates reload from disk in debug mode, so cached HTML would go stale
+        if not current_app.config["FRAGMENT_CACHE"] or self.environment.auto_reload:
+            return caller()
+        key = f"fragment:{name}:{fragment_version(name)}:{_variant(vary)}"
+        html = app_cache.get(key)
+        if html is None:
+            html = caller()
+            app_cache.set(key, html, ttl or FRAGMENT_TTL)
+        return Markup(html)
+
@@ -0,0 +1,140 @@
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import Session
+
+from extensions import db
+from models import Account, Admin, Student, Teacher
+from passwords import hash_password, needs_rehash, record_rehash, verify_password
+
+# --------------------------------------------------
+# Account lookup
+# --------------------------------------------------
+# `account` maps a normalized email to (role, user id, password hash) for
+# every admin, teacher and student, so signing in is one indexed read whatever
+# the role. Rows follow the user tables through a flush listener; `flask
+# accounts-rebuild` recreates them from scratch.
+
+ROLE_MODELS = {"student": Student, "teacher": Teacher, "admin": Admin}
+MODEL_ROLES = {model: role for role, model in ROLE_MODELS.items()}
+
+# Who wins when one email is registered under several roles
+LOGIN_ROLES = ("student", "teacher")
+
+
+def normalize_email(email):
+    return (email or "").strip().lower()
+
+
+def find_accounts(email, roles=LOGIN_ROLES):
+    """Accounts for `email` among `roles`, in the order given."""
+    rows = db.session.execute(
+        select(Account.role, Account.user_id, Account.password).where(
+            Account.email == normalize_email(email), Account.role.in_(roles)
+        )
+    ).all()
+    by_role = {row.role: row for row in rows}
+    return [by_role[role] for role in roles if role in by_role]
+
+
+def email_taken(email, role, user_id=None):
+    """True if another `role` account already uses `email`, in any case."""
+    return any(row.user_id != user_id for row in find_accounts(email, roles=(role,)))
+
+
+def authenticate(email, password, roles=LOGIN_ROLES):
+    """(role, user_id) of the first account whose password matches, else None.
+
+    A matching hash made with outdated parameters is replaced on the way.
+    """
+    for account in find_accounts(email, roles):
+        # A removed (soft-deleted) teacher keeps an account row until the
+        # purge, but their user row no longer loads
+        user = db.session.get(ROLE_MODELS[account.role], account.user_id)
+        if user is None:
+            continue
+        if verify_password(account.password, password):
+            if needs_rehash(account.password):
+                user.password = hash_password(password)
+                db.session.commit()
+                record_rehash()
+            return account.role, account.user_id
+    return None
+
+
+def find_user(email, roles=LOGIN_ROLES):
+    """The Student/Teacher/Admin registered with `email`, or None."""
+    for account in find_accounts(email, roles):
+        user = db.session.get(ROLE_MODELS[account.role], account.user_id)
+        if user:
+            return user
+    return None
+
+
+def _changed(obj):
+    state = inspect(obj)
+    return any(state.attrs[name].history.has_changes() for name in ("email", "password"))
+
+
+@event.listens_for(Session, "after_flush")
+def _sync_accounts(session, flush_context):
+    table = Account.__table__
+    upserts, removed = [], []
+    for obj in session.new:
+        if type(obj) in MODEL_ROLES:
+            upserts.append(obj)
+    for obj in session.dirty:
+        if type(obj) in MODEL_ROLES and _changed(obj):
+            upserts.append(obj)
+    for obj in session.deleted:
+        if type(obj) in MODEL_ROLES:
+            removed.append((MODEL_ROLES[type(obj)], obj.id))
+    if not upserts and not removed:
+        return
+
+    connection = session.connection()
+    for obj in upserts:
+        removed.append((MODEL_ROLES[type(obj)], obj.id))
+    for role, user_id in removed:
+        connection.execute(
+            table.delete().where(table.c.role == role, table.c.user_id == user_id)
+        )
+    rows = [_account_row(MODEL_ROLES[type(obj)], obj) for obj in upserts if obj.email]
+    if rows:
+        connection.execute(table.insert(), rows)
+
+
+def _account_row(role, user):
+    return {
+        "email": normalize_email(user.email),
+        "role": role,
+        "user_id": user.id,
+        "password": user.password,
+    }
+
+
+def insert_accounts(role, users):
+    """Account rows for users written with Core inserts (no flush events)."""
+    rows = [_account_row(role, user) for user in users if user.email]
+    if rows:
+        db.session.execute(Account.__table__.insert(), rows)
+
+
+def rebuild_accounts():
+    """Recreate every account row from the user tables; returns the row count."""
+    Account.query.delete()
+    count = 0
+    for role, model in ROLE_MODELS.items():
+        seen = set()
+        rows = []
+        # Tombstoned users keep their accounts, so a restore can sign in again
+        users = model.query.execution_options(include_deleted=True)
+        for user in users.filter(model.email.isnot(None)).order_by(model.id):
+            email = normalize_email(user.email)
+            if email in seen:
+                continue  # case-only duplicate: the oldest user keeps the email
+            seen.add(email)
+            rows.append(_account_row(role, user))
+        if rows:
+            db.session.execute(Account.__table__.insert(), rows)
+        count += len(rows)
+    db.session.commit()
+    return count
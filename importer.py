@@ -0,0 +1,410 @@
+import csv
+import io
+import json
+import multiprocessing
+import os
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from itertools import islice
+
+from sqlalchemy import select
+
+from emailindex import add_student_emails
+from extensions import db
+from identity import insert_accounts, normalize_email
+from jobs import enqueue, job, set_progress
+from models import Account, Course, Student, Teacher, student_course, teacher_course
+from passwords import hash_many
+from validation import check_student, check_teacher
+from versions import bump_versions, student_version_name
+
+try:
+    from openpyxl import load_workbook
+except ImportError:  # XLSX import is optional
+    load_workbook = None
+
+
+# --------------------------------------------------
+# Bulk import
+# --------------------------------------------------
+# Streams a CSV/XLSX file in batches: each batch is validated with the
+# registration rules, new passwords are hashed on a process pool, and rows
+# go in with multi-row INSERT ... ON CONFLICT DO NOTHING. Every rejected row
+# lands in a per-row error report; good rows are kept.
+#
+#   students:    name, email, password, age, grade, courses
+#   teachers:    name, email, password, qualifications, availability,
+#                years_of_experience, contact, place, courses
+#   enrollments: email, courses
+#
+# `courses` holds course ids or names separated by ';'.
+
+IMPORT_KINDS = ("students", "teachers", "enrollments")
+BATCH_SIZE = 1000
+MAX_REPORTED_ERRORS = 100_000
+
+_app = None
+
+
+def init_importer(app):
+    global _app
+    app.config.setdefault("IMPORT_DIR", os.path.join(app.instance_path, "imports"))
+    app.config.setdefault(
+        "IMPORT_HASH_WORKERS", int(os.getenv("IMPORT_HASH_WORKERS", os.cpu_count() or 2))
+    )
+    os.makedirs(app.config["IMPORT_DIR"], exist_ok=True)
+    _app = app
+
+
+# ---------------- Reading ----------------
+
+
+def read_rows(stream, filename):
+    """Yield one dict per data row, keyed by lower-cased header."""
+    if filename.lower().endswith(".xlsx"):
+        if load_workbook is None:
+            raise ValueError("XLSX import needs the openpyxl package")
+        sheet = load_workbook(stream, read_only=True, data_only=True).active
+        rows = sheet.iter_rows(values_only=True)
+        header = [str(h or "").strip().lower() for h in next(rows, [])]
+        for values in rows:
+            if any(v not in (None, "") for v in values):
+                yield {
+                    k: ("" if v is None else str(v)) for k, v in zip(header, values)
+                }
+        return
+
+    if not isinstance(stream, io.TextIOBase):
+        stream = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    reader = csv.DictReader(stream)
+    reader.fieldnames = [(h or "").strip().lower() for h in reader.fieldnames or []]
+    for row in reader:
+        if any(row.values()):
+            yield row
+
+
+class ImportReport:
+    def __init__(self, kind):
+        self.kind = kind
+        self.rows = 0
+        self.created = 0
+        self.enrolled = 0
+        self.failed = 0
+        self.errors = []  # (row number, email, message)
+
+    def error(self, line, email, message):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((line, email, message))
+
+    def as_dict(self):
+        return {
+            "kind": self.kind,
+            "rows": self.rows,
+            "created": self.created,
+            "enrolled": self.enrolled,
+            "failed": self.failed,
+        }
+
+    def write_errors(self, f):
+        writer = csv.writer(f)
+        writer.writerow(["row", "email", "error"])
+        writer.writerows(self.errors)
+
+
+# ---------------- Importing ----------------
+
+
+def _pool_context():
+    # Imports run inside threaded job workers; forking a process with live
+    # threads can deadlock the child, so start hashers from a clean process
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("forkserver")
+    return multiprocessing.get_context("spawn")
+
+
+def import_rows(kind, rows, batch_size=BATCH_SIZE, hash_workers=None, on_batch=None):
+    """Import an iterable of row dicts; returns an ImportReport."""
+    report = ImportReport(kind)
+    courses = _course_lookup()
+    numbered = enumerate(rows, start=2)  # row 1 is the header
+    with ProcessPoolExecutor(max_workers=hash_workers, mp_context=_pool_context()) as pool:
+        while True:
+            batch = list(islice(numbered, batch_size))
+            if not batch:
+                break
+            report.rows += len(batch)
+            _IMPORTERS[kind](batch, courses, pool, report)
+            db.session.commit()
+            if on_batch:
+                on_batch(report)
+    return report
+
+
+def _course_lookup():
+    lookup = {}
+    for course_id, name in db.session.execute(select(Course.id, Course.name)):
+        lookup[str(course_id)] = course_id
+        lookup[name.strip().lower()] = course_id
+    return lookup
+
+
+def _course_ids(value, courses):
+    """('1;Maths' -> ids, unknown names)."""
+    ids, unknown = [], []
+    for part in (value or "").split(";"):
+        part = part.strip()
+        if not part:
+            continue
+        course_id = courses.get(part.lower())
+        if course_id is None:
+            unknown.append(part)
+        elif course_id not in ids:
+            ids.append(course_id)
+    return ids, unknown
+
+
+def _insert_ignore(table, rows, returning=None):
+    """Multi-row INSERT that skips rows hitting a unique constraint."""
+    dialect = db.engine.dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    stmt = insert(table).on_conflict_do_nothing()
+    if returning is not None:
+        return db.session.execute(stmt.returning(*returning), rows).all()
+    return db.session.execute(stmt, rows).rowcount
+
+
+def _existing_ids(role, emails):
+    """{normalized email: user id} for accounts that already exist."""
+    if not emails:
+        return {}
+    return dict(
+        db.session.execute(
+            select(Account.email, Account.user_id).where(
+                Account.role == role, Account.email.in_(emails)
+            )
+        ).all()
+    )
+
+
+def _enroll(table, column, pairs):
+    if not pairs:
+        return 0
+    rows = [{column: user_id, "course_id": course_id} for user_id, course_id in pairs]
+    if table is student_course:
+        for row in rows:
+            row["enrolled_on"] = date.today()
+        bump_versions(student_version_name(user_id) for user_id, _ in pairs)
+    else:
+        bump_versions(["teachers"])
+    return _insert_ignore(table, rows)
+
+
+def _import_students(batch, courses, pool, report):
+    pending = {}  # email -> [line, fields, course ids]
+    for line, row in batch:
+        course_ids, unknown = _course_ids(row.get("courses"), courses)
+        if unknown:
+            report.error(line, row.get("email"), f"Unknown course: {', '.join(unknown)}")
+            continue
+        fields, error = check_student(row, course_ids)
+        if error:
+            report.error(line, row.get("email"), error)
+            continue
+        email = normalize_email(fields["email"])
+        if email in pending:
+            # Repeated email: like the form, a second row only adds courses
+            pending[email][2].extend(course_ids)
+        else:
+            pending[email] = [line, fields, course_ids]
+
+    ids = _existing_ids("student", list(pending))
+    new = [email for email in pending if email not in ids]
+    if new:
+        hashes = hash_many([pending[email][1]["password"] for email in new], pool)
+        rows = []
+        for email, pwhash in zip(new, hashes):
+            fields = dict(pending[email][1], password=pwhash)
+            rows.append(fields)
+        inserted = _insert_ignore(
+            Student.__table__, rows, returning=(Student.id, Student.email, Student.password)
+        )
+        insert_accounts("student", inserted)
+        add_student_emails(row.email for row in inserted)
+        report.created += len(inserted)
+        for row in inserted:
+            ids[normalize_email(row.email)] = row.id
+        for email in new:
+            if email not in ids:
+                line = pending[email][0]
+                report.error(line, pending[email][1]["email"], "Email already registered.")
+
+    pairs = {
+        (ids[email], course_id)
+        for email, (_, _, course_ids) in pending.items()
+        if email in ids
+        for course_id in course_ids
+    }
+    report.enrolled += _enroll(student_course, "student_id", pairs)
+
+
+def _import_teachers(batch, courses, pool, report):
+    pending = {}
+    for line, row in batch:
+        course_ids, unknown = _course_ids(row.get("courses"), courses)
+        if unknown:
+            report.error(line, row.get("email"), f"Unknown course: {', '.join(unknown)}")
+            continue
+        fields, error = check_teacher(row)
+        if error:
+            report.error(line, row.get("email"), error)
+            continue
+        email = normalize_email(fields["email"])
+        if email in pending:
+            report.error(line, fields["email"], "Email repeated in this file.")
+            continue
+        pending[email] = (line, fields, course_ids)
+
+    existing = _existing_ids("teacher", list(pending))
+    for email in existing:
+        line, fields, _ = pending.pop(email)
+        report.error(line, fields["email"], "Email already registered.")
+    if not pending:
+        return
+
+    emails = list(pending)
+    hashes = hash_many([pending[email][1]["password"] for email in emails], pool)
+    rows = [
+        dict(pending[email][1], password=pwhash, photo="default.jpg")
+        for email, pwhash in zip(emails, hashes)
+    ]
+    inserted = _insert_ignore(
+        Teacher.__table__, rows, returning=(Teacher.id, Teacher.email, Teacher.password)
+    )
+    insert_accounts("teacher", inserted)
+    report.created += len(inserted)
+    ids = {normalize_email(row.email): row.id for row in inserted}
+    for email in emails:
+        if email not in ids:
+            report.error(pending[email][0], pending[email][1]["email"], "Email already registered.")
+    pairs = {
+        (ids[email], course_id)
+        for email, (_, _, course_ids) in pending.items()
+        if email in ids
+        for course_id in course_ids
+    }
+    report.enrolled += _enroll(teacher_course, "teacher_id", pairs)
+
+
+def _import_enrollments(batch, courses, pool, report):
+    wanted = []
+    for line, row in batch:
+        email = normalize_email(row.get("email"))
+        course_ids, unknown = _course_ids(row.get("courses"), courses)
+        if not email or not course_ids:
+            report.error(line, row.get("email"), "Email and courses are required.")
+        elif unknown:
+            report.error(line, row.get("email"), f"Unknown course: {', '.join(unknown)}")
+        else:
+            wanted.append((line, email, course_ids))
+
+    ids = _existing_ids("student", list({email for _, email, _ in wanted}))
+    pairs = set()
+    for line, email, course_ids in wanted:
+        if email not in ids:
+            report.error(line, email, "No student with this email.")
+        else:
+            pairs.update((ids[email], course_id) for course_id in course_ids)
+    report.enrolled += _enroll(student_course, "student_id", pairs)
+
+
+_IMPORTERS = {
+    "students": _import_students,
+    "teachers": _import_teachers,
+    "enrollments": _import_enrollments,
+}
+
+
+# ---------------- Background imports (admin upload) ----------------
+# The upload is saved under IMPORT_DIR and imported by an "import" job; the
+# worker must see the same directory. Not retried, as the upload is removed
+# once the run ends.
+
+
+def _paths(import_id):
+    base = os.path.join(_app.config["IMPORT_DIR"], import_id)
+    return base + ".upload", base + ".json", base + "-errors.csv"
+
+
+def _write_status(import_id, status):
+    _, status_path, _ = _paths(import_id)
+    tmp = status_path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(status, f)
+    os.replace(tmp, status_path)
+
+
+def start_import(kind, file_storage):
+    """Save an uploaded file and import it in the background; returns its id."""
+    import_id = uuid.uuid4().hex
+    upload_path, _, _ = _paths(import_id)
+    file_storage.save(upload_path)
+    status = {"id": import_id, "kind": kind, "filename": file_storage.filename}
+    _write_status(import_id, dict(status, state="queued"))
+    enqueue("import", {"status": status})
+    return import_id
+
+
+@job("import", max_attempts=1)
+def _run_import(item, status):
+    import_id = status["id"]
+    upload_path, _, errors_path = _paths(import_id)
+
+    def on_batch(report):
+        _write_status(import_id, dict(status, state="running", **report.as_dict()))
+        set_progress(item, report.rows, message=f"{report.rows} rows read")
+
+    try:
+        with open(upload_path, "rb") as f:
+            report = import_rows(
+                status["kind"],
+                read_rows(f, status["filename"]),
+                hash_workers=_app.config["IMPORT_HASH_WORKERS"],
+                on_batch=on_batch,
+            )
+        with open(errors_path, "w", newline="") as f:
+            report.write_errors(f)
+        _write_status(import_id, dict(status, state="done", **report.as_dict()))
+        return report.as_dict()
+    except Exception as e:
+        db.session.rollback()
+        _write_status(import_id, dict(status, state="failed", error=str(e)))
+        raise
+    finally:
+        os.remove(upload_path)
+
+
+def import_status(import_id):
+    if not all(c in "0123456789abcdef" for c in import_id):
+        return None
+    _, status_path, _ = _paths(import_id)
+    try:
+        with open(status_path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def recent_imports(limit=20):
+    directory = _app.config["IMPORT_DIR"]
+    names = [n for n in os.listdir(directory) if n.endswith(".json")]
+    names.sort(key=lambda n: os.path.getmtime(os.path.join(directory, n)), reverse=True)
+    return [import_status(n[: -len(".json")]) for n in names[:limit]]
+
+
+def errors_path(import_id):
+    return _paths(import_id)[2]
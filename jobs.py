@@ -0,0 +1,365 @@
+import json
+import logging
+import multiprocessing
+import os
+import random
+import signal
+import socket
+import threading
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, or_, select, update
+
+from extensions import db
+from models import Job
+
+# --------------------------------------------------
+# Background jobs
+# --------------------------------------------------
+# Slow work is queued as a row in the `job` table and done by `flask worker`,
+# so handlers enqueue and return straight away. Workers claim rows with
+# SELECT ... FOR UPDATE SKIP LOCKED (on SQLite a conditional UPDATE does the
+# same job), so any number of threads, processes or hosts can share the
+# queue without a broker.
+#
+#   @job("extract_material")
+#   def run_extraction(job, material_id): ...
+#
+#   enqueue("extract_material", {"material_id": 7})
+#
+# A failing job is retried with exponential backoff until max_attempts. A
+# running job whose worker stops sending heartbeats for JOB_LEASE seconds
+# (crash, kill -9) is picked up again by another worker. Job writes are
+# conditional on the attempt a worker holds, so a worker that was only slow
+# gets LeaseLost from set_progress() and its outcome is dropped.
+
+JOBS = {}  # kind -> JobType
+JOB_STATES = ("queued", "running", "done", "failed", "cancelled")
+
+log = logging.getLogger(__name__)
+_app = None
+
+
+class LeaseLost(Exception):
+    """Another worker has taken the job over; this attempt must stop."""
+
+
+class JobType:
+    __slots__ = ("kind", "run", "max_attempts")
+
+    def __init__(self, kind, run, max_attempts):
+        self.kind = kind
+        self.run = run
+        self.max_attempts = max_attempts
+
+
+def job(kind, max_attempts=None):
+    """Register `run(job, **payload)` as the handler for `kind`."""
+
+    def decorator(run):
+        JOBS[kind] = JobType(kind, run, max_attempts)
+        return run
+
+    return decorator
+
+
+def init_jobs(app):
+    global _app
+    app.config.setdefault("JOB_THREADS", int(os.getenv("JOB_THREADS", "2")))
+    app.config.setdefault("JOB_PROCESSES", int(os.getenv("JOB_PROCESSES", "1")))
+    app.config.setdefault("JOB_POLL_INTERVAL", float(os.getenv("JOB_POLL_INTERVAL", "1.0")))
+    app.config.setdefault("JOB_LEASE", int(os.getenv("JOB_LEASE", "600")))
+    app.config.setdefault("JOB_MAX_ATTEMPTS", 3)
+    app.config.setdefault("JOB_RETRY_BASE", 10)  # seconds before the first retry
+    app.config.setdefault("JOB_RETRY_MAX", 3600)
+    _app = app
+
+
+# ---------------- Enqueueing ----------------
+
+
+def enqueue(kind, payload=None, delay=0, commit=True):
+    """Queue a job and return it. `payload` must be JSON-serializable. With
+    commit=False the job is only flushed, joining the caller's transaction."""
+    if kind not in JOBS:
+        raise LookupError(f"No job handler for {kind!r}")
+    item = Job(
+        kind=kind,
+        payload=json.dumps(payload or {}),
+        state="queued",
+        attempts=0,
+        max_attempts=JOBS[kind].max_attempts or _app.config["JOB_MAX_ATTEMPTS"],
+        run_at=datetime.utcnow() + timedelta(seconds=delay),
+    )
+    db.session.add(item)
+    if commit:
+        db.session.commit()
+    else:
+        db.session.flush()
+    return item
+
+
+def cancel(job_id):
+    """Cancel a job that has not started; False once a worker has claimed it.
+    Part of the caller's transaction."""
+    return bool(
+        db.session.execute(
+            update(Job)
+            .where(Job.id == job_id, Job.state == "queued")
+            .values(state="cancelled", finished_at=datetime.utcnow())
+        ).rowcount
+    )
+
+
+def set_progress(item, done, total=None, message=None):
+    """Record progress and renew the lease. Commits the current session, so
+    call it between units of work. Raises LeaseLost (after rolling back) if
+    the lease expired and another worker has claimed the job."""
+    values = {"done": done, "heartbeat_at": datetime.utcnow()}
+    if total is not None:
+        values["total"] = total
+    if message is not None:
+        values["message"] = message[:500]
+    if not db.session.execute(update(Job).where(_owned(item)).values(values)).rowcount:
+        db.session.rollback()
+        raise LeaseLost(f"Job {item.id} was claimed by another worker")
+    db.session.commit()
+
+
+def job_status(job_id):
+    item = db.session.get(Job, job_id)
+    return _as_dict(item) if item else None
+
+
+def recent_jobs(kind=None, state=None, limit=50):
+    query = select(Job).order_by(Job.id.desc()).limit(limit)
+    if kind:
+        query = query.where(Job.kind == kind)
+    if state:
+        query = query.where(Job.state == state)
+    return [_as_dict(item) for item in db.session.scalars(query)]
+
+
+def _as_dict(item):
+    percent = None
+    if item.total:
+        percent = round(100 * (item.done or 0) / item.total, 1)
+    return {
+        "id": item.id,
+        "kind": item.kind,
+        "state": item.state,
+        "attempts": item.attempts,
+        "max_attempts": item.max_attempts,
+        "done": item.done,
+        "total": item.total,
+        "percent": percent,
+        "message": item.message,
+        "result": json.loads(item.result) if item.result else None,
+        "error": item.error,
+        "run_at": _iso(item.run_at),
+        "created_at": _iso(item.created_at),
+        "finished_at": _iso(item.finished_at),
+    }
+
+
+def _iso(value):
+    return value.isoformat() if value else None
+
+
+# ---------------- Claiming and running ----------------
+
+
+def _claimable(now):
+    stale = now - timedelta(seconds=_app.config["JOB_LEASE"])
+    return or_(
+        and_(Job.state == "queued", Job.run_at <= now),
+        and_(Job.state == "running", Job.heartbeat_at < stale),
+    )
+
+
+def claim(worker, kinds=None):
+    """Take the next due job for `worker`, or None when the queue is idle."""
+    now = datetime.utcnow()
+    query = (
+        select(Job.id)
+        .where(_claimable(now))
+        .order_by(Job.run_at, Job.id)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+    )
+    if kinds:
+        query = query.where(Job.kind.in_(kinds))
+    job_id = db.session.scalar(query)
+    if job_id is None:
+        db.session.rollback()
+        return None
+    # Re-checking the condition makes the claim safe where FOR UPDATE is a
+    # no-op (SQLite): only one worker's UPDATE matches
+    claimed = db.session.execute(
+        update(Job)
+        .where(Job.id == job_id, _claimable(now))
+        .values(
+            state="running",
+            attempts=Job.attempts + 1,
+            worker=worker,
+            heartbeat_at=now,
+            error=None,
+        )
+    ).rowcount
+    db.session.commit()
+    if not claimed:
+        return None
+    item = db.session.get(Job, job_id)
+    # Which attempt this worker holds; every later write is conditional on it
+    item.lease = (worker, item.attempts)
+    return item
+
+
+def _owned(item):
+    worker, attempts = item.lease
+    return and_(Job.id == item.id, Job.worker == worker, Job.attempts == attempts)
+
+
+def _record(item, values):
+    """Write the outcome unless another worker took the job over meanwhile."""
+    if db.session.execute(update(Job).where(_owned(item)).values(values)).rowcount:
+        db.session.commit()
+        return values["state"]
+    db.session.rollback()
+    log.warning("Job %s (%s) was claimed by another worker; outcome dropped", item.id, item.kind)
+    return None
+
+
+def run_job(item):
+    """Run a claimed job and record the outcome; returns its final state, or
+    None if its lease expired and another worker claimed it meanwhile."""
+    job_id, kind = item.id, item.kind
+    attempts, max_attempts = item.lease[1], item.max_attempts
+    handler = JOBS.get(kind)
+    try:
+        if handler is None:
+            raise LookupError(f"No job handler for {kind!r}")
+        if attempts > max_attempts:
+            # Lease expired on the last attempt: the worker died mid-run
+            raise RuntimeError("Worker stopped during the final attempt.")
+        result = handler.run(item, **json.loads(item.payload))
+        return _record(
+            item,
+            {
+                "state": "done",
+                "result": json.dumps(result) if result is not None else None,
+                "finished_at": datetime.utcnow(),
+            },
+        )
+    except LeaseLost:
+        log.warning("Job %s (%s) was claimed by another worker; stopped", job_id, kind)
+        return None
+    except Exception as e:
+        log.exception("Job %s (%s) failed", job_id, kind)
+        db.session.rollback()
+        values = {"error": f"{type(e).__name__}: {e}"}
+        if attempts < max_attempts and handler is not None:
+            values["state"] = "queued"
+            values["run_at"] = datetime.utcnow() + timedelta(seconds=_backoff(attempts))
+        else:
+            values["state"] = "failed"
+            values["finished_at"] = datetime.utcnow()
+        return _record(item, values)
+
+
+def _backoff(attempts):
+    delay = min(
+        _app.config["JOB_RETRY_BASE"] * 2 ** (attempts - 1), _app.config["JOB_RETRY_MAX"]
+    )
+    return delay * random.uniform(0.75, 1.25)  # spread retries of a failed batch
+
+
+# ---------------- Worker ----------------
+
+
+def work(app, stop, kinds=None, once=False):
+    """Claim and run jobs until `stop` is set (or, with once, the queue is empty)."""
+    name = f"{socket.gethostname()}:{os.getpid()}:{threading.current_thread().name}"
+    while not stop.is_set():
+        state = None
+        # A fresh app context per job, so nothing cached in g leaks between jobs
+        with app.app_context():
+            try:
+                item = claim(name, kinds)
+                if item is not None:
+                    state = run_job(item)
+            except Exception:
+                log.exception("Job worker %s could not reach the queue", name)
+                db.session.rollback()
+        if state is None:
+            if once:
+                return
+            stop.wait(app.config["JOB_POLL_INTERVAL"])
+
+
+def run_worker(app, threads=None, processes=None, kinds=None, once=False):
+    """Blocking worker pool for `flask worker`; SIGINT/SIGTERM stop it after
+    the jobs in hand finish."""
+    threads = threads or app.config["JOB_THREADS"]
+    processes = processes or app.config["JOB_PROCESSES"]
+    if processes > 1:
+        _run_processes(app, threads, processes, kinds, once)
+    else:
+        _run_threads(app, threads, kinds, once)
+
+
+def _run_threads(app, threads, kinds, once):
+    stop = threading.Event()
+    _on_signals(lambda *_: stop.set())
+    pool = [
+        threading.Thread(
+            target=work, args=(app, stop, kinds, once), name=f"job-{n}", daemon=True
+        )
+        for n in range(threads)
+    ]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        while thread.is_alive():
+            thread.join(0.5)  # wake up for signals
+
+
+def _run_processes(app, threads, processes, kinds, once):
+    # Forked children inherit the loaded app and registered handlers
+    context = multiprocessing.get_context("fork")
+    children = [
+        context.Process(target=_child, args=(app, threads, kinds, once), name=f"jobs-{n}")
+        for n in range(processes)
+    ]
+    for child in children:
+        child.start()
+
+    def stop(*_):
+        for child in children:
+            if child.is_alive():
+                child.terminate()  # SIGTERM: each finishes its jobs in hand
+
+    _on_signals(stop)
+    for child in children:
+        child.join()
+
+
+def _child(app, threads, kinds, once):
+    with app.app_context():
+        db.engine.dispose(close=False)  # don't share the parent's connections
+    _run_threads(app, threads, kinds, once)
+
+
+def _on_signals(handler):
+    signal.signal(signal.SIGINT, handler)
+    signal.signal(signal.SIGTERM, handler)
+
+
+def start_worker_thread(app, kinds=None):
+    """Run one worker inside this process (the development server)."""
+    stop = threading.Event()
+    thread = threading.Thread(
+        target=work, args=(app, stop, kinds), name="job-embedded", daemon=True
+    )
+    thread.start()
+    return stop
@@ -0,0 +1,60 @@
+import os
+
+from flask import current_app
+from sqlalchemy.orm import joinedload, raiseload, selectinload
+
+from models import Course, Progress, Student, StudyMaterial, Teacher
+
+# --------------------------------------------------
+# Eager-loading profiles
+# --------------------------------------------------
+# Each profile lists the relationship paths a view's template walks, so they
+# are fetched up front (selectin for collections, joined for many-to-one)
+# instead of one lazy query per row. With LOADER_STRICT on, everything not in
+# the profile is `raiseload`-ed, turning an unplanned lazy load into an error.
+
+LOADER_PROFILES = {
+    "admin_teacher_list": [("selectin", Teacher.courses)],
+    "admin_material_list": [
+        ("joined", StudyMaterial.course),
+        ("joined", StudyMaterial.teacher),
+    ],
+    "course_catalog": [("selectin", Course.teachers)],
+    "student_courses": [("selectin", Student.courses)],
+    "student_enrolled_courses": [("selectin", Student.courses, Course.teachers)],
+    "teacher_roster": [("selectin", Teacher.courses, Course.students)],
+    "teacher_material_list": [("joined", StudyMaterial.course)],
+    "progress_detail": [
+        ("joined", Progress.material),
+        ("joined", Progress.recorded_class),
+        ("joined", Progress.live_class),
+        ("joined", Progress.exam),
+    ],
+}
+
+_LOADERS = {"selectin": selectinload, "joined": joinedload}
+
+
+def init_loaders(app):
+    app.config.setdefault("LOADER_STRICT", os.getenv("LOADER_STRICT") == "1")
+
+
+def loader_options(profile, strict=False):
+    options = [raiseload("*")] if strict else []
+    for strategy, *path in LOADER_PROFILES[profile]:
+        loader = None
+        for attr in path:
+            if loader is None:
+                loader = _LOADERS[strategy](attr)
+            else:
+                loader = getattr(loader, f"{strategy}load")(attr)
+            if strict:
+                options.append(loader.raiseload("*"))
+        options.append(loader)
+    return options
+
+
+def with_profile(query, profile):
+    """Apply a named eager-loading profile to an ORM query."""
+    strict = current_app.config.get("LOADER_STRICT", False)
+    return query.options(*loader_options(profile, strict))
@@ -0,0 +1,119 @@
+from sqlalchemy import select, update
+
+from cache import app_cache
+from extensions import db
+from models import Course
+import readmodels
+
+# --------------------------------------------------
+# Course content manifests
+# --------------------------------------------------
+# Everything a student page lists for a course (materials, recorded and live
+# classes, exams) is built once per course and cached under the course's
+# `content_version`. Routes that add, edit or delete content call
+# bump_content_version(), so a student's view costs one primary-key lookup of
+# versions plus a merge of cached manifests.
+
+MANIFEST_TTL = 6 * 3600
+
+
+class CourseManifest:
+    __slots__ = (
+        "course_id",
+        "version",
+        "materials",
+        "recorded_classes",
+        "live_classes",
+        "exams",
+    )
+
+    def __init__(self, course_id, version):
+        self.course_id = course_id
+        self.version = version
+        self.materials = []
+        self.recorded_classes = []
+        self.live_classes = []
+        self.exams = []
+
+    @property
+    def counts(self):
+        return {
+            "materials": len(self.materials),
+            "recorded_classes": len(self.recorded_classes),
+            "live_classes": len(self.live_classes),
+            "exams": len(self.exams),
+        }
+
+
+class StudentContent:
+    """Merged manifests of a student's enrolled courses."""
+
+    __slots__ = ("materials", "recorded_classes", "live_classes", "exams")
+
+    def __init__(self, manifests):
+        self.materials = [m for mf in manifests for m in mf.materials]
+        self.recorded_classes = [r for mf in manifests for r in mf.recorded_classes]
+        self.live_classes = [lc for mf in manifests for lc in mf.live_classes]
+        self.exams = sorted(
+            (e for mf in manifests for e in mf.exams),
+            key=lambda e: e.created_at,
+            reverse=True,
+        )
+
+    @property
+    def total_items(self):
+        return (
+            len(self.materials)
+            + len(self.recorded_classes)
+            + len(self.live_classes)
+            + len(self.exams)
+        )
+
+
+def bump_content_version(*course_ids):
+    """Invalidate cached manifests; call inside the transaction that changes content."""
+    ids = [int(cid) for cid in course_ids if cid is not None]
+    if ids:
+        db.session.execute(
+            update(Course)
+            .where(Course.id.in_(ids))
+            .values(content_version=Course.content_version + 1)
+        )
+
+
+def course_versions(course_ids):
+    rows = db.session.execute(
+        select(Course.id, Course.content_version).where(Course.id.in_(course_ids))
+    )
+    return dict(rows.all())
+
+
+def get_manifests(course_ids):
+    versions = course_versions(course_ids)
+    manifests, missing = {}, []
+    for course_id, version in versions.items():
+        manifest = app_cache.get(("manifest", course_id, version))
+        if manifest is None:
+            missing.append(course_id)
+        else:
+            manifests[course_id] = manifest
+
+    if missing:
+        built = {cid: CourseManifest(cid, versions[cid]) for cid in missing}
+        for row in readmodels.materials_for(missing):
+            built[row.course_id].materials.append(row)
+        for row in readmodels.recorded_classes_for(missing):
+            built[row.course_id].recorded_classes.append(row)
+        for row in readmodels.live_classes_for(missing):
+            built[row.course_id].live_classes.append(row)
+        for row in readmodels.exams_for(missing):
+            built[row.course_id].exams.append(row)
+        for cid, manifest in built.items():
+            app_cache.set(("manifest", cid, manifest.version), manifest, MANIFEST_TTL)
+        manifests.update(built)
+
+    return [manifests[cid] for cid in course_ids if cid in manifests]
+
+
+def student_content(course_ids):
+    return StudentContent(get_manifests(course_ids))
@@ -0,0 +1,104 @@
+"""Search indexes
+
+Revision ID: 3f1a9c2e7b5d
+Revises: 7c4793fbdf83
+Create Date: 2026-10-19 09:12:40.218311
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f1a9c2e7b5d'
+down_revision = '7c4793fbdf83'
+branch_labels = None
+depends_on = None
+
+
+# table -> columns that make up its search document
+SEARCH_TABLES = {
+    'student': ('name', 'email'),
+    'teacher': ('name', 'email'),
+    'course': ('name', 'description'),
+    'studymaterial': ('title', 'description'),
+}
+
+TRIGRAM_COLUMNS = {
+    'student': ('name', 'email'),
+    'teacher': ('name', 'email'),
+    'course': ('name',),
+    'studymaterial': ('title',),
+}
+
+
+def _upgrade_postgresql():
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for table, columns in SEARCH_TABLES.items():
+        document = " || ' ' || ".join(f"coalesce({c}, '')" for c in columns)
+        op.execute(
+            f"ALTER TABLE {table} ADD COLUMN search_vector tsvector "
+            f"GENERATED ALWAYS AS (to_tsvector('simple', {document})) STORED"
+        )
+        op.execute(
+            f"CREATE INDEX ix_{table}_search ON {table} USING gin (search_vector)"
+        )
+    for table, columns in TRIGRAM_COLUMNS.items():
+        for column in columns:
+            op.execute(
+                f"CREATE INDEX ix_{table}_{column}_trgm ON {table} "
+                f"USING gin ({column} gin_trgm_ops)"
+            )
+
+
+def _upgrade_sqlite():
+    for table, columns in SEARCH_TABLES.items():
+        fts = f"{table}_fts"
+        cols = ", ".join(columns)
+        new_cols = ", ".join(f"new.{c}" for c in columns)
+        old_cols = ", ".join(f"old.{c}" for c in columns)
+        op.execute(
+            f"CREATE VIRTUAL TABLE {fts} USING fts5({cols}, "
+            f"content='{table}', content_rowid='id', tokenize='unicode61')"
+        )
+        op.execute(
+            f"CREATE TRIGGER {fts}_ai AFTER INSERT ON {table} BEGIN "
+            f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new_cols}); END"
+        )
+        op.execute(
+            f"CREATE TRIGGER {fts}_ad AFTER DELETE ON {table} BEGIN "
+            f"INSERT INTO {fts}({fts}, rowid, {cols}) "
+            f"VALUES ('delete', old.id, {old_cols}); END"
+        )
+        op.execute(
+            f"CREATE TRIGGER {fts}_au AFTER UPDATE ON {table} BEGIN "
+            f"INSERT INTO {fts}({fts}, rowid, {cols}) "
+            f"VALUES ('delete', old.id, {old_cols}); "
+            f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new_cols}); END"
+        )
+        op.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        _upgrade_postgresql()
+    elif dialect == 'sqlite':
+        _upgrade_sqlite()
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        for table, columns in TRIGRAM_COLUMNS.items():
+            for column in columns:
+                op.execute(f"DROP INDEX IF EXISTS ix_{table}_{column}_trgm")
+        for table in SEARCH_TABLES:
+            op.execute(f"DROP INDEX IF EXISTS ix_{table}_search")
+            op.execute(f"ALTER TABLE {table} DROP COLUMN IF EXISTS search_vector")
+    elif dialect == 'sqlite':
+        for table in SEARCH_TABLES:
+            fts = f"{table}_fts"
+            for suffix in ('ai', 'ad', 'au'):
+                op.execute(f"DROP TRIGGER IF EXISTS {fts}_{suffix}")
+            op.execute(f"DROP TABLE IF EXISTS {fts}")
@@ -0,0 +1,94 @@
+"""Material text extraction
+
+Revision ID: 9b2d4e6f8a1c
+Revises: 3f1a9c2e7b5d
+Create Date: 2026-10-19 11:02:17.540932
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9b2d4e6f8a1c'
+down_revision = '3f1a9c2e7b5d'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('material_extraction',
+    sa.Column('material_id', sa.Integer(), nullable=False),
+    sa.Column('content_hash', sa.String(length=64), nullable=True),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['material_id'], ['studymaterial.id'], name='fk_extraction_material'),
+    sa.PrimaryKeyConstraint('material_id')
+    )
+    with op.batch_alter_table('material_extraction', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_material_extraction_content_hash'), ['content_hash'], unique=False)
+
+    op.create_table('material_text',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('material_id', sa.Integer(), nullable=False),
+    sa.Column('course_id', sa.Integer(), nullable=False),
+    sa.Column('member', sa.String(length=3000), nullable=True),
+    sa.Column('content', sa.Text(), nullable=False),
+    sa.ForeignKeyConstraint(['course_id'], ['course.id'], name='fk_text_course'),
+    sa.ForeignKeyConstraint(['material_id'], ['studymaterial.id'], name='fk_text_material'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('material_text', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_material_text_course_id'), ['course_id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_material_text_material_id'), ['material_id'], unique=False)
+
+    # Full-text index over extracted content (see search.py)
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        op.execute(
+            "ALTER TABLE material_text ADD COLUMN search_vector tsvector "
+            "GENERATED ALWAYS AS (to_tsvector('simple', content)) STORED"
+        )
+        op.execute(
+            "CREATE INDEX ix_material_text_search ON material_text "
+            "USING gin (search_vector)"
+        )
+    elif dialect == 'sqlite':
+        op.execute(
+            "CREATE VIRTUAL TABLE material_text_fts USING fts5(content, "
+            "content='material_text', content_rowid='id', tokenize='unicode61')"
+        )
+        op.execute(
+            "CREATE TRIGGER material_text_fts_ai AFTER INSERT ON material_text BEGIN "
+            "INSERT INTO material_text_fts(rowid, content) VALUES (new.id, new.content); END"
+        )
+        op.execute(
+            "CREATE TRIGGER material_text_fts_ad AFTER DELETE ON material_text BEGIN "
+            "INSERT INTO material_text_fts(material_text_fts, rowid, content) "
+            "VALUES ('delete', old.id, old.content); END"
+        )
+        op.execute(
+            "CREATE TRIGGER material_text_fts_au AFTER UPDATE ON material_text BEGIN "
+            "INSERT INTO material_text_fts(material_text_fts, rowid, content) "
+            "VALUES ('delete', old.id, old.content); "
+            "INSERT INTO material_text_fts(rowid, content) VALUES (new.id, new.content); END"
+        )
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        for suffix in ('ai', 'ad', 'au'):
+            op.execute(f"DROP TRIGGER IF EXISTS material_text_fts_{suffix}")
+        op.execute("DROP TABLE IF EXISTS material_text_fts")
+
+    with op.batch_alter_table('material_text', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_material_text_material_id'))
+        batch_op.drop_index(batch_op.f('ix_material_text_course_id'))
+
+    op.drop_table('material_text')
+    with op.batch_alter_table('material_extraction', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_material_extraction_content_hash'))
+
+    op.drop_table('material_extraction')
@@ -0,0 +1,41 @@
+"""Progress summary
+
+Revision ID: a7c3e9d1f5b2
+Revises: e1f4b6a9c3d7
+Create Date: 2026-10-19 14:32:08.417530
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a7c3e9d1f5b2'
+down_revision = 'e1f4b6a9c3d7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('progress_summary',
+    sa.Column('student_id', sa.Integer(), nullable=False),
+    sa.Column('course_id', sa.Integer(), nullable=False),
+    sa.Column('materials_completed', sa.Integer(), nullable=False),
+    sa.Column('materials_total', sa.Integer(), nullable=False),
+    sa.Column('recorded_completed', sa.Integer(), nullable=False),
+    sa.Column('recorded_total', sa.Integer(), nullable=False),
+    sa.Column('live_completed', sa.Integer(), nullable=False),
+    sa.Column('live_total', sa.Integer(), nullable=False),
+    sa.Column('exams_completed', sa.Integer(), nullable=False),
+    sa.Column('exams_total', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('student_id', 'course_id')
+    )
+    with op.batch_alter_table('progress_summary', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_progress_summary_course_id'), ['course_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('progress_summary', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_progress_summary_course_id'))
+
+    op.drop_table('progress_summary')
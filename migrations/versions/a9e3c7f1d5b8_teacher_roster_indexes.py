@@ -0,0 +1,38 @@
+"""Teacher roster indexes
+
+Revision ID: a9e3c7f1d5b8
+Revises: f3b7d1a9e2c4
+Create Date: 2026-10-19 20:11:37.604118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a9e3c7f1d5b8'
+down_revision = 'f3b7d1a9e2c4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('student_course', schema=None) as batch_op:
+        batch_op.create_index('ix_student_course_course_id_student_id', ['course_id', 'student_id'], unique=False)
+
+    with op.batch_alter_table('exam_attempt', schema=None) as batch_op:
+        batch_op.create_index('ix_exam_attempt_exam_id', ['exam_id'], unique=False)
+
+    with op.batch_alter_table('question', schema=None) as batch_op:
+        batch_op.create_index('ix_question_exam_id', ['exam_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('question', schema=None) as batch_op:
+        batch_op.drop_index('ix_question_exam_id')
+
+    with op.batch_alter_table('exam_attempt', schema=None) as batch_op:
+        batch_op.drop_index('ix_exam_attempt_exam_id')
+
+    with op.batch_alter_table('student_course', schema=None) as batch_op:
+        batch_op.drop_index('ix_student_course_course_id_student_id')
@@ -0,0 +1,38 @@
+"""Notification outbox
+
+Revision ID: b1d7f3e9a2c6
+Revises: e6a4b9c2f8d1
+Create Date: 2026-10-19 23:02:17.415803
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b1d7f3e9a2c6'
+down_revision = 'e6a4b9c2f8d1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('notification',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('topic', sa.String(length=100), nullable=False),
+    sa.Column('event', sa.String(length=50), nullable=False),
+    sa.Column('data', sa.Text(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('notification', schema=None) as batch_op:
+        batch_op.create_index('ix_notification_topic_id', ['topic', 'id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_notification_created_at'), ['created_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('notification', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_notification_created_at'))
+        batch_op.drop_index('ix_notification_topic_id')
+
+    op.drop_table('notification')
@@ -0,0 +1,27 @@
+"""Progress course index
+
+Revision ID: b4d8f2a6c1e9
+Revises: a7c3e9d1f5b2
+Create Date: 2026-10-19 15:06:44.281903
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b4d8f2a6c1e9'
+down_revision = 'a7c3e9d1f5b2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Existing rows get course_id from `flask progress-backfill`
+    with op.batch_alter_table('progress', schema=None) as batch_op:
+        batch_op.create_index('ix_progress_course_id_student_id', ['course_id', 'student_id'], unique=False, postgresql_include=['completed'])
+
+
+def downgrade():
+    with op.batch_alter_table('progress', schema=None) as batch_op:
+        batch_op.drop_index('ix_progress_course_id_student_id')
@@ -0,0 +1,40 @@
+"""Pagination indexes
+
+Revision ID: c5e8a7d3b2f0
+Revises: 9b2d4e6f8a1c
+Create Date: 2026-10-19 12:40:03.118254
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c5e8a7d3b2f0'
+down_revision = '9b2d4e6f8a1c'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('studymaterial', schema=None) as batch_op:
+        batch_op.create_index('ix_studymaterial_teacher_id_id', ['teacher_id', 'id'], unique=False)
+
+    with op.batch_alter_table('exam', schema=None) as batch_op:
+        batch_op.create_index('ix_exam_teacher_id_id', ['teacher_id', 'id'], unique=False)
+
+    with op.batch_alter_table('feedback', schema=None) as batch_op:
+        batch_op.create_index('ix_feedback_teacher_id_id', ['teacher_id', 'id'], unique=False)
+        batch_op.create_index('ix_feedback_student_id_id', ['student_id', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('feedback', schema=None) as batch_op:
+        batch_op.drop_index('ix_feedback_student_id_id')
+        batch_op.drop_index('ix_feedback_teacher_id_id')
+
+    with op.batch_alter_table('exam', schema=None) as batch_op:
+        batch_op.drop_index('ix_exam_teacher_id_id')
+
+    with op.batch_alter_table('studymaterial', schema=None) as batch_op:
+        batch_op.drop_index('ix_studymaterial_teacher_id_id')
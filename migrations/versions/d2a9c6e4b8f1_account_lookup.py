@@ -0,0 +1,42 @@
+"""Account lookup
+
+Revision ID: d2a9c6e4b8f1
+Revises: b4d8f2a6c1e9
+Create Date: 2026-10-19 15:48:19.730264
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd2a9c6e4b8f1'
+down_revision = 'b4d8f2a6c1e9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('account',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('email', sa.String(length=1000), nullable=False),
+    sa.Column('role', sa.String(length=10), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('password', sa.String(length=1000), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('email', 'role', name='uq_account_email_role'),
+    sa.UniqueConstraint('role', 'user_id', name='uq_account_role_user_id')
+    )
+
+    # Backfill; where emails differ only by case the oldest user keeps it
+    for role, table in (('student', 'student'), ('teacher', 'teacher'), ('admin', 'admin')):
+        op.execute(
+            f"INSERT INTO account (email, role, user_id, password) "
+            f"SELECT lower(trim(email)), '{role}', id, password FROM {table} "
+            f"WHERE id IN (SELECT min(id) FROM {table} WHERE email IS NOT NULL "
+            f"GROUP BY lower(trim(email)))"
+        )
+
+
+def downgrade():
+    op.drop_table('account')
@@ -0,0 +1,26 @@
+"""Course content version
+
+Revision ID: e1f4b6a9c3d7
+Revises: c5e8a7d3b2f0
+Create Date: 2026-10-19 13:55:41.602147
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e1f4b6a9c3d7'
+down_revision = 'c5e8a7d3b2f0'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('course', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('content_version', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade():
+    with op.batch_alter_table('course', schema=None) as batch_op:
+        batch_op.drop_column('content_version')
@@ -0,0 +1,36 @@
+"""Soft delete for courses and teachers
+
+Revision ID: e6a4b9c2f8d1
+Revises: c8f2e5a1d7b3
+Create Date: 2026-10-19 22:15:48.902671
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e6a4b9c2f8d1'
+down_revision = 'c8f2e5a1d7b3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('course', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('deleted_at', sa.DateTime(), nullable=True))
+        batch_op.add_column(sa.Column('purge_job_id', sa.Integer(), nullable=True))
+
+    with op.batch_alter_table('teacher', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('deleted_at', sa.DateTime(), nullable=True))
+        batch_op.add_column(sa.Column('purge_job_id', sa.Integer(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('teacher', schema=None) as batch_op:
+        batch_op.drop_column('purge_job_id')
+        batch_op.drop_column('deleted_at')
+
+    with op.batch_alter_table('course', schema=None) as batch_op:
+        batch_op.drop_column('purge_job_id')
+        batch_op.drop_column('deleted_at')
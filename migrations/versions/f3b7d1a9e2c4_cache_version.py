@@ -0,0 +1,28 @@
+"""Cache version stamps
+
+Revision ID: f3b7d1a9e2c4
+Revises: d2a9c6e4b8f1
+Create Date: 2026-10-19 18:02:41.512307
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3b7d1a9e2c4'
+down_revision = 'd2a9c6e4b8f1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('cache_version',
+    sa.Column('name', sa.String(length=100), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+
+
+def downgrade():
+    op.drop_table('cache_version')
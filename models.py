@@ -12,6 +12,61 @@ class Admin(db.Model):
     email = db.Column(db.String(12000), unique=True)
     password = db.Column(db.String(20000))
 
+# =========================
+# ACCOUNT (login lookup)
+# =========================
+# One row per admin/teacher/student keyed by normalized email; maintained by identity.py
+class Account(db.Model):
+    __tablename__ = 'account'
+    __table_args__ = (
+        db.UniqueConstraint('email', 'role', name='uq_account_email_role'),
+        db.UniqueConstraint('role', 'user_id', name='uq_account_role_user_id'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    email = db.Column(db.String(1000), nullable=False)
+    role = db.Column(db.String(10), nullable=False)
+    user_id = db.Column(db.Integer, nullable=False)
+    password = db.Column(db.String(1000))
+
+class CacheVersion(db.Model):
+    __tablename__ = 'cache_version'
+
+    name = db.Column(db.String(100), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+class Job(db.Model):
+    __tablename__ = 'job'
+    __table_args__ = (db.Index('ix_job_state_run_at', 'state', 'run_at'),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(50), nullable=False)
+    payload = db.Column(db.Text, nullable=False, default='{}')  # JSON keyword arguments
+    state = db.Column(db.String(20), nullable=False, default='queued')  # queued/running/done/failed/cancelled
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=3)
+    run_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    worker = db.Column(db.String(200))
+    heartbeat_at = db.Column(db.DateTime)
+    done = db.Column(db.Integer)  # progress, in units of `total`
+    total = db.Column(db.Integer)
+    message = db.Column(db.String(500))
+    result = db.Column(db.Text)  # JSON
+    error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime)
+
+# Outbox of events pushed to browsers over SSE; written by notifications.py
+class Notification(db.Model):
+    __tablename__ = 'notification'
+    __table_args__ = (db.Index('ix_notification_topic_id', 'topic', 'id'),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    topic = db.Column(db.String(100), nullable=False)  # student:<id> or course:<id>
+    event = db.Column(db.String(50), nullable=False)
+    data = db.Column(db.Text, nullable=False)  # JSON
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
 # =========================
 # ASSOCIATION TABLES
 # =========================
@@ -19,7 +74,8 @@ student_course = db.Table(
     'student_course',
     db.Column('student_id',db.Integer,db.ForeignKey('student.id', name='fk_student_course_student'),primary_key=True),
     db.Column('course_id',db.Integer,db.ForeignKey('course.id', name='fk_student_course_course'),primary_key=True),
-    db.Column('enrolled_on', db.Date, default=date.today))
+    db.Column('enrolled_on', db.Date, default=date.today),
+    db.Index('ix_student_course_course_id_student_id', 'course_id', 'student_id'))
 
 teacher_course = db.Table(
     'teacher_course',
@@ -36,6 +92,9 @@ class Course(db.Model):
     name = db.Column(db.String(1000), nullable=False, unique=True)
     description = db.Column(db.Text, nullable=False)
     start_date = db.Column(db.Date)
+    content_version = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    deleted_at = db.Column(db.DateTime)  # tombstone: hidden until purged or restored (deletion.py)
+    purge_job_id = db.Column(db.Integer)
 
     teachers = db.relationship('Teacher', secondary=teacher_course, back_populates='courses')
     students = db.relationship('Student', secondary=student_course, back_populates='courses')
@@ -61,6 +120,8 @@ class Teacher(db.Model):
     contact = db.Column(db.String(150), nullable=False)
     place = db.Column(db.String(1000), nullable=False)
     status = db.Column(db.String(200),default="Active")
+    deleted_at = db.Column(db.DateTime)  # tombstone: hidden until purged or restored (deletion.py)
+    purge_job_id = db.Column(db.Integer)
 
     courses = db.relationship('Course', secondary=teacher_course, back_populates='teachers',cascade='all,delete')
     attendance = db.relationship('Attendance', back_populates='teacher', cascade='all, delete')
@@ -144,6 +205,7 @@ class LiveClass(db.Model):
 # =========================
 class StudyMaterial(db.Model):
     __tablename__ = 'studymaterial'
+    __table_args__ = (db.Index('ix_studymaterial_teacher_id_id', 'teacher_id', 'id'),)
 
     id = db.Column(db.Integer, primary_key=True)
     teacher_id = db.Column(db.Integer,db.ForeignKey('teacher.id', name='fk_material_teacher'),nullable=False)
@@ -155,12 +217,40 @@ class StudyMaterial(db.Model):
 
     teacher = db.relationship('Teacher', back_populates='materials')
     course = db.relationship('Course', back_populates='materials')
+    extraction = db.relationship('MaterialExtraction', uselist=False, cascade='all, delete')
+    texts = db.relationship('MaterialText', back_populates='material', cascade='all, delete')
+
+# =========================
+# MATERIAL TEXT EXTRACTION
+# =========================
+class MaterialExtraction(db.Model):
+    __tablename__ = 'material_extraction'
+
+    material_id = db.Column(db.Integer,db.ForeignKey('studymaterial.id', name='fk_extraction_material'),primary_key=True)
+    content_hash = db.Column(db.String(64), index=True)
+    status = db.Column(db.String(20), nullable=False, default='pending')  # pending/running/done/failed/unsupported
+    error = db.Column(db.Text)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class MaterialText(db.Model):
+    __tablename__ = 'material_text'
+
+    id = db.Column(db.Integer, primary_key=True)
+    material_id = db.Column(db.Integer,db.ForeignKey('studymaterial.id', name='fk_text_material'),nullable=False,index=True)
+    course_id = db.Column(db.Integer,db.ForeignKey('course.id', name='fk_text_course'),nullable=False,index=True)
+    member = db.Column(db.String(3000))  # zip member name, None for the file itself
+    content = db.Column(db.Text, nullable=False)
+
+    material = db.relationship('StudyMaterial', back_populates='texts')
 
 # =========================
 # PROGRESS
 # =========================
 class Progress(db.Model):
     __tablename__ = 'progress'
+    __table_args__ = (
+        db.Index('ix_progress_course_id_student_id', 'course_id', 'student_id', postgresql_include=['completed']),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     student_id = db.Column(db.Integer,db.ForeignKey('student.id', name='fk_progress_student'),nullable=False)
@@ -178,11 +268,38 @@ class Progress(db.Model):
     live_class = db.relationship('LiveClass', backref='progress_entries')
     exam =db.relationship('Exam',backref='progress_entries')
 
+# =========================
+# PROGRESS SUMMARY
+# =========================
+# Derived from Progress and course content; maintained by progress_summary.py
+class ProgressSummary(db.Model):
+    __tablename__ = 'progress_summary'
+
+    student_id = db.Column(db.Integer, primary_key=True)
+    course_id = db.Column(db.Integer, primary_key=True, index=True)
+    materials_completed = db.Column(db.Integer, nullable=False, default=0)
+    materials_total = db.Column(db.Integer, nullable=False, default=0)
+    recorded_completed = db.Column(db.Integer, nullable=False, default=0)
+    recorded_total = db.Column(db.Integer, nullable=False, default=0)
+    live_completed = db.Column(db.Integer, nullable=False, default=0)
+    live_total = db.Column(db.Integer, nullable=False, default=0)
+    exams_completed = db.Column(db.Integer, nullable=False, default=0)
+    exams_total = db.Column(db.Integer, nullable=False, default=0)
+
+    @property
+    def completed_items(self):
+        return self.materials_completed + self.recorded_completed + self.live_completed + self.exams_completed
+
+    @property
+    def total_items(self):
+        return self.materials_total + self.recorded_total + self.live_total + self.exams_total
+
 # =========================
 # EXAM
 # =========================
 class Exam(db.Model):
     __tablename__ = 'exam'
+    __table_args__ = (db.Index('ix_exam_teacher_id_id', 'teacher_id', 'id'),)
 
     id = db.Column(db.Integer, primary_key=True)
     teacher_id = db.Column(db.Integer,db.ForeignKey('teacher.id', name='fk_exam_teacher'),nullable=False)
@@ -199,6 +316,7 @@ class Exam(db.Model):
 # =========================
 class ExamAttempt(db.Model):
     __tablename__ = 'exam_attempt'
+    __table_args__ = (db.Index('ix_exam_attempt_exam_id', 'exam_id'),)
 
     id = db.Column(db.Integer, primary_key=True)
     student_id = db.Column(db.Integer,db.ForeignKey('student.id'),nullable=False)
@@ -216,6 +334,7 @@ class ExamAttempt(db.Model):
 # =========================
 class Question(db.Model):
     __tablename__ = 'question'
+    __table_args__ = (db.Index('ix_question_exam_id', 'exam_id'),)
     id = db.Column(db.Integer, primary_key=True)
     exam_id = db.Column(db.Integer,db.ForeignKey('exam.id', name='fk_question_exam'),nullable=False)
     question_text = db.Column(db.Text, nullable=False)
@@ -259,6 +378,10 @@ class ExamResult(db.Model):
 #FEEDBACK
 # =========================
 class Feedback(db.Model):
+    __table_args__ = (
+        db.Index('ix_feedback_teacher_id_id', 'teacher_id', 'id'),
+        db.Index('ix_feedback_student_id_id', 'student_id', 'id'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     student_id = db.Column(db.Integer, nullable=False)
     teacher_id = db.Column(db.Integer, nullable=False)
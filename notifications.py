@@ -0,0 +1,500 @@
+import asyncio
+import json
+import logging
+import os
+import select as io_select
+import threading
+import time
+from datetime import datetime, timedelta
+
+from flask import Response, current_app, session
+from sqlalchemy import delete, func, select, text
+
+from extensions import db
+from jobs import enqueue, job
+from models import Job, LiveClass, Notification, student_course
+
+# --------------------------------------------------
+# Live notifications (Server-Sent Events)
+# --------------------------------------------------
+# Routes that change something a student is waiting for write an event to
+# the `notification` outbox in the same transaction, so it goes out exactly
+# when the change commits:
+#
+#   notify(course_topic(7), "live_class", {...})
+#
+# Browsers hold one EventSource on NOTIFY_URL instead of polling pages. In
+# production that URL is served by the asyncio app below, which keeps every
+# idle connection as a parked coroutine, so one process holds tens of
+# thousands of them:
+#
+#   NOTIFY_URL=/events uvicorn app:events_app --workers 4
+#
+# and the proxy routes NOTIFY_URL to it. While NOTIFY_URL is unset pages
+# don't connect at all.
+#
+# One thread per process tails the outbox: LISTEN/NOTIFY wakes it on
+# PostgreSQL, elsewhere it polls every NOTIFY_POLL_INTERVAL seconds. Rows are
+# fanned out by topic to the connections subscribed to them. Event ids are
+# outbox ids, so a reconnecting browser sends Last-Event-ID and is replayed
+# what it missed, plus the last LATE_COMMIT seconds of rows (the browser
+# drops ids it has already seen). In development (debug, or NOTIFY_DEV_STREAM=1) a Flask
+# route in app.py serves /events itself, holding a thread per connection; it
+# must never face real traffic, as each stream ties up a WSGI worker.
+#
+# Topics: student:<id> (feedback replies) and course:<id> (live classes).
+
+log = logging.getLogger(__name__)
+
+REPLAY_LIMIT = 500  # rows per catch-up query
+# How long a row may take to commit after a higher id did. Ids come from a
+# sequence, so on PostgreSQL row 11 can commit before row 10
+LATE_COMMIT = 60
+MAX_GAPS = 1000
+LISTEN_TIMEOUT = 30  # seconds between safety polls while LISTENing
+PRUNE_EVERY = 3600
+
+
+def init_notifications(app):
+    app.config.setdefault(
+        "NOTIFY_DEV_STREAM", app.debug or os.getenv("NOTIFY_DEV_STREAM") == "1"
+    )
+    app.config.setdefault(
+        "NOTIFY_URL",
+        os.getenv("NOTIFY_URL") or ("/events" if app.config["NOTIFY_DEV_STREAM"] else None),
+    )
+    app.config.setdefault("NOTIFY_CHANNEL", "smartlearn_outbox")
+    app.config.setdefault("NOTIFY_POLL_INTERVAL", float(os.getenv("NOTIFY_POLL_INTERVAL", "1.0")))
+    app.config.setdefault("NOTIFY_HEARTBEAT", 25)  # keeps proxies from closing idle streams
+    app.config.setdefault("NOTIFY_QUEUE", 100)  # undelivered events per connection
+    app.config.setdefault("NOTIFY_RETENTION", 86400)  # how far back Last-Event-ID can go
+
+    @app.context_processor
+    def inject_events_url():
+        return {"events_url": app.config["NOTIFY_URL"]}
+
+
+# ---------------- Writing ----------------
+
+
+def student_topic(student_id):
+    return f"student:{student_id}"
+
+
+def course_topic(course_id):
+    return f"course:{course_id}"
+
+
+def notify(topic, event, data):
+    """Add an event to the outbox inside the caller's transaction; listeners
+    see it once the caller commits."""
+    db.session.add(Notification(topic=topic, event=event, data=json.dumps(data)))
+    connection = db.session.connection()
+    if connection.dialect.name == "postgresql":
+        # Delivered at COMMIT, and folded into one per transaction
+        connection.execute(
+            text("SELECT pg_notify(:channel, '')"),
+            {"channel": current_app.config["NOTIFY_CHANNEL"]},
+        )
+
+
+def _starts(live_class):
+    return datetime.combine(live_class.date, live_class.time)
+
+
+def _live_class_data(live_class):
+    return {
+        "id": live_class.id,
+        "course_id": live_class.course_id,
+        "title": live_class.title,
+        "date": live_class.date.isoformat(),
+        "time": live_class.time.strftime("%H:%M"),
+        "platform": live_class.platform,
+        "link": live_class.link,
+    }
+
+
+def announce_live_class(live_class):
+    """Tell the course about a new or rescheduled live class, and queue its
+    "starting" event for the start time. Caller commits."""
+    db.session.flush()
+    notify(course_topic(live_class.course_id), "live_class", _live_class_data(live_class))
+    # Class times are entered in the server's local time
+    delay = (_starts(live_class) - datetime.now()).total_seconds()
+    payload = {"live_class_id": live_class.id, "starts": _starts(live_class).isoformat()}
+    queued = db.session.scalar(
+        select(Job.id).where(
+            Job.kind == "live_class_starting",
+            Job.state == "queued",
+            Job.payload == json.dumps(payload),
+        )
+    )
+    if delay > 0 and queued is None:  # edits that keep the time reuse the job
+        enqueue("live_class_starting", payload, delay=delay, commit=False)
+
+
+@job("live_class_starting")
+def live_class_starting(item, live_class_id, starts):
+    live_class = db.session.get(LiveClass, live_class_id)
+    if live_class is None or _starts(live_class).isoformat() != starts:
+        return {"skipped": True}  # deleted, or moved and queued again
+    notify(course_topic(live_class.course_id), "live_class_starting", _live_class_data(live_class))
+    db.session.commit()
+
+
+def announce_feedback_reply(feedback):
+    notify(
+        student_topic(feedback.student_id),
+        "feedback_reply",
+        {"feedback_id": feedback.id, "teacher_id": feedback.teacher_id},
+    )
+
+
+# ---------------- Reading ----------------
+
+
+def student_topics(student_id):
+    course_ids = db.session.scalars(
+        select(student_course.c.course_id).where(student_course.c.student_id == student_id)
+    )
+    return [student_topic(student_id), *map(course_topic, course_ids)]
+
+
+def latest_id():
+    return db.session.scalar(select(func.max(Notification.id))) or 0
+
+
+def _events(condition, limit=REPLAY_LIMIT):
+    return db.session.execute(
+        select(Notification.id, Notification.topic, Notification.event, Notification.data)
+        .where(condition)
+        .order_by(Notification.id)
+        .limit(limit)
+    ).all()
+
+
+def replay_events(last_id, topics):
+    """What a browser that last saw `last_id` may have missed: later rows and
+    recent rows that committed late, below its id."""
+    recent = datetime.utcnow() - timedelta(seconds=LATE_COMMIT)
+    return _events(
+        Notification.topic.in_(topics)
+        & ((Notification.id > last_id) | (Notification.created_at >= recent))
+    )
+
+
+class OutboxCursor:
+    """Reads new outbox rows once each, including rows committed out of order.
+
+    Ids skipped over are kept as gaps and looked for again on every read for
+    LATE_COMMIT seconds; a rolled-back insert leaves a gap that never fills.
+    """
+
+    def __init__(self, last_id):
+        self.last_id = last_id
+        self.gaps = {}  # id -> monotonic deadline
+
+    def read(self):
+        now = time.monotonic()
+        rows = []
+        if self.gaps:
+            rows = _events(Notification.id.in_(sorted(self.gaps)))
+            for row in rows:
+                del self.gaps[row.id]
+            self.gaps = {i: t for i, t in self.gaps.items() if t > now}
+        while True:
+            batch = _events(Notification.id > self.last_id)
+            for row in batch:
+                for missing in range(max(self.last_id + 1, row.id - MAX_GAPS), row.id):
+                    self.gaps[missing] = now + LATE_COMMIT
+                self.last_id = row.id
+            rows.extend(batch)
+            if len(batch) < REPLAY_LIMIT:
+                return rows
+
+
+def prune_notifications(retention):
+    cutoff = datetime.utcnow() - timedelta(seconds=retention)
+    db.session.execute(delete(Notification).where(Notification.created_at < cutoff))
+    db.session.commit()
+
+
+def last_event_id(value):
+    try:
+        return int(value) if value else None
+    except ValueError:
+        return None
+
+
+def format_event(row):
+    return f"id: {row.id}\nevent: {row.event}\ndata: {row.data}\n\n"
+
+
+RETRY = "retry: 5000\n\n"  # browser reconnect delay (ms)
+KEEP_ALIVE = ": keep-alive\n\n"
+
+
+# ---------------- Development server stream ----------------
+
+
+def poll_stream(app, topics, last_id, replay=False):
+    """SSE response that polls the outbox from this request's thread."""
+    topics = set(topics)
+
+    def stream():
+        yield RETRY
+        with app.app_context():
+            sent = replay_events(last_id, topics) if replay else []
+            cursor = OutboxCursor(max([last_id, *(row.id for row in sent)]))
+        for row in sent:
+            yield format_event(row)
+        idle = 0.0
+        interval = app.config["NOTIFY_POLL_INTERVAL"]
+        while True:
+            with app.app_context():
+                rows = [row for row in cursor.read() if row.topic in topics]
+            for row in rows:
+                yield format_event(row)
+            idle = 0.0 if rows else idle + interval
+            if idle >= app.config["NOTIFY_HEARTBEAT"]:
+                yield KEEP_ALIVE
+                idle = 0.0
+            time.sleep(interval)
+
+    return _event_response(stream())
+
+
+def _event_response(body):
+    response = Response(body, mimetype="text/event-stream")
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["X-Accel-Buffering"] = "no"  # nginx: don't buffer the stream
+    return response
+
+
+# ---------------- Hub ----------------
+
+
+class Subscriber:
+    __slots__ = ("topics", "queue", "lost")
+
+    def __init__(self, topics, size):
+        self.topics = topics
+        self.queue = asyncio.Queue(size)
+        self.lost = False  # events dropped; the stream ends and the browser catches up
+
+
+class EventHub:
+    """Tails the outbox in a thread and hands rows to subscribers on the loop."""
+
+    def __init__(self, app):
+        self.app = app
+        self.subscribers = {}  # topic -> set of Subscriber
+        self.cursor = None
+        self.loop = None
+        self.stop = threading.Event()
+        self._started = False
+        self._next_prune = 0.0
+
+    def start(self, loop):
+        self.loop = loop
+        if self._started:
+            return
+        self._started = True
+        with self.app.app_context():
+            self.cursor = OutboxCursor(latest_id())
+            db.session.rollback()
+        threading.Thread(target=self._run, name="notify-hub", daemon=True).start()
+
+    def subscribe(self, subscriber):
+        for topic in subscriber.topics:
+            self.subscribers.setdefault(topic, set()).add(subscriber)
+
+    def unsubscribe(self, subscriber):
+        for topic in subscriber.topics:
+            subscribers = self.subscribers.get(topic)
+            if subscribers is not None:
+                subscribers.discard(subscriber)
+                if not subscribers:
+                    del self.subscribers[topic]
+
+    def _dispatch(self, rows):
+        # Runs on the event loop, so subscribers can't change under us
+        for row in rows:
+            for subscriber in self.subscribers.get(row.topic, ()):
+                try:
+                    subscriber.queue.put_nowait(row)
+                except asyncio.QueueFull:
+                    subscriber.lost = True
+
+    # Outbox thread
+
+    def _run(self):
+        config = self.app.config
+        while not self.stop.is_set():
+            try:
+                with self.app.app_context():
+                    if db.engine.dialect.name == "postgresql":
+                        self._listen()
+                    else:
+                        while not self.stop.is_set():
+                            self._fetch()
+                            self.stop.wait(config["NOTIFY_POLL_INTERVAL"])
+            except Exception:
+                log.exception("Notification hub lost the outbox; retrying")
+                self.stop.wait(config["NOTIFY_POLL_INTERVAL"])
+
+    def _listen(self):
+        raw = db.engine.raw_connection()
+        try:
+            connection = raw.driver_connection
+            connection.autocommit = True
+            with connection.cursor() as cursor:
+                cursor.execute(f'LISTEN "{self.app.config["NOTIFY_CHANNEL"]}"')
+            while not self.stop.is_set():
+                self._fetch()  # also catches up on rows written before LISTEN
+                if io_select.select([connection], [], [], LISTEN_TIMEOUT)[0]:
+                    connection.poll()
+                    connection.notifies.clear()
+        finally:
+            raw.invalidate()  # autocommit + LISTEN: not fit for the pool
+
+    def _fetch(self):
+        try:
+            rows = self.cursor.read()
+            if rows:
+                self.loop.call_soon_threadsafe(self._dispatch, rows)
+            if time.monotonic() >= self._next_prune:
+                self._next_prune = time.monotonic() + PRUNE_EVERY
+                prune_notifications(self.app.config["NOTIFY_RETENTION"])
+        finally:
+            db.session.rollback()  # don't sit in an open transaction
+
+
+# ---------------- ASGI app ----------------
+
+
+class EventsApp:
+    """ASGI app serving NOTIFY_URL as a Server-Sent Events stream."""
+
+    def __init__(self, app):
+        self.app = app
+        self.hub = EventHub(app)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+        elif scope["type"] == "http":
+            await self._http(scope, receive, send)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                self.hub.start(asyncio.get_running_loop())
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                self.hub.stop.set()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def _http(self, scope, receive, send):
+        url = self.app.config["NOTIFY_URL"]
+        if url is None or scope["path"] != url or scope["method"] != "GET":
+            return await _plain(send, 404, b"Not Found")
+        loop = asyncio.get_running_loop()
+        self.hub.start(loop)  # servers without lifespan events
+        headers = {
+            name.decode("latin-1").lower(): value.decode("latin-1")
+            for name, value in scope["headers"]
+        }
+        topics = await loop.run_in_executor(None, self._topics, scope, headers)
+        if topics is None:
+            return await _plain(send, 401, b"Login required.")
+
+        subscriber = Subscriber(topics, self.app.config["NOTIFY_QUEUE"])
+        self.hub.subscribe(subscriber)  # before any replay, so nothing falls between
+        stream = asyncio.ensure_future(
+            self._stream(send, subscriber, last_event_id(headers.get("last-event-id")))
+        )
+        disconnect = asyncio.ensure_future(_disconnected(receive))
+        try:
+            await asyncio.wait({stream, disconnect}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            self.hub.unsubscribe(subscriber)
+            stream.cancel()
+            disconnect.cancel()
+
+    def _topics(self, scope, headers):
+        """The logged-in student's topics, read from the Flask session cookie."""
+        environ = {
+            "REQUEST_METHOD": "GET",
+            "PATH_INFO": scope["path"],
+            "QUERY_STRING": scope.get("query_string", b"").decode("latin-1"),
+            "SERVER_NAME": (scope.get("server") or ("localhost",))[0],
+            "SERVER_PORT": str((scope.get("server") or (None, 80))[1]),
+            "HTTP_HOST": headers.get("host", ""),
+            "HTTP_COOKIE": headers.get("cookie", ""),
+            "wsgi.url_scheme": scope.get("scheme", "http"),
+        }
+        with self.app.request_context(environ):
+            student_id = session.get("student_id")
+            return student_topics(student_id) if student_id else None
+
+    def _replay(self, topics, last_id):
+        with self.app.app_context():
+            return replay_events(last_id, topics)
+
+    async def _stream(self, send, subscriber, last_id):
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 200,
+                "headers": [
+                    (b"content-type", b"text/event-stream; charset=utf-8"),
+                    (b"cache-control", b"no-cache"),
+                    (b"x-accel-buffering", b"no"),
+                ],
+            }
+        )
+        await _body(send, RETRY)
+        sent = set()  # replayed ids, which the hub may deliver again
+        if last_id is not None:
+            loop = asyncio.get_running_loop()
+            for row in await loop.run_in_executor(None, self._replay, subscriber.topics, last_id):
+                await _body(send, format_event(row))
+                sent.add(row.id)
+        heartbeat = self.app.config["NOTIFY_HEARTBEAT"]
+        while not subscriber.lost or not subscriber.queue.empty():
+            try:
+                row = await asyncio.wait_for(subscriber.queue.get(), heartbeat)
+            except asyncio.TimeoutError:
+                await _body(send, KEEP_ALIVE)
+                continue
+            if row.id not in sent:
+                await _body(send, format_event(row))
+        # Fell behind: end the stream; the browser reconnects with Last-Event-ID
+        await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+
+async def _body(send, chunk):
+    await send({"type": "http.response.body", "body": chunk.encode(), "more_body": True})
+
+
+async def _disconnected(receive):
+    while (await receive())["type"] != "http.disconnect":
+        pass
+
+
+async def _plain(send, status, body):
+    await send(
+        {
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(b"content-type", b"text/plain; charset=utf-8")],
+        }
+    )
+    await send({"type": "http.response.body", "body": body})
+
+
+def create_events_app(app):
+    return EventsApp(app)
@@ -0,0 +1,272 @@
+import base64
+import json
+from datetime import date, datetime
+from itertools import islice
+
+from flask import Response, render_template, request, stream_template, url_for
+from sqlalchemy import and_, or_
+from sqlalchemy.sql import operators
+from sqlalchemy.sql.elements import UnaryExpression
+
+from extensions import db
+
+# --------------------------------------------------
+# Keyset pagination
+# --------------------------------------------------
+# Pages are addressed by an opaque cursor holding the sort key of the last (or
+# first) row shown, so page N costs the same index range scan as page 1
+# instead of an OFFSET that walks every earlier row.
+
+DEFAULT_PER_PAGE = 50
+MAX_PER_PAGE = 200
+ALL_ROWS = "all"  # ?per_page=all streams every row instead of one page
+
+
+def encode_cursor(values):
+    def default(value):
+        if isinstance(value, datetime):
+            return {"dt": value.isoformat()}
+        if isinstance(value, date):
+            return {"d": value.isoformat()}
+        raise TypeError(value)
+
+    raw = json.dumps(values, separators=(",", ":"), default=default).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    def hook(obj):
+        if "dt" in obj:
+            return datetime.fromisoformat(obj["dt"])
+        if "d" in obj:
+            return date.fromisoformat(obj["d"])
+        return obj
+
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded), object_hook=hook)
+    except ValueError:
+        return None
+    return values if isinstance(values, list) else None
+
+
+def _split_order(expr):
+    """`Model.col.desc()` -> (Model.col, True); plain columns are ascending."""
+    if isinstance(expr, UnaryExpression) and expr.modifier is operators.desc_op:
+        return expr.element, True
+    if isinstance(expr, UnaryExpression) and expr.modifier is operators.asc_op:
+        return expr.element, False
+    return expr, False
+
+
+def _after(keys, values, reverse=False):
+    """WHERE clause selecting rows that sort after `values` (before if reverse)."""
+    clauses = []
+    for i, (column, descending) in enumerate(keys):
+        equal = [keys[j][0] == values[j] for j in range(i)]
+        if descending != reverse:
+            clauses.append(and_(*equal, column < values[i]))
+        else:
+            clauses.append(and_(*equal, column > values[i]))
+    return or_(*clauses)
+
+
+class Page:
+    def __init__(self, items, next_cursor, prev_cursor, per_page, total=None):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+        self.per_page = per_page
+        self.total = total
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    def __bool__(self):
+        return bool(self.items)
+
+    def _url(self, **cursor):
+        args = request.args.to_dict()
+        args.pop("after", None)
+        args.pop("before", None)
+        args.update(cursor)
+        return url_for(request.endpoint, **request.view_args, **args)
+
+    @property
+    def next_url(self):
+        return self._url(after=self.next_cursor) if self.next_cursor else None
+
+    @property
+    def prev_url(self):
+        return self._url(before=self.prev_cursor) if self.prev_cursor else None
+
+    @property
+    def all_url(self):
+        if not (self.next_cursor or self.prev_cursor):
+            return None
+        return self._url(per_page=ALL_ROWS)
+
+
+def paginate(query, order_by, per_page=None, estimate_total=False, transform=None):
+    """Keyset-paginate an ORM query using `after`/`before`/`per_page` args.
+
+    `order_by` must end in a unique column (usually the primary key) so the
+    ordering is stable. `transform` maps the list of items (e.g. to read
+    models). With ?per_page=all it returns StreamedRows instead; render those
+    with render_list().
+    """
+    if per_page is None:
+        if request.args.get("per_page") == ALL_ROWS:
+            return StreamedRows(query, order_by, transform, estimate_total)
+        per_page = request.args.get("per_page", DEFAULT_PER_PAGE, type=int)
+    per_page = max(1, min(per_page, MAX_PER_PAGE))
+    keys = [_split_order(expr) for expr in order_by]
+
+    total = estimated_count(query) if estimate_total else None
+
+    after = decode_cursor(request.args.get("after"))
+    before = decode_cursor(request.args.get("before"))
+    backwards = before is not None and len(before) == len(keys)
+    if after is not None and len(after) != len(keys):
+        after = None
+
+    # Entity queries yield the entity; column queries yield their column tuple
+    width = len(query.column_descriptions)
+    ordered = query.add_columns(*[column for column, _ in keys]).order_by(None)
+    if backwards:
+        ordered = ordered.filter(_after(keys, before, reverse=True))
+        ordered = ordered.order_by(
+            *[column.asc() if desc else column.desc() for column, desc in keys]
+        )
+    else:
+        if after is not None:
+            ordered = ordered.filter(_after(keys, after))
+        ordered = ordered.order_by(*order_by)
+
+    rows = ordered.limit(per_page + 1).all()
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    if backwards:
+        rows.reverse()
+
+    items = [row[0] if width == 1 else tuple(row[:width]) for row in rows]
+    if transform:
+        items = transform(items)
+    first_key = list(rows[0][width:]) if rows else None
+    last_key = list(rows[-1][width:]) if rows else None
+
+    if backwards:
+        next_cursor = encode_cursor(last_key) if rows else None
+        prev_cursor = encode_cursor(first_key) if has_more else None
+    else:
+        next_cursor = encode_cursor(last_key) if has_more else None
+        prev_cursor = encode_cursor(first_key) if after is not None and rows else None
+
+    return Page(items, next_cursor, prev_cursor, per_page, total)
+
+
+def estimated_count(query):
+    """Planner row estimate on PostgreSQL (no COUNT(*) scan); exact elsewhere."""
+    if db.engine.dialect.name != "postgresql":
+        return query.order_by(None).count()
+    try:
+        sql = query.statement.compile(
+            dialect=db.engine.dialect, compile_kwargs={"literal_binds": True}
+        )
+        plan = (
+            db.session.connection()
+            .exec_driver_sql(f"EXPLAIN (FORMAT JSON) {sql}")
+            .scalar()
+        )
+        return int(plan[0]["Plan"]["Plan Rows"])
+    except Exception:
+        db.session.rollback()
+        return None
+
+
+# --------------------------------------------------
+# Streamed lists
+# --------------------------------------------------
+# A whole table in one page: rows come off a server-side cursor in batches of
+# STREAM_BATCH while the template loop consumes them, and render_list() sends
+# the HTML out as it is produced, so memory and time-to-first-byte no longer
+# grow with the table.
+
+STREAM_BATCH = 1000
+STREAM_CHUNK = 16 * 1024
+
+
+class StreamedRows:
+    """Page-like, single-pass iterator over every row of a query."""
+
+    next_url = prev_url = all_url = None
+    per_page = None
+
+    def __init__(self, query, order_by, transform=None, estimate_total=False):
+        keys = [_split_order(expr) for expr in order_by]
+        self._width = len(query.column_descriptions)
+        self._query = (
+            query.add_columns(*[column for column, _ in keys])
+            .order_by(None)
+            .order_by(*order_by)
+            .yield_per(STREAM_BATCH)
+        )
+        self._transform = transform
+        self._batches = None
+        self._first = None
+        self.total = estimated_count(query) if estimate_total else None
+
+    def _iter_batches(self):
+        rows = iter(self._query)
+        width = self._width
+        while batch := list(islice(rows, STREAM_BATCH)):
+            items = [row[0] if width == 1 else tuple(row[:width]) for row in batch]
+            yield self._transform(items) if self._transform else items
+
+    def __bool__(self):
+        # Fetches the first batch so `{% if rows %}` works before the loop
+        if self._first is None:
+            self._batches = self._iter_batches()
+            self._first = next(self._batches, [])
+        return bool(self._first)
+
+    def __iter__(self):
+        bool(self)
+        yield from self._first
+        for batch in self._batches:
+            yield from batch
+
+
+def stream_rows(query, order_by, transform=None):
+    """Every row of `query`, `transform`ed a batch at a time."""
+    return StreamedRows(query, order_by, transform)
+
+
+def _chunked(pieces):
+    # Send the start of the page at once, then STREAM_CHUNK-sized writes
+    # instead of one per template statement
+    pieces = iter(pieces)
+    first = next(pieces, "")
+    if first:
+        yield first
+    buffer, size = [], 0
+    for piece in pieces:
+        buffer.append(piece)
+        size += len(piece)
+        if size >= STREAM_CHUNK:
+            yield "".join(buffer)
+            buffer, size = [], 0
+    if buffer:
+        yield "".join(buffer)
+
+
+def render_list(template, **context):
+    """render_template(), streamed when any context value is StreamedRows."""
+    if not any(isinstance(value, StreamedRows) for value in context.values()):
+        return render_template(template, **context)
+    return Response(_chunked(stream_template(template, **context)), mimetype="text/html")
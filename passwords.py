@@ -0,0 +1,163 @@
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import repeat
+
+from flask import current_app, g
+from werkzeug.security import check_password_hash, generate_password_hash
+
+
+# --------------------------------------------------
+# Password hashing service
+# --------------------------------------------------
+# Hashing is deliberately slow, so it runs on a small bounded pool rather than
+# on request threads: at most POOL_SIZE hashes run at once, up to QUEUE_LIMIT
+# more wait, and beyond that requests get 503 + Retry-After instead of piling
+# up. hashlib's scrypt/pbkdf2 release the GIL, so threads are enough.
+# Hashes made with older parameters are replaced on the next successful login.
+
+DEFAULT_METHOD = "scrypt:32768:8:1"
+
+
+class PasswordServiceBusy(Exception):
+    pass
+
+
+_executor = None
+_gate = None
+_method = None  # configured method, normalized to the prefix werkzeug writes
+_lock = threading.Lock()
+_samples = deque(maxlen=1000)  # hash times (ms) of recent verifications
+_metrics = {"hashed": 0, "verified": 0, "rehashed": 0, "rejected": 0}
+
+
+def init_passwords(app):
+    app.config.setdefault(
+        "PASSWORD_HASH_METHOD", os.getenv("PASSWORD_HASH_METHOD", DEFAULT_METHOD)
+    )
+    app.config.setdefault(
+        "PASSWORD_POOL_SIZE", int(os.getenv("PASSWORD_POOL_SIZE", os.cpu_count() or 2))
+    )
+    app.config.setdefault(
+        "PASSWORD_QUEUE_LIMIT", int(os.getenv("PASSWORD_QUEUE_LIMIT", "16"))
+    )
+    app.config.setdefault("PASSWORD_RETRY_AFTER", 5)  # seconds
+
+    global _executor, _gate, _method
+    size = app.config["PASSWORD_POOL_SIZE"]
+    _executor = ThreadPoolExecutor(max_workers=size, thread_name_prefix="pwhash")
+    _gate = threading.BoundedSemaphore(size + app.config["PASSWORD_QUEUE_LIMIT"])
+    _method = _hash_method(generate_password_hash("", app.config["PASSWORD_HASH_METHOD"]))
+
+    @app.errorhandler(PasswordServiceBusy)
+    def password_service_busy(e):
+        response = current_app.response_class(
+            "Too many sign-ins at once. Please retry in a few seconds.",
+            status=503,
+            mimetype="text/plain",
+        )
+        response.headers["Retry-After"] = str(current_app.config["PASSWORD_RETRY_AFTER"])
+        return response
+
+    @app.after_request
+    def add_hash_timing(response):
+        if "password_hash_ms" in g:
+            response.headers.add("Server-Timing", f"pwhash;dur={g.password_hash_ms:.1f}")
+        return response
+
+
+def _hash_method(pwhash):
+    return pwhash.split("$", 1)[0] if pwhash and "$" in pwhash else None
+
+
+def _run(fn, *args):
+    """Run fn on the pool; returns (result, ms spent hashing)."""
+    if not _gate.acquire(blocking=False):
+        with _lock:
+            _metrics["rejected"] += 1
+        raise PasswordServiceBusy()
+
+    def timed():
+        start = time.perf_counter()
+        result = fn(*args)
+        return result, 1000 * (time.perf_counter() - start)
+
+    try:
+        return _executor.submit(timed).result()
+    finally:
+        _gate.release()
+
+
+def hash_password(password):
+    pwhash, _ = _run(generate_password_hash, password, _method)
+    with _lock:
+        _metrics["hashed"] += 1
+    return pwhash
+
+
+def verify_password(pwhash, password):
+    if not pwhash:
+        return False
+    ok, ms = _run(check_password_hash, pwhash, password)
+    g.password_hash_ms = g.get("password_hash_ms", 0) + ms
+    with _lock:
+        _metrics["verified"] += 1
+        _samples.append(ms)
+    return ok
+
+
+def hash_many(passwords, pool):
+    """Hash a batch on a ProcessPoolExecutor (bulk imports); order is kept."""
+    hashes = list(pool.map(generate_password_hash, passwords, repeat(_method), chunksize=16))
+    with _lock:
+        _metrics["hashed"] += len(hashes)
+    return hashes
+
+
+def needs_rehash(pwhash):
+    return _hash_method(pwhash) != _method
+
+
+def record_rehash():
+    with _lock:
+        _metrics["rehashed"] += 1
+
+
+def password_metrics():
+    with _lock:
+        data = dict(_metrics)
+        samples = sorted(_samples)
+    if samples:
+        data["hash_ms_p50"] = round(samples[len(samples) // 2], 1)
+        data["hash_ms_p95"] = round(samples[int(len(samples) * 0.95)], 1)
+        data["hash_ms_max"] = round(samples[-1], 1)
+    data["method"] = _method
+    data["pool_size"] = current_app.config["PASSWORD_POOL_SIZE"]
+    data["queue_limit"] = current_app.config["PASSWORD_QUEUE_LIMIT"]
+    return data
+
+
+def calibrate(target_ms, kind="scrypt"):
+    """Cheapest method string of `kind` whose hash takes at least target_ms here."""
+
+    def cost(method):
+        start = time.perf_counter()
+        generate_password_hash("calibration", method)
+        return 1000 * (time.perf_counter() - start)
+
+    if kind == "pbkdf2":
+        iterations = 100_000
+        per_iteration = cost(f"pbkdf2:sha256:{iterations}") / iterations
+        iterations = max(100_000, int(target_ms / per_iteration))
+        return f"pbkdf2:sha256:{iterations}", cost(f"pbkdf2:sha256:{iterations}")
+
+    # scrypt: double N (memory and time) until the target is reached
+    n = 16384
+    while True:
+        method = f"scrypt:{n}:8:1"
+        ms = cost(method)
+        if ms >= target_ms or n >= 2**20:
+            return method, ms
+        n *= 2
@@ -0,0 +1,349 @@
+import time
+from collections import defaultdict
+
+from sqlalchemy import event, func, inspect, select, tuple_
+from sqlalchemy.orm import Session
+
+from extensions import db
+from models import (
+    Course,
+    Exam,
+    LiveClass,
+    Progress,
+    ProgressSummary,
+    RecordedClass,
+    Student,
+    StudyMaterial,
+    student_course,
+)
+
+# --------------------------------------------------
+# Progress summaries
+# --------------------------------------------------
+# progress_summary holds completed/total counts per item type for each
+# (student, course). Flush events turn Progress writes and content
+# inserts/deletes into +/- deltas on the affected rows, so progress pages read
+# one row per enrolled course instead of scanning every Progress row. Rows
+# are created on first read; `flask progress-rebuild` verifies or rebuilds them.
+
+# item kind -> (Progress foreign key, content model)
+ITEM_TYPES = {
+    "materials": ("material_id", StudyMaterial),
+    "recorded": ("recorded_class_id", RecordedClass),
+    "live": ("live_class_id", LiveClass),
+    "exams": ("exam_id", Exam),
+}
+CONTENT_KINDS = {model: kind for kind, (_, model) in ITEM_TYPES.items()}
+
+COUNT_COLUMNS = [f"{kind}_{part}" for kind in ITEM_TYPES for part in ("completed", "total")]
+CREATE_BATCH = 500  # summary rows created per transaction
+
+
+# ---------------- Reads ----------------
+
+
+def get_summaries(student_id, course_ids):
+    """{course_id: ProgressSummary} for one student, creating missing rows."""
+    pairs = {(student_id, cid) for cid in course_ids}
+    return {s.course_id: s for s in ensure_summaries(pairs).values()}
+
+
+def enrolled_pairs(student_ids=None, course_ids=None):
+    query = select(student_course.c.student_id, student_course.c.course_id)
+    if student_ids is not None:
+        query = query.where(student_course.c.student_id.in_(student_ids))
+    if course_ids is not None:
+        query = query.where(student_course.c.course_id.in_(course_ids))
+    return set(db.session.execute(query).all())
+
+
+def ensure_summaries(pairs, persist=True):
+    """{(student_id, course_id): ProgressSummary} for `pairs`, computing any missing.
+
+    With persist=False missing rows are computed but not saved, for callers
+    that can't commit (e.g. while a streamed response holds a cursor open).
+    """
+    if not pairs:
+        return {}
+    found = _load(pairs)
+    missing = pairs - set(found)
+    if missing and not persist:
+        found.update(compute_summaries(missing))
+    elif missing:
+        missing = sorted(missing)
+        for start in range(0, len(missing), CREATE_BATCH):
+            _create(missing[start:start + CREATE_BATCH])
+        found = _load(pairs)
+    return found
+
+
+def _create(pairs):
+    """Add summary rows without losing writes that race with the count.
+
+    Zeroed rows are committed first, so every later delta UPDATE finds its
+    row. The rows are then locked (a write lock on SQLite) before counting:
+    a write that committed earlier is in the counts, and one still in flight
+    waits for the lock and adds its delta on top.
+    """
+    table = ProgressSummary.__table__
+    if db.session.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    db.session.execute(
+        insert(table)
+        .values([{"student_id": s, "course_id": c} for s, c in pairs])
+        .on_conflict_do_nothing(index_elements=[table.c.student_id, table.c.course_id])
+    )
+    db.session.commit()
+
+    key = tuple_(table.c.student_id, table.c.course_id).in_(pairs)
+    db.session.execute(table.update().where(key).values(student_id=table.c.student_id))
+    for (student_id, course_id), summary in compute_summaries(set(pairs)).items():
+        db.session.execute(
+            table.update()
+            .where(table.c.student_id == student_id, table.c.course_id == course_id)
+            .values({col: getattr(summary, col) for col in COUNT_COLUMNS})
+        )
+    db.session.commit()
+
+
+def _load(pairs):
+    rows = ProgressSummary.query.filter(
+        tuple_(ProgressSummary.student_id, ProgressSummary.course_id).in_(list(pairs))
+    )
+    return {(r.student_id, r.course_id): r for r in rows}
+
+
+def compute_summaries(pairs):
+    """Count from the raw Progress and content tables (grouped, one pass per type)."""
+    student_ids = {s for s, _ in pairs}
+    course_ids = {c for _, c in pairs}
+    counts = defaultdict(lambda: defaultdict(int))
+
+    for kind, (fk, model) in ITEM_TYPES.items():
+        totals = dict(
+            db.session.execute(
+                select(model.course_id, func.count())
+                .where(model.course_id.in_(course_ids))
+                .group_by(model.course_id)
+            ).all()
+        )
+        for pair in pairs:
+            counts[pair][f"{kind}_total"] = totals.get(pair[1], 0)
+
+        completed = db.session.execute(
+            select(Progress.student_id, model.course_id, func.count())
+            .join(model, model.id == getattr(Progress, fk))
+            .where(
+                Progress.student_id.in_(student_ids),
+                model.course_id.in_(course_ids),
+                Progress.completed.is_(True),
+            )
+            .group_by(Progress.student_id, model.course_id)
+        )
+        for student_id, course_id, n in completed:
+            if (student_id, course_id) in pairs:
+                counts[(student_id, course_id)][f"{kind}_completed"] = n
+
+    return {
+        (s, c): ProgressSummary(
+            student_id=s, course_id=c, **{col: counts[(s, c)][col] for col in COUNT_COLUMNS}
+        )
+        for s, c in pairs
+    }
+
+
+def progress_percent(summaries):
+    completed = sum(s.completed_items for s in summaries)
+    total = sum(s.total_items for s in summaries)
+    return completed, total, int((completed / total) * 100) if total else 0
+
+
+# ---------------- Maintenance ----------------
+
+
+def _progress_kind(progress):
+    for kind, (fk, _) in ITEM_TYPES.items():
+        if getattr(progress, fk):
+            return kind
+    return None
+
+
+def _progress_course(session, progress, kind):
+    """Course of the progress item, filling in Progress.course_id if unset."""
+    if progress.course_id:
+        return progress.course_id
+    fk, model = ITEM_TYPES[kind]
+    course_id = session.execute(
+        select(model.course_id).where(model.id == getattr(progress, fk))
+    ).scalar()
+    if progress not in session.deleted:
+        progress.course_id = course_id
+    return course_id
+
+
+def _completed_change(progress):
+    history = inspect(progress).attrs.completed.history
+    if not history.has_changes():
+        return 0
+    old = bool(history.deleted[0]) if history.deleted else False
+    new = bool(history.added[0]) if history.added else False
+    return int(new) - int(old)
+
+
+@event.listens_for(Session, "before_flush")
+def _collect_deltas(session, flush_context, instances):
+    row_deltas = defaultdict(int)  # (student_id, course_id, column) -> n
+    course_deltas = defaultdict(int)  # (course_id, column) -> n
+    dropped = {"student_id": set(), "course_id": set()}
+
+    def progress_delta(progress, delta):
+        kind = _progress_kind(progress)
+        if delta and kind:
+            course_id = _progress_course(session, progress, kind)
+            if course_id:
+                row_deltas[(progress.student_id, course_id, f"{kind}_completed")] += delta
+
+    for obj in session.new:
+        if isinstance(obj, Progress):
+            kind = _progress_kind(obj)
+            if obj.completed:
+                progress_delta(obj, 1)
+            elif kind and not obj.course_id:
+                _progress_course(session, obj, kind)
+        elif type(obj) in CONTENT_KINDS and obj.course_id:
+            course_deltas[(int(obj.course_id), f"{CONTENT_KINDS[type(obj)]}_total")] += 1
+
+    for obj in session.dirty:
+        if isinstance(obj, Progress):
+            progress_delta(obj, _completed_change(obj))
+
+    for obj in session.deleted:
+        if isinstance(obj, Progress) and obj.completed:
+            progress_delta(obj, -1)
+        elif type(obj) in CONTENT_KINDS and obj.course_id:
+            kind = CONTENT_KINDS[type(obj)]
+            course_deltas[(obj.course_id, f"{kind}_total")] -= 1
+            # Completed Progress rows lose their item when it is deleted
+            fk = getattr(Progress, ITEM_TYPES[kind][0])
+            done = session.execute(
+                select(Progress.student_id, func.count())
+                .where(fk == obj.id, Progress.completed.is_(True))
+                .group_by(Progress.student_id)
+            )
+            for student_id, n in done:
+                row_deltas[(student_id, obj.course_id, f"{kind}_completed")] -= n
+        elif isinstance(obj, Course):
+            dropped["course_id"].add(obj.id)
+        elif isinstance(obj, Student):
+            dropped["student_id"].add(obj.id)
+
+    if row_deltas or course_deltas or any(dropped.values()):
+        pending = session.info.setdefault("progress_summary_deltas", [])
+        pending.append((row_deltas, course_deltas, dropped))
+
+
+@event.listens_for(Session, "after_flush")
+def _apply_deltas(session, flush_context):
+    pending = session.info.pop("progress_summary_deltas", None)
+    if not pending:
+        return
+    table = ProgressSummary.__table__
+    connection = session.connection()
+    for row_deltas, course_deltas, dropped in pending:
+        for (student_id, course_id, column), delta in row_deltas.items():
+            if delta:
+                connection.execute(
+                    table.update()
+                    .where(table.c.student_id == student_id, table.c.course_id == course_id)
+                    .values({column: table.c[column] + delta})
+                )
+        for (course_id, column), delta in course_deltas.items():
+            if delta:
+                connection.execute(
+                    table.update()
+                    .where(table.c.course_id == course_id)
+                    .values({column: table.c[column] + delta})
+                )
+        for column, ids in dropped.items():
+            if ids:
+                connection.execute(table.delete().where(table.c[column].in_(ids)))
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_deltas(session):
+    session.info.pop("progress_summary_deltas", None)
+
+
+def verify_summaries(fix=False, batch_size=1000):
+    """Compare stored rows with raw counts; returns the number of mismatches."""
+    mismatches = 0
+    pairs = sorted(enrolled_pairs())
+    for start in range(0, len(pairs), batch_size):
+        batch = set(pairs[start:start + batch_size])
+        expected = compute_summaries(batch)
+        stored = _load(batch)
+        for pair, want in expected.items():
+            have = stored.get(pair)
+            if have is None:
+                continue  # created on first read
+            wrong = [c for c in COUNT_COLUMNS if getattr(have, c) != getattr(want, c)]
+            if wrong:
+                mismatches += 1
+                if fix:
+                    for column in wrong:
+                        setattr(have, column, getattr(want, column))
+        if fix:
+            db.session.commit()
+        else:
+            db.session.rollback()
+    return mismatches
+
+
+def rebuild_summaries():
+    ProgressSummary.query.delete()
+    db.session.commit()
+    pairs = enrolled_pairs()
+    ensure_summaries(pairs)
+    return len(pairs)
+
+
+# ---------------- Backfill ----------------
+
+
+def backfill_progress_courses(batch_size=1000, start_after=0, pause=0.0):
+    """Fill Progress.course_id from each row's item, one short transaction per batch.
+
+    Walks ids in order so a rerun (or `start_after` the last id printed)
+    resumes where it stopped. Yields (last_id, rows_updated) per batch.
+    """
+    table = Progress.__table__
+    last_id = start_after
+    while True:
+        ids = db.session.scalars(
+            select(Progress.id)
+            .where(Progress.course_id.is_(None), Progress.id > last_id)
+            .order_by(Progress.id)
+            .limit(batch_size)
+        ).all()
+        if not ids:
+            return
+        updated = 0
+        for fk, model in ITEM_TYPES.values():
+            course = (
+                select(model.course_id)
+                .where(model.id == table.c[fk])
+                .scalar_subquery()
+            )
+            result = db.session.execute(
+                table.update()
+                .where(table.c.id.in_(ids), table.c[fk].isnot(None))
+                .values(course_id=course)
+            )
+            updated += result.rowcount
+        db.session.commit()
+        last_id = ids[-1]
+        yield last_id, updated
+        if pause:
+            time.sleep(pause)
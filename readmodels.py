@@ -0,0 +1,271 @@
+from sqlalchemy import func, select
+
+from extensions import db
+from models import (
+    Course,
+    Exam,
+    ExamAttempt,
+    ExamResult,
+    LiveClass,
+    Question,
+    RecordedClass,
+    Student,
+    StudyMaterial,
+    student_course,
+    teacher_course,
+)
+
+# --------------------------------------------------
+# Read models
+# --------------------------------------------------
+# Read-only pages only need a few columns. These helpers run Core selects and
+# build small __slots__ rows, skipping the identity map, change tracking and
+# attribute instrumentation that ORM entities carry. Attribute names match the
+# models so templates work with either.
+
+
+class ReadRow:
+    __slots__ = ()
+
+    def __init__(self, *values):
+        for name, value in zip(self.__slots__, values):
+            setattr(self, name, value)
+
+    def __repr__(self):
+        fields = ", ".join(f"{n}={getattr(self, n)!r}" for n in self.__slots__)
+        return f"{type(self).__name__}({fields})"
+
+
+class CourseRow(ReadRow):
+    __slots__ = ("id", "name")
+
+
+class MaterialRow(ReadRow):
+    __slots__ = ("id", "title", "description", "filename", "upload_date", "course_id")
+
+
+class RecordedClassRow(ReadRow):
+    __slots__ = ("id", "title", "date", "filename", "course_id", "course")
+
+
+class LiveClassRow(ReadRow):
+    __slots__ = ("id", "title", "date", "time", "platform", "link", "course_id", "course")
+
+
+class ExamRow(ReadRow):
+    __slots__ = ("id", "title", "created_at", "course_id", "course")
+
+
+class StudentRow(ReadRow):
+    __slots__ = ("id", "name", "email", "courses")
+
+
+class CourseCountRow(ReadRow):
+    __slots__ = ("id", "name", "students")
+
+
+class ExamStatsRow(ReadRow):
+    __slots__ = ("id", "title", "created_at", "course_id", "course", "questions", "attempts")
+
+
+def _course(cache, course_id, name):
+    """One shared CourseRow per course, however many rows reference it."""
+    if course_id is None:
+        return None
+    if course_id not in cache:
+        cache[course_id] = CourseRow(course_id, name)
+    return cache[course_id]
+
+
+def materials_for(course_ids):
+    rows = db.session.execute(
+        select(
+            StudyMaterial.id,
+            StudyMaterial.title,
+            StudyMaterial.description,
+            StudyMaterial.filename,
+            StudyMaterial.upload_date,
+            StudyMaterial.course_id,
+        ).where(StudyMaterial.course_id.in_(course_ids))
+    )
+    return [MaterialRow(*row) for row in rows]
+
+
+def recorded_classes_for(course_ids):
+    rows = db.session.execute(
+        select(
+            RecordedClass.id,
+            RecordedClass.title,
+            RecordedClass.date,
+            RecordedClass.filename,
+            RecordedClass.course_id,
+            Course.name,
+        )
+        .outerjoin(Course, Course.id == RecordedClass.course_id)
+        .where(RecordedClass.course_id.in_(course_ids))
+    )
+    cache = {}
+    return [RecordedClassRow(*row[:5], _course(cache, row[4], row[5])) for row in rows]
+
+
+def live_classes_for(course_ids):
+    rows = db.session.execute(
+        select(
+            LiveClass.id,
+            LiveClass.title,
+            LiveClass.date,
+            LiveClass.time,
+            LiveClass.platform,
+            LiveClass.link,
+            LiveClass.course_id,
+            Course.name,
+        )
+        .outerjoin(Course, Course.id == LiveClass.course_id)
+        .where(LiveClass.course_id.in_(course_ids))
+    )
+    cache = {}
+    return [LiveClassRow(*row[:7], _course(cache, row[6], row[7])) for row in rows]
+
+
+def _exam_select():
+    return select(
+        Exam.id, Exam.title, Exam.created_at, Exam.course_id, Course.name
+    ).outerjoin(Course, Course.id == Exam.course_id)
+
+
+def exams_for(course_ids):
+    rows = db.session.execute(
+        _exam_select()
+        .where(Exam.course_id.in_(course_ids))
+        .order_by(Exam.created_at.desc())
+    )
+    cache = {}
+    return [ExamRow(*row[:4], _course(cache, row[3], row[4])) for row in rows]
+
+
+def attended_exams(student_id):
+    attempted = select(ExamAttempt.exam_id).where(ExamAttempt.student_id == student_id)
+    rows = db.session.execute(_exam_select().where(Exam.id.in_(attempted)))
+    cache = {}
+    return [ExamRow(*row[:4], _course(cache, row[3], row[4])) for row in rows]
+
+
+def exam_attempt_dates(student_id):
+    """{exam_id: attended_date} for every exam the student has attempted."""
+    rows = db.session.execute(
+        select(ExamAttempt.exam_id, ExamAttempt.attended_date).where(
+            ExamAttempt.student_id == student_id
+        )
+    )
+    return {exam_id: attended for exam_id, attended in rows}
+
+
+def result_exam_ids(student_id):
+    return set(
+        db.session.scalars(
+            select(ExamResult.exam_id).where(ExamResult.student_id == student_id)
+        )
+    )
+
+
+def student_rows(rows, course_ids=None):
+    """(id, name, email) tuples -> StudentRow with `courses` filled in one query.
+
+    `course_ids` (ids or a select of them) limits the courses listed.
+    """
+    students = [StudentRow(*row[:3], []) for row in rows]
+    by_id = {s.id: s for s in students}
+    if by_id:
+        query = (
+            select(student_course.c.student_id, Course.id, Course.name)
+            .join(Course, Course.id == student_course.c.course_id)
+            .where(student_course.c.student_id.in_(by_id))
+            .order_by(Course.id)
+        )
+        if course_ids is not None:
+            query = query.where(Course.id.in_(course_ids))
+        enrolled = db.session.execute(query)
+        for student_id, course_id, name in enrolled:
+            by_id[student_id].courses.append(CourseRow(course_id, name))
+    return students
+
+
+# ---------------- Teacher dashboard ----------------
+
+
+def teacher_course_ids(teacher_id):
+    # Joining Course drops courses awaiting purge (see deletion.py)
+    return (
+        select(teacher_course.c.course_id)
+        .join(Course, Course.id == teacher_course.c.course_id)
+        .where(teacher_course.c.teacher_id == teacher_id)
+    )
+
+
+def teacher_roster_query(teacher_id):
+    """(id, name, email) of students in the teacher's courses; for paginate().
+
+    teacher_course_ids() joins Course, so students of a course awaiting purge
+    drop off along with it.
+    """
+    enrolled = select(student_course.c.student_id).where(
+        student_course.c.course_id.in_(teacher_course_ids(teacher_id))
+    )
+    return db.session.query(Student.id, Student.name, Student.email).filter(
+        Student.id.in_(enrolled)
+    )
+
+
+def teacher_roster_rows(teacher_id):
+    """student_rows() transform listing only the teacher's own courses."""
+    course_ids = teacher_course_ids(teacher_id)
+    return lambda rows: student_rows(rows, course_ids)
+
+
+def teacher_course_counts(teacher_id):
+    """The teacher's courses with enrolled-student counts, in one grouped query."""
+    course_ids = teacher_course_ids(teacher_id)
+    counts = (
+        select(student_course.c.course_id, func.count().label("students"))
+        .where(student_course.c.course_id.in_(course_ids))
+        .group_by(student_course.c.course_id)
+        .subquery()
+    )
+    rows = db.session.execute(
+        select(Course.id, Course.name, func.coalesce(counts.c.students, 0))
+        .outerjoin(counts, counts.c.course_id == Course.id)
+        .where(Course.id.in_(course_ids))
+        .order_by(Course.id)
+    )
+    return [CourseCountRow(*row) for row in rows]
+
+
+def teacher_exam_stats(teacher_id, limit=None):
+    """The teacher's exams, newest first, with question and attempt counts."""
+    exam_ids = select(Exam.id).where(Exam.teacher_id == teacher_id)
+    questions = (
+        select(Question.exam_id, func.count().label("n"))
+        .where(Question.exam_id.in_(exam_ids))
+        .group_by(Question.exam_id)
+        .subquery()
+    )
+    attempts = (
+        select(ExamAttempt.exam_id, func.count().label("n"))
+        .where(ExamAttempt.exam_id.in_(exam_ids))
+        .group_by(ExamAttempt.exam_id)
+        .subquery()
+    )
+    query = (
+        _exam_select()
+        .add_columns(func.coalesce(questions.c.n, 0), func.coalesce(attempts.c.n, 0))
+        .outerjoin(questions, questions.c.exam_id == Exam.id)
+        .outerjoin(attempts, attempts.c.exam_id == Exam.id)
+        .where(Exam.teacher_id == teacher_id)
+        .order_by(Exam.created_at.desc(), Exam.id.desc())
+        .limit(limit)
+    )
+    cache = {}
+    return [
+        ExamStatsRow(*row[:4], _course(cache, row[3], row[4]), *row[5:])
+        for row in db.session.execute(query)
+    ]
@@ -0,0 +1,183 @@
+import re
+
+from sqlalchemy import Float, Integer, and_, cast, func, inspect, literal, literal_column
+from sqlalchemy import or_, text
+
+from extensions import db
+from pagination import decode_cursor, encode_cursor
+from models import Course, MaterialText, Student, StudyMaterial, Teacher
+
+# --------------------------------------------------
+# Full-text search
+# --------------------------------------------------
+# PostgreSQL: generated `search_vector` tsvector columns with GIN indexes, plus
+# pg_trgm GIN indexes so fuzzy `ILIKE '%term%'` on name/email/title is indexed.
+# SQLite: external-content FTS5 tables (`<table>_fts`) kept in sync by triggers.
+# Both are created by the `search indexes` migration; without them we fall back
+# to the old ILIKE scan so fresh `db.create_all()` databases keep working.
+
+SEARCH_KINDS = {
+    "students": (Student, ("name", "email")),
+    "teachers": (Teacher, ("name", "email")),
+    "courses": (Course, ("name", "description")),
+    "materials": (StudyMaterial, ("title", "description")),
+    "contents": (MaterialText, ("content",)),
+}
+
+# Short, identifier-like columns that get trigram indexes on PostgreSQL
+TRIGRAM_COLUMNS = {"name", "email", "title"}
+
+MAX_PAGE_SIZE = 50
+
+# Constant rank for the ILIKE fallback (a bare literal would be an ORDER BY position)
+_NO_RANK = cast(literal(0), Float)
+
+_backend = {}
+
+
+def search_backend():
+    url = str(db.engine.url)
+    if url not in _backend:
+        inspector = inspect(db.engine)
+        if db.engine.dialect.name == "postgresql":
+            columns = {c["name"] for c in inspector.get_columns("student")}
+            _backend[url] = "postgres" if "search_vector" in columns else "like"
+        elif db.engine.dialect.name == "sqlite":
+            tables = inspector.get_table_names()
+            _backend[url] = "fts5" if "student_fts" in tables else "like"
+        else:
+            _backend[url] = "like"
+    return _backend[url]
+
+
+def include_object(obj, name, type_, reflected, compare_to):
+    """Keep autogenerate from dropping search objects the models don't map."""
+    if type_ == "column" and name == "search_vector":
+        return False
+    if type_ == "table" and "_fts" in name:
+        return False
+    if type_ == "index" and (name.endswith("_trgm") or name.endswith("_search")):
+        return False
+    return True
+
+
+def _words(term):
+    return re.findall(r"\w+", term or "")
+
+
+def ranked_search(query, model, term):
+    """Filter `query` to rows matching `term`; returns (query, rank expression)."""
+    columns = [getattr(model, c) for c in SEARCH_KINDS[_kind_for(model)][1]]
+    words = _words(term)
+    backend = search_backend()
+
+    if not words:
+        return query.filter(db.false()), _NO_RANK
+
+    if backend == "postgres":
+        vector = literal_column(f"{model.__tablename__}.search_vector")
+        tsquery = func.to_tsquery("simple", " & ".join(w + ":*" for w in words))
+        fuzzy = [c for c in columns if c.key in TRIGRAM_COLUMNS]
+        rank = func.ts_rank(vector, tsquery)
+        if fuzzy:
+            rank = rank + func.greatest(*[func.similarity(c, term) for c in fuzzy])
+        query = query.filter(
+            or_(vector.op("@@")(tsquery), *[c.ilike(f"%{term}%") for c in fuzzy])
+        )
+        return query, rank
+
+    if backend == "fts5":
+        fts = (
+            text(
+                f"SELECT rowid AS id, rank FROM {model.__tablename__}_fts "
+                f"WHERE {model.__tablename__}_fts MATCH :match"
+            )
+            .bindparams(match=" ".join(f'"{w}"*' for w in words))
+            .columns(id=Integer, rank=Float)
+            .subquery()
+        )
+        # bm25 rank: lower is better, so negate to keep "higher is better"
+        return query.join(fts, fts.c.id == model.id), -fts.c.rank
+
+    query = query.filter(or_(*[c.ilike(f"%{term}%") for c in columns]))
+    return query, _NO_RANK
+
+
+def apply_search(query, model, term):
+    """Like ranked_search(), ordered by rank then id."""
+    query, rank = ranked_search(query, model, term)
+    return query.order_by(rank.desc(), model.id)
+
+
+def _kind_for(model):
+    for kind, (m, _) in SEARCH_KINDS.items():
+        if m is model:
+            return kind
+    raise KeyError(model)
+
+
+def search_page(kind, term, limit=10, after=None, course_ids=None):
+    """One page of ranked results, keyset-paginated on (rank desc, id asc)."""
+    model, columns = SEARCH_KINDS[kind]
+    limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+
+    query, rank = ranked_search(model.query, model, term)
+    if course_ids is not None:
+        if kind == "courses":
+            query = query.filter(Course.id.in_(course_ids))
+        elif kind == "materials":
+            query = query.filter(StudyMaterial.course_id.in_(course_ids))
+        elif kind == "contents":
+            query = query.filter(MaterialText.course_id.in_(course_ids))
+
+    cursor = decode_cursor(after)
+    if cursor and len(cursor) == 2:
+        last_rank, last_id = cursor
+        query = query.filter(
+            or_(rank < last_rank, and_(rank == last_rank, model.id > last_id))
+        )
+
+    if kind == "contents":
+        # Matches inside material files are reported against the material
+        query = query.join(StudyMaterial, StudyMaterial.id == MaterialText.material_id)
+        display = (MaterialText.material_id, StudyMaterial.title, MaterialText.member)
+    else:
+        display = (model.id, *[getattr(model, c) for c in columns])
+
+    rows = (
+        query.with_entities(model.id, *display, rank)
+        .order_by(rank.desc(), model.id)
+        .limit(limit + 1)
+        .all()
+    )
+
+    results = [
+        {
+            "type": kind,
+            "id": row[1],
+            "title": row[2],
+            "subtitle": row[3] if len(row) > 4 else None,
+            "rank": float(row[-1] or 0),
+        }
+        for row in rows[:limit]
+    ]
+    next_cursor = None
+    if len(rows) > limit:
+        last = rows[limit - 1]
+        next_cursor = encode_cursor([float(last[-1] or 0), last[0]])
+    return results, next_cursor
+
+
+def rebuild_search_index():
+    """Re-sync FTS5 tables after bulk loads (PostgreSQL columns are generated)."""
+    backend = search_backend()
+    if backend == "fts5":
+        for model, _ in SEARCH_KINDS.values():
+            table = f"{model.__tablename__}_fts"
+            db.session.execute(text(f"INSERT INTO {table}({table}) VALUES('rebuild')"))
+        db.session.commit()
+    elif backend == "postgres":
+        for model, _ in SEARCH_KINDS.values():
+            db.session.execute(text(f"ANALYZE {model.__tablename__}"))
+        db.session.commit()
+    return backend
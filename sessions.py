@@ -0,0 +1,240 @@
+import os
+import random
+import secrets
+import sqlite3
+import threading
+import time
+
+from flask import g, session
+from flask.json.tag import TaggedJSONSerializer
+from flask.sessions import SessionInterface, SessionMixin
+from itsdangerous import BadSignature, Signer
+from werkzeug.datastructures import CallbackDict
+
+from extensions import db
+from models import Admin, Student, Teacher
+
+try:
+    import redis
+except ImportError:  # only needed for SESSION_BACKEND=redis
+    redis = None
+
+
+# --------------------------------------------------
+# Server-side sessions
+# --------------------------------------------------
+# Session data lives in a store (a local SQLite file by default, or Redis) and
+# the cookie only carries a signed random id. A session is written back only
+# when it changed, or when its expiry needs pushing out, so read-only requests
+# cost one key lookup and no write. SESSION_BACKEND=cookie keeps Flask's
+# signed-cookie sessions.
+
+
+class ServerSession(CallbackDict, SessionMixin):
+    def __init__(self, initial=None, sid=None, expires_at=None):
+        def on_update(self):
+            self.modified = True
+
+        super().__init__(initial, on_update)
+        self.sid = sid
+        self.new = sid is None
+        self.expires_at = expires_at
+        self.modified = False
+        self.rotate = False
+
+    def clear(self):
+        # Logout/login: the next write goes under a fresh id
+        super().clear()
+        self.rotate = True
+
+
+class SQLiteSessionStore:
+    """File-backed store; also the local stand-in for Redis."""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS sessions "
+                "(sid TEXT PRIMARY KEY, data TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def load(self, sid):
+        row = (
+            self._connect()
+            .execute(
+                "SELECT data, expires_at FROM sessions WHERE sid = ? AND expires_at > ?",
+                (sid, time.time()),
+            )
+            .fetchone()
+        )
+        return (row[0], row[1]) if row else (None, None)
+
+    def save(self, sid, data, ttl):
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO sessions (sid, data, expires_at) VALUES (?, ?, ?)",
+                (sid, data, time.time() + ttl),
+            )
+            if random.random() < 0.01:
+                conn.execute("DELETE FROM sessions WHERE expires_at <= ?", (time.time(),))
+
+    def touch(self, sid, ttl):
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE sessions SET expires_at = ? WHERE sid = ?",
+                (time.time() + ttl, sid),
+            )
+
+    def delete(self, sid):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM sessions WHERE sid = ?", (sid,))
+
+
+class RedisSessionStore:
+    def __init__(self, url, prefix="session:"):
+        if redis is None:
+            raise RuntimeError("SESSION_BACKEND=redis needs the redis package")
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def load(self, sid):
+        key = self.prefix + sid
+        data, ttl = self.client.pipeline().get(key).ttl(key).execute()
+        if data is None:
+            return None, None
+        return data.decode(), time.time() + max(ttl, 0)
+
+    def save(self, sid, data, ttl):
+        self.client.setex(self.prefix + sid, int(ttl), data)
+
+    def touch(self, sid, ttl):
+        self.client.expire(self.prefix + sid, int(ttl))
+
+    def delete(self, sid):
+        self.client.delete(self.prefix + sid)
+
+
+class ServerSessionInterface(SessionInterface):
+    serializer = TaggedJSONSerializer()
+
+    def __init__(self, store):
+        self.store = store
+
+    def _signer(self, app):
+        return Signer(app.secret_key, salt="server-session", key_derivation="hmac")
+
+    def open_session(self, app, request):
+        cookie = request.cookies.get(self.get_cookie_name(app))
+        if cookie:
+            try:
+                sid = self._signer(app).unsign(cookie).decode()
+            except BadSignature:
+                sid = None
+            if sid:
+                data, expires_at = self.store.load(sid)
+                if data is not None:
+                    return ServerSession(self.serializer.loads(data), sid, expires_at)
+        return ServerSession()
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+
+        if session.rotate and session.sid:
+            self.store.delete(session.sid)
+            session.sid = None
+
+        if not session:
+            if not session.new:
+                response.delete_cookie(name, domain=domain, path=path)
+            return
+
+        ttl = app.permanent_session_lifetime.total_seconds()
+        if session.modified or session.sid is None:
+            session.sid = session.sid or secrets.token_urlsafe(32)
+            self.store.save(session.sid, self.serializer.dumps(dict(session)), ttl)
+        elif session.expires_at and session.expires_at - time.time() < ttl / 2:
+            # Sliding expiry, refreshed at most once per half lifetime
+            self.store.touch(session.sid, ttl)
+        else:
+            return
+
+        response.set_cookie(
+            name,
+            self._signer(app).sign(session.sid).decode(),
+            expires=self.get_expiration_time(app, session),
+            httponly=self.get_cookie_httponly(app),
+            domain=domain,
+            path=path,
+            secure=self.get_cookie_secure(app),
+            samesite=self.get_cookie_samesite(app),
+        )
+        response.vary.add("Cookie")
+
+
+def init_sessions(app):
+    app.config.setdefault("SESSION_BACKEND", os.getenv("SESSION_BACKEND", "sqlite"))
+    app.config.setdefault("SESSION_REDIS_URL", os.getenv("SESSION_REDIS_URL", ""))
+    app.config.setdefault(
+        "SESSION_SQLITE_PATH", os.path.join(app.instance_path, "sessions.sqlite")
+    )
+
+    backend = app.config["SESSION_BACKEND"]
+    if backend == "redis":
+        app.session_interface = ServerSessionInterface(
+            RedisSessionStore(app.config["SESSION_REDIS_URL"])
+        )
+    elif backend == "sqlite":
+        app.session_interface = ServerSessionInterface(
+            SQLiteSessionStore(app.config["SESSION_SQLITE_PATH"])
+        )
+
+    @app.context_processor
+    def inject_current_user():
+        return {"current_user": current_user}
+
+
+def rotate_session():
+    """Move the session to a fresh id on its next save; call on login so an
+    id handed out before authentication (session fixation) stops working.
+    Signed-cookie sessions carry no id and need nothing."""
+    if isinstance(session, ServerSession):
+        session.rotate = True
+
+
+# --------------------------------------------------
+# Current user
+# --------------------------------------------------
+
+ROLES = {
+    "admin": ("admin_id", Admin),
+    "teacher": ("teacher_id", Teacher),
+    "student": ("student_id", Student),
+}
+
+
+def current_user(role=None):
+    """The logged-in account for `role` (or any role), loaded once per request."""
+    loaded = g.setdefault("current_users", {})
+    for name in [role] if role else ROLES:
+        key, model = ROLES[name]
+        user_id = session.get(key)
+        if not user_id:
+            continue
+        if name not in loaded:
+            loaded[name] = db.session.get(model, user_id)
+        return loaded[name]
+    return None
@@ -0,0 +1,62 @@
+// Live notifications: one EventSource on the URL in [data-events-url] (see
+// notifications.py) replaces reloading pages to look for news. Each event
+// shows a notice with a link to the page that has it. A reconnect replays
+// recent events, so ids already shown are skipped.
+(function () {
+    var root = document.querySelector("[data-events-url]");
+    if (!root || !window.EventSource) {
+        return;
+    }
+
+    var messages = {
+        live_class: function (data) {
+            return {
+                text: "Live class scheduled: " + data.title + " on " + data.date + " at " + data.time,
+                href: root.getAttribute("data-classes-url")
+            };
+        },
+        live_class_starting: function (data) {
+            return {
+                text: "Live class starting now: " + data.title + " (" + data.platform + ")",
+                href: data.link
+            };
+        },
+        feedback_reply: function () {
+            return {
+                text: "Your teacher replied to your feedback.",
+                href: root.getAttribute("data-feedbacks-url")
+            };
+        }
+    };
+
+    function show(message) {
+        var item = document.createElement("div");
+        item.className = "live-notice-item";
+        var link = document.createElement("a");
+        link.textContent = message.text;
+        link.href = message.href;
+        var close = document.createElement("button");
+        close.type = "button";
+        close.textContent = "×";
+        close.addEventListener("click", function () {
+            item.remove();
+            root.hidden = !root.children.length;
+        });
+        item.appendChild(link);
+        item.appendChild(close);
+        root.appendChild(item);
+        root.hidden = false;
+    }
+
+    var seen = {};
+    var source = new EventSource(root.getAttribute("data-events-url"));
+    Object.keys(messages).forEach(function (name) {
+        source.addEventListener(name, function (event) {
+            if (seen[event.lastEventId]) {
+                return;
+            }
+            seen[event.lastEventId] = true;
+            show(messages[name](JSON.parse(event.data)));
+        });
+    });
+})();
@@ -0,0 +1,77 @@
+// Dashboard widgets: fills every [data-widget] element from one batch request
+// to the URL in [data-widget-api] (see api.py).
+//
+//   data-widget="progress" data-field="percent"   text (default)
+//   data-render="width"    style width in %
+//   data-render="href"     link target; hidden while empty
+//   data-render="unless"   shown only while the field is empty
+//   data-render="list"     on a <template>: one clone per item, with
+//                          [data-item] text and [data-item-href] links
+(function () {
+    var root = document.querySelector("[data-widget-api]");
+    var elements = document.querySelectorAll("[data-widget]");
+    if (!root || !elements.length) {
+        return;
+    }
+
+    var names = [];
+    elements.forEach(function (el) {
+        var name = el.getAttribute("data-widget");
+        if (names.indexOf(name) < 0) {
+            names.push(name);
+        }
+    });
+
+    function isEmpty(value) {
+        return value == null || value === "" || (Array.isArray(value) && !value.length);
+    }
+
+    var renderers = {
+        text: function (el, value) {
+            el.textContent = value;
+        },
+        width: function (el, value) {
+            el.style.width = value + "%";
+        },
+        href: function (el, value) {
+            el.hidden = isEmpty(value);
+            if (!el.hidden) {
+                el.href = value;
+            }
+        },
+        unless: function (el, value) {
+            el.hidden = !isEmpty(value);
+        },
+        list: function (el, items) {
+            items.forEach(function (item) {
+                var node = el.content.cloneNode(true);
+                node.querySelectorAll("[data-item]").forEach(function (child) {
+                    child.textContent = item[child.getAttribute("data-item")];
+                });
+                node.querySelectorAll("[data-item-href]").forEach(function (child) {
+                    child.href = item[child.getAttribute("data-item-href")];
+                });
+                el.parentNode.insertBefore(node, el);
+            });
+        }
+    };
+
+    var url = root.getAttribute("data-widget-api") + "?names=" + names.join(",");
+    fetch(url, { credentials: "same-origin" })
+        .then(function (response) {
+            if (!response.ok) {
+                throw new Error("widgets: " + response.status);
+            }
+            return response.json();
+        })
+        .then(function (body) {
+            elements.forEach(function (el) {
+                var data = body.widgets[el.getAttribute("data-widget")];
+                var render = renderers[el.getAttribute("data-render") || "text"];
+                render(el, data[el.getAttribute("data-field")]);
+            });
+        })
+        .catch(function (error) {
+            console.error(error);
+        });
+})();
@@ -0,0 +1,172 @@
+import os
+import threading
+import time
+from functools import wraps
+
+from flask import current_app, jsonify, request, session
+
+try:
+    import fcntl
+except ImportError:  # Windows dev machines: per-host limit is skipped
+    fcntl = None
+
+
+# --------------------------------------------------
+# Upload admission control
+# --------------------------------------------------
+# Large uploads hold a sync worker for the whole transfer. Every upload route
+# takes a slot here before the request body is read; when no slot is free the
+# client gets 429 + Retry-After instead of pinning another worker.
+
+_lock = threading.Lock()
+_process_slots = None
+_waiting = {}  # client key -> first rejection time (used for queue position)
+_metrics = {
+    "admitted": 0,
+    "rejected": 0,
+    "active": 0,
+    "peak": 0,
+    "bytes_admitted": 0,
+}
+
+
+def init_uploads(app):
+    app.config.setdefault("UPLOAD_LARGE_THRESHOLD", 10 * 1024 * 1024)  # 10MB
+    app.config.setdefault("UPLOAD_MAX_CONCURRENT", 2)  # per process
+    app.config.setdefault("UPLOAD_MAX_CONCURRENT_HOST", 4)  # per host
+    app.config.setdefault("UPLOAD_RETRY_AFTER", 30)  # seconds
+    app.config.setdefault(
+        "UPLOAD_LOCK_DIR", os.path.join(app.instance_path, "upload_slots")
+    )
+    # Optional base URL of a separate worker pool that serves upload routes
+    app.config.setdefault("UPLOAD_POOL_URL", os.getenv("UPLOAD_POOL_URL", ""))
+
+    for key in (
+        "UPLOAD_LARGE_THRESHOLD",
+        "UPLOAD_MAX_CONCURRENT",
+        "UPLOAD_MAX_CONCURRENT_HOST",
+        "UPLOAD_RETRY_AFTER",
+    ):
+        if os.getenv(key):
+            app.config[key] = int(os.getenv(key))
+
+    global _process_slots
+    _process_slots = threading.BoundedSemaphore(app.config["UPLOAD_MAX_CONCURRENT"])
+    os.makedirs(app.config["UPLOAD_LOCK_DIR"], exist_ok=True)
+
+    @app.context_processor
+    def inject_upload_url():
+        return {"upload_url": upload_url}
+
+
+def upload_url(endpoint, **values):
+    """url_for() that points upload forms at the upload worker pool, if any."""
+    from flask import url_for
+
+    base = current_app.config.get("UPLOAD_POOL_URL")
+    path = url_for(endpoint, **values)
+    return base.rstrip("/") + path if base else path
+
+
+def upload_metrics():
+    with _lock:
+        data = dict(_metrics)
+        data["waiting"] = len(_waiting)
+    data["process_limit"] = current_app.config["UPLOAD_MAX_CONCURRENT"]
+    data["host_limit"] = current_app.config["UPLOAD_MAX_CONCURRENT_HOST"]
+    return data
+
+
+def _client_key():
+    return session.get("teacher_id") or request.remote_addr
+
+
+def _acquire_host_slot():
+    """Lock one of N slot files; returns the open file or None if all busy."""
+    if fcntl is None:
+        return True
+    lock_dir = current_app.config["UPLOAD_LOCK_DIR"]
+    for i in range(current_app.config["UPLOAD_MAX_CONCURRENT_HOST"]):
+        f = open(os.path.join(lock_dir, f"slot{i}.lock"), "a")
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return f
+        except OSError:
+            f.close()
+    return None
+
+
+def _release_host_slot(slot):
+    if fcntl is None or slot is True:
+        return
+    fcntl.flock(slot, fcntl.LOCK_UN)
+    slot.close()
+
+
+def _queue_position(key):
+    retry_after = current_app.config["UPLOAD_RETRY_AFTER"]
+    now = time.time()
+    with _lock:
+        for k, since in list(_waiting.items()):
+            if now - since > 2 * retry_after:
+                del _waiting[k]
+        _waiting.setdefault(key, now)
+        ordered = sorted(_waiting, key=_waiting.get)
+        _metrics["rejected"] += 1
+    return ordered.index(key) + 1
+
+
+def _reject(key):
+    retry_after = current_app.config["UPLOAD_RETRY_AFTER"]
+    position = _queue_position(key)
+    message = "Too many uploads in progress. Please retry shortly."
+    if request.accept_mimetypes.best == "application/json":
+        response = jsonify(
+            {"error": message, "queue_position": position, "retry_after": retry_after}
+        )
+    else:
+        response = current_app.response_class(
+            f"{message} Your position in the queue: {position}.",
+            mimetype="text/plain",
+        )
+    response.status_code = 429
+    response.headers["Retry-After"] = str(retry_after)
+    response.headers["X-Upload-Queue-Position"] = str(position)
+    return response
+
+
+def upload_slot(f):
+    """Admit a large POST upload only if a process and host slot is free."""
+
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        # A chunked body declares no length and may be any size
+        size = request.content_length
+        if request.method != "POST" or (
+            size is not None and size < current_app.config["UPLOAD_LARGE_THRESHOLD"]
+        ):
+            return f(*args, **kwargs)
+
+        key = _client_key()
+        if not _process_slots.acquire(blocking=False):
+            return _reject(key)
+        host_slot = _acquire_host_slot()
+        if host_slot is None:
+            _process_slots.release()
+            return _reject(key)
+
+        with _lock:
+            _waiting.pop(key, None)
+            _metrics["admitted"] += 1
+            _metrics["bytes_admitted"] += size or 0
+            _metrics["active"] += 1
+            _metrics["peak"] = max(_metrics["peak"], _metrics["active"])
+        try:
+            return f(*args, **kwargs)
+        finally:
+            with _lock:
+                _metrics["active"] -= 1
+            _release_host_slot(host_slot)
+            _process_slots.release()
+
+    return decorated_function
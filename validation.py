@@ -0,0 +1,71 @@
+import re
+
+# --------------------------------------------------
+# Registration rules
+# --------------------------------------------------
+# Shared by the registration forms and the bulk importer. Each check returns
+# (cleaned fields, None) or (None, message shown to the user).
+
+EMAIL_RE = re.compile(r"[^@]+@[^@]+\.[^@]+")
+CONTACT_RE = re.compile(r"^\d{10}$")
+
+STUDENT_FIELDS = ("name", "email", "password", "age", "grade")
+TEACHER_FIELDS = (
+    "name",
+    "email",
+    "password",
+    "qualifications",
+    "availability",
+    "years_of_experience",
+    "contact",
+    "place",
+)
+
+
+def _strip(data, names):
+    fields = {}
+    for name in names:
+        value = data.get(name) or ""
+        fields[name] = value if name == "password" else str(value).strip()
+    return fields
+
+
+def _int_between(value, low, high):
+    number = int(value)  # ValueError for non-numbers
+    return number if low <= number <= high else None
+
+
+def check_student(data, course_ids):
+    fields = _strip(data, STUDENT_FIELDS)
+    if not all(fields.values()) or not course_ids:
+        return None, "All fields are required."
+    if not EMAIL_RE.match(fields["email"]):
+        return None, "Invalid email address."
+    if len(fields["password"]) < 6:
+        return None, "Password must be at least 6 characters."
+    try:
+        fields["age"] = _int_between(fields["age"], 10, 100)
+    except ValueError:
+        return None, "Age must be a number."
+    if fields["age"] is None:
+        return None, "Age must be between 10 and 100."
+    return fields, None
+
+
+def check_teacher(data):
+    fields = _strip(data, TEACHER_FIELDS)
+    if not all(fields.values()):
+        return None, "All fields except second course are required."
+    if not EMAIL_RE.match(fields["email"]):
+        return None, "Invalid email address."
+    if len(fields["password"]) < 6:
+        return None, "Password must be at least 6 characters."
+    try:
+        fields["years_of_experience"] = _int_between(fields["years_of_experience"], 0, 50)
+    except ValueError:
+        return None, "Years of experience must be a number."
+    if fields["years_of_experience"] is None:
+        return None, "Years of experience must be between 0 and 50."
+    if not CONTACT_RE.match(fields["contact"]):
+        return None, "Contact must be a 10-digit number."
+    return fields, None
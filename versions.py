@@ -0,0 +1,106 @@
+from flask import g, has_app_context
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import Session
+
+from extensions import db
+from models import (
+    Attendance,
+    CacheVersion,
+    Course,
+    ExamAttempt,
+    ExamResult,
+    Progress,
+    Student,
+    Teacher,
+)
+
+# --------------------------------------------------
+# Data versions
+# --------------------------------------------------
+# Named counters in the cache_version table. Anything cached outside the
+# database (template fragments, HTTP ETags) puts the versions it depends on
+# in its key. Writes through the ORM bump them from a before_flush hook;
+# Core writes call bump_versions() themselves.
+#
+#   course_catalog  course names, descriptions and teachers
+#   teachers        teacher names and course assignments
+#   student:<id>    a student's enrollments, progress, attendance and exams
+
+# version name -> models whose writes bump it
+VERSION_SOURCES = {
+    "course_catalog": (Course,),
+    "teachers": (Teacher,),
+}
+
+# Course columns behind course_catalog. Other Course changes, such as the
+# backref collections an enrollment or assignment dirties, leave it alone
+CATALOG_COLUMNS = ("name", "description", "start_date", "deleted_at")
+
+# models whose rows belong to one student (via student_id)
+STUDENT_SOURCES = (Progress, Attendance, ExamAttempt, ExamResult)
+
+
+def student_version_name(student_id):
+    return f"student:{student_id}"
+
+
+def data_versions(*names):
+    """{name: version} for `names`, read once per request."""
+    cached = g.setdefault("data_versions", {})
+    missing = [name for name in names if name not in cached]
+    if missing:
+        rows = db.session.execute(
+            select(CacheVersion.name, CacheVersion.version).where(
+                CacheVersion.name.in_(missing)
+            )
+        )
+        cached.update(dict.fromkeys(missing, 0))
+        cached.update(rows.all())
+    return {name: cached[name] for name in names}
+
+
+def data_version(name):
+    return data_versions(name)[name]
+
+
+def bump_versions(names, connection=None):
+    """Increment versions inside the caller's transaction."""
+    names = sorted(set(names))  # fixed order so concurrent bumps can't deadlock
+    if not names:
+        return
+    connection = connection or db.session.connection()
+    table = CacheVersion.__table__
+    if connection.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    stmt = insert(table).values([{"name": name, "version": 1} for name in names])
+    connection.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[table.c.name], set_={"version": table.c.version + 1}
+        )
+    )
+    if has_app_context():
+        g.pop("data_versions", None)
+
+
+def _collection_change_only(session, obj):
+    if not isinstance(obj, Course) or obj in session.new or obj in session.deleted:
+        return False
+    attrs = inspect(obj).attrs
+    return not any(attrs[name].history.has_changes() for name in CATALOG_COLUMNS)
+
+
+@event.listens_for(Session, "before_flush")
+def _bump_changed_versions(session, flush_context, instances):
+    names = set()
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        for name, models in VERSION_SOURCES.items():
+            if isinstance(obj, models) and not _collection_change_only(session, obj):
+                names.add(name)
+        if isinstance(obj, Student) and obj.id is not None:
+            names.add(student_version_name(obj.id))
+        elif isinstance(obj, STUDENT_SOURCES) and obj.student_id is not None:
+            names.add(student_version_name(obj.student_id))
+    if names:
+        bump_versions(names, session.connection())